@@ -0,0 +1,110 @@
+"""Throughput of core.command_parser against the parsers it replaced.
+
+Parses a stream of synthetic copilot action lines (with and without
+timestamps, box ids and trailing periods) three ways: the former simulator
+and recorder string-slicing parsers, parse_command on distinct lines (every
+call a cache miss) and parse_command on a stream that repeats a small set of
+lines, as the watcher and the pattern loader see it (cache hits).
+
+    python -m benchmarks.bench_command_parser --lines 2000000
+"""
+import json
+import time
+import random
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.command_parser import parse_command
+
+ACTIONS = ('Buy item', 'Sell item', 'Collect items', 'Abort offer', 'Modify offer', 'Wait')
+
+
+def _legacy_simulator_parse(action_line: str) -> Tuple[Optional[str], Optional[int]]:
+    try:
+        if " - " in action_line:
+            action_line = action_line.split(" - ")[1]
+        action_line = action_line.rstrip('.')
+        box_id = None
+        if '[' in action_line and ']' in action_line:
+            action_type = action_line[:action_line.find('[')].strip()
+            box_id = int(action_line[action_line.find('[')+1:action_line.find(']')])
+        else:
+            action_type = action_line.strip()
+        return action_type, box_id
+    except Exception:
+        return None, None
+
+
+def _legacy_recorder_parse(action_line: str) -> Tuple[Optional[str], Optional[int]]:
+    if not action_line:
+        return None, None
+    if " - " in action_line and action_line.count(':') >= 2:
+        action_line = action_line.split(" - ", 1)[1]
+    box_id: Optional[int] = None
+    action_type_str = action_line.strip()
+    if '[' in action_type_str and action_type_str.endswith(']'):
+        try:
+            box_id = int(action_type_str[action_type_str.rfind('[')+1:-1])
+            action_type_str = action_type_str[:action_type_str.rfind('[')].strip()
+        except ValueError:
+            box_id = None
+    return action_type_str, box_id
+
+
+def generate_lines(count: int, distinct: Optional[int] = None, seed: int = 0) -> List[str]:
+    """count action lines; with distinct, they cycle through that many different lines."""
+    rng = random.Random(seed)
+    unique = count if distinct is None else distinct
+    lines = []
+    for i in range(unique):
+        line = rng.choice(ACTIONS)
+        if rng.random() < 0.6:
+            line += f" [{rng.randint(0, 7)}]"
+        if rng.random() < 0.3:
+            line += "."
+        if rng.random() < 0.5:
+            # The seconds make every line unique, like real timestamped output
+            line = f"2024-05-{1 + i // 86400 % 28:02d} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d} - {line}"
+        lines.append(line)
+    if distinct is not None:
+        lines = [lines[i % distinct] for i in range(count)]
+    return lines
+
+
+def measure(parse: Callable[[str], Any], lines: List[str]) -> Dict[str, float]:
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'lines_per_second': len(lines) / elapsed if elapsed > 0 else 0.0}
+
+
+def run(count: int, distinct: int = 64) -> Dict[str, Dict[str, float]]:
+    unique_lines = generate_lines(count)
+    repeated_lines = generate_lines(count, distinct)
+    results = {
+        'legacy_simulator': measure(_legacy_simulator_parse, unique_lines),
+        'legacy_recorder': measure(_legacy_recorder_parse, unique_lines),
+    }
+    parse_command.cache_clear()
+    results['parse_command_unique'] = measure(parse_command, unique_lines)
+    parse_command.cache_clear()
+    results['parse_command_repeated'] = measure(parse_command, repeated_lines)
+    results['parse_command_repeated']['cache_hit_rate'] = (
+        parse_command.cache_info().hits / count if count else 0.0)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=2_000_000)
+    parser.add_argument('--distinct', type=int, default=64, help="Distinct lines in the repeated stream")
+    parser.add_argument('--json', help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.lines, args.distinct)
+    for name, result in results.items():
+        print(f"{name:>24}: {result['lines_per_second']:12,.0f} lines/s")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'lines': args.lines, 'distinct': args.distinct, 'results': results}, f, indent=2)
@@ -0,0 +1,75 @@
+"""Memory and throughput of the recorder's per-event representation.
+
+Builds the same synthetic mouse_move stream twice: once as the legacy
+event dict with a nested movement_metrics dict, once as a raw-sample
+core.events.Event, and reports bytes per event (tracemalloc) and events built per second.
+
+    python -m benchmarks.bench_event_memory --events 100000
+"""
+import gc
+import json
+import math
+import time
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from core.events import Event, MOUSE_MOVE
+
+
+def _legacy_event(i: int, t: float) -> Dict[str, Any]:
+    dx, dy, dt = 1, 2, 0.008
+    distance = math.sqrt(dx * dx + dy * dy)
+    movement_metrics = {
+        'dt': dt, 'distance': distance, 'speed': distance / dt,
+        'angle': math.atan2(dy, dx) * 180 / math.pi, 'dx': dx, 'dy': dy
+    }
+    return {
+        'type': 'mouse_move', 'time_offset_ms': i * 8,
+        'x': 500 + i % 400, 'y': 300 + i % 300, 'timestamp': t,
+        'movement_metrics': movement_metrics
+    }
+
+
+def _compact_event(i: int, t: float) -> Event:
+    # Movement metrics are derived at replay time, so only the raw sample is kept
+    return Event(MOUSE_MOVE, i * 8, 500 + i % 400, 300 + i % 300, None, -1, t)
+
+
+def measure(build: Callable[[int, float], Any], count: int) -> Dict[str, float]:
+    base = time.time()
+    gc.collect()
+    tracemalloc.start()
+    events: List[Any] = []
+    for i in range(count):
+        events.append(build(i, base + i * 0.008))
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del events
+    gc.collect()
+
+    start = time.perf_counter()
+    events = [build(i, base + i * 0.008) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    return {'bytes_per_event': current / count, 'events_per_second': count / elapsed}
+
+
+def run(count: int) -> Dict[str, Dict[str, float]]:
+    return {'dict': measure(_legacy_event, count), 'slots': measure(_compact_event, count)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--json', help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.events)
+    for name, result in results.items():
+        print(f"{name:>6}: {result['bytes_per_event']:8.1f} bytes/event  "
+              f"{result['events_per_second']:12,.0f} events/s")
+    ratio = results['dict']['bytes_per_event'] / results['slots']['bytes_per_event']
+    print(f"memory reduction: {ratio:.1f}x")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'events': args.events, 'results': results}, f, indent=2)
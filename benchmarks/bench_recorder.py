@@ -0,0 +1,201 @@
+"""Per-event cost of the recorder's capture path and of saving a pattern.
+
+Capture: an EventRecorder is started without OS listeners and its
+_on_mouse_move / _on_mouse_click / _on_key_event callbacks are driven
+directly with a synthetic stream (mouse polling at --rate Hz, a click
+every --click-every moves, a key press every --key-every moves). Reports
+the latency of the callbacks themselves (what the OS input hook waits
+for), the throughput of the merger thread, and, in a separate tracemalloc
+pass, the allocations and bytes retained per captured event.
+
+Save: save_recording_for_action is timed for growing session lengths
+(event counts at --rate Hz) in the JSON and binary pattern formats.
+
+    python -m benchmarks.bench_recorder --seconds 5 --rate 1000 --save-sizes 10000 100000 1000000
+"""
+import gc
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import configparser
+from types import SimpleNamespace
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from benchmarks.bench_replay import generate_recording
+from core.events import KEY_PRESS, KEY_RELEASE
+from core.recorder import EventRecorder
+
+DEFAULT_SAVE_SIZES = (10_000, 100_000, 1_000_000)
+BUTTON = 'Button.left'
+KEY = SimpleNamespace(char='a')
+
+
+class BenchmarkRecorder(EventRecorder):
+    """EventRecorder writing into a scratch directory."""
+
+    def __init__(self, directory: str, pattern_format: str = 'binary', simplify_tolerance_px: float = 1.0):
+        self.directory = directory
+        self.bench_settings = {'pattern_format': pattern_format, 'simplify_tolerance_px': str(simplify_tolerance_px)}
+        super().__init__()
+
+    def _load_config(self) -> configparser.ConfigParser:
+        config = super()._load_config()
+        config.read_dict({
+            'Paths': {'patterns_directory': self.directory, 'suggested_actions': 'no_suggested_actions.txt',
+                      'pattern_pack': ''},
+            'Recording': self.bench_settings,
+        })
+        return config
+
+
+def _drive(recorder: EventRecorder, moves: int, rate: float, click_every: int, key_every: int) -> np.ndarray:
+    """Feed the callbacks; returns per-call latency in nanoseconds."""
+    latencies: List[int] = []
+    record = latencies.append
+    clock = time.perf_counter_ns
+    interval_ns = int(1e9 / rate) if rate > 0 else 0
+    start = clock()
+    for i in range(moves):
+        if interval_ns:
+            remaining = start + i * interval_ns - clock()
+            if remaining > 0:
+                time.sleep(remaining / 1e9)
+        x, y = 500 + i % 400, 300 + i % 300
+        t0 = clock()
+        recorder._on_mouse_move(x, y)
+        record(clock() - t0)
+        if click_every and i % click_every == click_every - 1:
+            for pressed in (True, False):
+                t0 = clock()
+                recorder._on_mouse_click(x, y, BUTTON, pressed)
+                record(clock() - t0)
+        if key_every and i % key_every == key_every - 1:
+            for type_code in (KEY_PRESS, KEY_RELEASE):
+                t0 = clock()
+                recorder._on_key_event(KEY, type_code)
+                record(clock() - t0)
+    return np.asarray(latencies, dtype=np.int64)
+
+
+def _capture(directory: str, moves: int, rate: float, click_every: int, key_every: int,
+             trace: bool = False) -> Dict[str, Any]:
+    recorder = BenchmarkRecorder(directory)
+    recorder._start_capture()
+    if trace:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    latencies = _drive(recorder, moves, rate, click_every, key_every)
+    fed = time.perf_counter() - start
+    recorder.is_recording = False
+    recorder.capture_merger.stop(timeout=60.0)
+    elapsed = time.perf_counter() - start
+    result: Dict[str, Any] = {
+        'callbacks': len(latencies),
+        'events_stored': len(recorder.event_store),
+        'feed_seconds': fed,
+        'drain_seconds': elapsed - fed,
+        'merger_events_per_second': recorder.capture_merger.processed / elapsed if elapsed > 0 else 0.0,
+        'merger_max_pending': recorder.capture_merger.max_pending,
+        'callback_latency_us': dict(zip(
+            ('p50', 'p95', 'p99', 'max'),
+            (float(v) / 1000.0 for v in np.percentile(latencies, (50, 95, 99, 100))))) if len(latencies) else {},
+    }
+    if trace:
+        _current, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().compare_to(before, 'filename')
+        tracemalloc.stop()
+        count = max(len(latencies), 1)
+        result.update({
+            'retained_bytes_per_event': sum(s.size_diff for s in stats) / count,
+            'retained_allocations_per_event': sum(s.count_diff for s in stats) / count,
+            'peak_memory_bytes': peak,
+        })
+    recorder._end_segment(discard=True)
+    recorder.recording_log.close(timeout=60.0)
+    return result
+
+
+def measure_capture(seconds: float = 5.0, rate: float = 1000.0, click_every: int = 200,
+                    key_every: int = 500, memory: bool = True) -> Dict[str, Any]:
+    moves = int(seconds * rate) if rate > 0 else int(seconds * 1000)
+    with tempfile.TemporaryDirectory(prefix='bench_recorder_') as directory:
+        result = _capture(directory, moves, rate, click_every, key_every)
+        if memory:
+            # Unpaced: the retained bytes only depend on the stream, not its rate
+            result.update({k: v for k, v in _capture(directory, moves, 0, click_every, key_every, trace=True).items()
+                           if k.startswith(('retained_', 'peak_'))})
+    return result
+
+
+def measure_save(sizes: Sequence[int] = DEFAULT_SAVE_SIZES, formats: Sequence[str] = ('binary', 'json'),
+                 simplify_tolerance_px: float = 1.0) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in sizes:
+        # Finalized segments reach save_recording_for_action as event dicts
+        events = [event.to_dict() for event in generate_recording(size)]
+        results[str(size)] = {}
+        for file_format in formats:
+            with tempfile.TemporaryDirectory(prefix='bench_recorder_') as directory:
+                recorder = BenchmarkRecorder(directory, file_format, simplify_tolerance_px)
+                start = time.perf_counter()
+                path = recorder.save_recording_for_action('Benchmark', events)
+                elapsed = time.perf_counter() - start
+                results[str(size)][file_format] = {
+                    'seconds': elapsed,
+                    'events_per_second': size / elapsed if elapsed > 0 else 0.0,
+                    'file_bytes': os.path.getsize(path) if path else 0,
+                }
+        del events
+        gc.collect()
+    return results
+
+
+def run(seconds: float, rate: float, click_every: int, key_every: int, save_sizes: Sequence[int],
+        simplify_tolerance_px: float, memory: bool = True) -> Dict[str, Any]:
+    return {
+        'benchmark': 'recorder',
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'rate_hz': rate,
+        'capture': measure_capture(seconds, rate, click_every, key_every, memory),
+        'save': measure_save(save_sizes, simplify_tolerance_px=simplify_tolerance_px),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0, help="Length of the synthetic capture stream")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Mouse polling rate in Hz (0 = unpaced)")
+    parser.add_argument('--click-every', type=int, default=200, help="Moves between clicks (0 = none)")
+    parser.add_argument('--key-every', type=int, default=500, help="Moves between key presses (0 = none)")
+    parser.add_argument('--save-sizes', type=int, nargs='*', default=list(DEFAULT_SAVE_SIZES))
+    parser.add_argument('--simplify-tolerance', type=float, default=1.0, help="0 saves without simplification")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass")
+    parser.add_argument('--json', help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.seconds, args.rate, args.click_every, args.key_every, args.save_sizes,
+                  args.simplify_tolerance, not args.no_memory)
+    capture = results['capture']
+    latency = capture['callback_latency_us']
+    print(f"capture: {capture['callbacks']:,} callbacks, latency us p50/p95/p99/max "
+          f"{latency['p50']:.2f}/{latency['p95']:.2f}/{latency['p99']:.2f}/{latency['max']:.1f}, "
+          f"merger {capture['merger_events_per_second']:,.0f} events/s (max {capture['merger_max_pending']} pending), "
+          f"drain {capture['drain_seconds']:.3f}s")
+    if 'retained_bytes_per_event' in capture:
+        print(f"memory:  {capture['retained_bytes_per_event']:.1f} bytes/event, "
+              f"{capture['retained_allocations_per_event']:.2f} allocations/event retained, "
+              f"peak {capture['peak_memory_bytes'] / 1e6:.1f} MB")
+    for size, formats in results['save'].items():
+        seconds_at_rate = f" ({int(size) / args.rate:,.0f}s at {args.rate:g} Hz)" if args.rate > 0 else ""
+        print(f"save {int(size):>9,} events{seconds_at_rate}: " + ", ".join(
+            f"{name} {r['seconds']:.3f}s / {r['file_bytes'] / 1e6:.1f} MB" for name, r in formats.items()))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,228 @@
+"""Throughput and timing accuracy of the replay engine.
+
+Generates synthetic recordings (mouse paths with clicks, key presses and
+idle pauses, in the regular pattern file schema), loads them through
+EventSimulator.load_recording and replays them into the headless 'null'
+input backend. For every size it reports load time, replayed events per
+second, scheduling lateness percentiles, input backend call counts and the
+peak traced memory of load + replay.
+
+With the default virtual clock, waits are skipped (sleeping advances the
+clock instead), so replay runs as fast as the hot loop allows and
+lateness measures the loop's own cost. --clock real replays in real time,
+divided by --speed.
+
+    python -m benchmarks.bench_replay --sizes 1000 10000 100000 1000000 --json replay.json
+    python -m benchmarks.bench_replay --compare replay.json
+"""
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import configparser
+from typing import Any, Dict, List, Optional
+
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE, PAUSE
+from core.input_backends import RecordingBackend
+from core.pattern_format import PATTERN_EXTENSION, write_pattern
+from core.replay_scheduler import ReplayScheduler
+from core.simulator import EventSimulator
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+GAME_TITLE = 'RuneLite'
+KEYS = ('a', 'd', 'Key.space', 'Key.enter', 'Key.shift', '<65437>')
+
+
+class FastForwardClock:
+    """perf_counter plus the time 'slept' so far; sleep() returns immediately."""
+
+    def __init__(self):
+        self.skipped = 0.0
+
+    def __call__(self) -> float:
+        return time.perf_counter() + self.skipped
+
+    def sleep(self, seconds: float) -> None:
+        self.skipped += seconds
+
+
+def generate_recording(count: int, seed: int = 0, move_interval_ms: int = 8) -> List[Event]:
+    """count synthetic events: runs of mouse moves ending in a click, with
+    occasional key presses and idle pauses in between."""
+    rng = random.Random(seed)
+    events: List[Event] = []
+    t, x, y = 0, 960, 540
+    while len(events) < count:
+        for _ in range(rng.randint(10, 80)):
+            t += move_interval_ms + rng.randint(-2, 2)
+            x = min(max(x + rng.randint(-6, 6), 0), 1919)
+            y = min(max(y + rng.randint(-6, 6), 0), 1079)
+            events.append(Event(MOUSE_MOVE, t, x, y))
+        button = 'Button.left' if rng.random() < 0.8 else 'Button.right'
+        hold = rng.randint(50, 120)
+        events.append(Event(MOUSE_PRESS, t, x, y, button))
+        t += hold
+        events.append(Event(MOUSE_RELEASE, t, x, y, button, hold))
+        if rng.random() < 0.3:
+            key = rng.choice(KEYS)
+            hold = rng.randint(30, 90)
+            t += rng.randint(20, 200)
+            events.append(Event(KEY_PRESS, t, symbol=key))
+            t += hold
+            events.append(Event(KEY_RELEASE, t, symbol=key, hold_ms=hold))
+        if rng.random() < 0.1:
+            pause = rng.randint(300, 1500)
+            t += pause
+            events.append(Event(PAUSE, t, x, y, hold_ms=pause))
+    return events[:count]
+
+
+def write_recording(directory: str, events: List[Event], file_format: str = 'binary') -> str:
+    """Save events as a pattern file, the way the recorder does."""
+    metadata = {'action_name_line': 'Benchmark', 'parsed_action_type': 'Benchmark', 'parsed_box_id': None,
+                'total_events': len(events)}
+    if file_format == 'binary':
+        path = os.path.join(directory, f"Benchmark_{len(events)}{PATTERN_EXTENSION}")
+        write_pattern(path, events, metadata, delta=True)
+    else:
+        path = os.path.join(directory, f"Benchmark_{len(events)}.json")
+        metadata['events'] = [event.to_dict() for event in events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+    return path
+
+
+class BenchmarkSimulator(EventSimulator):
+    """EventSimulator with an in-memory config, the 'null' backend and an injectable clock."""
+
+    def __init__(self, directory: str, clock=time.perf_counter, sleep=time.sleep, speed: float = 1.0):
+        self.directory = directory
+        self.speed = speed
+        super().__init__()
+        # A fast-forwarded sleep lands exactly on the deadline; spinning would only burn real time
+        spin_threshold = 0.0 if isinstance(clock, FastForwardClock) else self.scheduler.spin_threshold
+        self.scheduler = ReplayScheduler(clock=clock, sleep=sleep, spin_threshold=spin_threshold)
+        self.input_backend = RecordingBackend(clock=clock)
+        # Always focused, without touching the window manager
+        self.focus_monitor.title_provider = lambda: GAME_TITLE
+
+    def _load_config(self) -> configparser.ConfigParser:
+        config = super()._load_config()
+        config.read_dict({
+            'Paths': {'patterns_directory': self.directory,
+                      'suggested_actions': os.path.join(self.directory, 'suggested_actions.txt'),
+                      'pattern_pack': '', 'pattern_catalog': 'pattern_catalog.sqlite3'},
+            'Simulation': {'input_backend': 'null', 'speed_multiplier': str(self.speed), 'max_idle_pause_ms': '0'},
+            'Window': {'game_title': GAME_TITLE, 'focus_backend': 'poll', 'focus_poll_interval': '1.0'},
+        })
+        return config
+
+
+def _replay(path: str, directory: str, clock_name: str, speed: float) -> Dict[str, Any]:
+    clock = FastForwardClock() if clock_name == 'virtual' else None
+    simulator = BenchmarkSimulator(directory, clock=clock or time.perf_counter,
+                                   sleep=clock.sleep if clock else time.sleep, speed=speed)
+    try:
+        start = time.perf_counter()
+        if not simulator.load_recording(path):
+            raise RuntimeError(f"Failed to load {path}")
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        simulator.start_simulation()
+        replay_seconds = time.perf_counter() - start
+    finally:
+        simulator.focus_monitor.stop()
+
+    report = simulator.last_replay_report
+    backend = simulator.input_backend
+    return {
+        'events': len(simulator.events),
+        'operations': len(simulator.plan),
+        'load_seconds': load_seconds,
+        'replay_seconds': replay_seconds,
+        'events_per_second': len(simulator.events) / replay_seconds if replay_seconds > 0 else 0.0,
+        'operations_per_second': len(simulator.plan) / replay_seconds if replay_seconds > 0 else 0.0,
+        'scheduled_seconds': report.get('scheduled_duration', 0.0),
+        'lateness_ms': {name[9:-3]: report[name] for name in report if name.startswith('lateness_')},
+        'backend_calls': backend.call_counts(),
+        'backend_flushes': backend.flushes,
+    }
+
+
+def measure(count: int, clock_name: str = 'virtual', speed: float = 1.0, file_format: str = 'binary',
+            memory: bool = True, seed: int = 0) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix='bench_replay_') as directory:
+        path = write_recording(directory, generate_recording(count, seed), file_format)
+        result = _replay(path, directory, clock_name, speed)
+        result['file_bytes'] = os.path.getsize(path)
+        if memory:
+            # Separate pass: tracing allocations slows the hot loop down too much to time it
+            gc.collect()
+            tracemalloc.start()
+            _replay(path, directory, clock_name, speed)
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result['peak_memory_bytes'] = peak
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, clock_name: str = 'virtual', speed: float = 1.0, file_format: str = 'binary',
+        memory: bool = True) -> Dict[str, Any]:
+    return {
+        'benchmark': 'replay',
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'clock': clock_name,
+        'speed': speed,
+        'format': file_format,
+        'results': {str(count): measure(count, clock_name, speed, file_format, memory) for count in sizes},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Per-size events/s and p99 lateness against a previous results file."""
+    lines = []
+    for size, result in current['results'].items():
+        previous: Optional[Dict[str, Any]] = baseline['results'].get(size)
+        if not previous:
+            continue
+        ratio = result['events_per_second'] / previous['events_per_second'] if previous['events_per_second'] else 0.0
+        lines.append(f"{int(size):>9,} events: {ratio:5.2f}x events/s, p99 lateness "
+                     f"{previous['lateness_ms'].get('p99', 0.0):.3f} -> {result['lateness_ms'].get('p99', 0.0):.3f} ms")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--clock', choices=('virtual', 'real'), default='virtual')
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier (real clock)")
+    parser.add_argument('--format', choices=('binary', 'json'), default='binary', help="Pattern file format")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak memory pass")
+    parser.add_argument('--json', help="Write the results to this file as JSON")
+    parser.add_argument('--compare', help="Previous --json results to compare against")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.clock, args.speed, args.format, not args.no_memory)
+    for size, result in results['results'].items():
+        lateness = result['lateness_ms']
+        memory = f"  peak {result['peak_memory_bytes'] / 1e6:8.1f} MB" if 'peak_memory_bytes' in result else ""
+        print(f"{int(size):>9,} events: load {result['load_seconds']:7.3f}s  "
+              f"{result['events_per_second']:12,.0f} events/s  "
+              f"lateness p50/p95/p99 {lateness.get('p50', 0):.3f}/{lateness.get('p95', 0):.3f}/"
+              f"{lateness.get('p99', 0):.3f} ms  {sum(result['backend_calls'].values()):,} calls{memory}")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            for line in compare(results, json.load(f)):
+                print(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,166 @@
+"""Import time and time-to-ready of the recorder and simulator entry points.
+
+Every measurement runs in a fresh interpreter. The import pass runs
+`python -X importtime` on core.simulator, core.recorder and main and reports
+the cumulative import time of each, the slowest imports it pulls in and
+whether NumPy was loaded. The ready pass starts an EventSimulator (headless
+'null' input backend) on a directory of synthetic patterns and times the
+import, the constructor, which returns before the patterns are indexed, and
+patterns_ready, set once the background discovery has synced the catalog
+and loaded the pattern of the pending action. It is timed with the catalog
+missing (cold: every pattern is indexed) and present (warm).
+
+    python -m benchmarks.bench_startup --repeat 5 --patterns 500 --json startup.json
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.bench_replay import generate_recording
+from core.pattern_catalog import DEFAULT_CATALOG_NAME, PATTERN_EXTENSION
+from core.pattern_format import write_pattern
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ('core.simulator', 'core.recorder', 'main')
+ACTIONS = ('Buy_item', 'Sell_item', 'Collect_items', 'Abort_offer')
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+# Run in the child interpreter: argv[1] is the config file
+_READY_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+import configparser
+from core.simulator import EventSimulator
+imported = time.perf_counter()
+numpy_on_import = 'numpy' in sys.modules
+
+class StartupSimulator(EventSimulator):
+    def _load_config(self):
+        config = configparser.ConfigParser()
+        config.read(sys.argv[1])
+        return config
+
+simulator = StartupSimulator()
+constructed = time.perf_counter()
+simulator.wait_for_patterns()
+ready = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000.0,
+    'construct_ms': (constructed - imported) * 1000.0,
+    'ready_ms': (ready - start) * 1000.0,
+    'numpy_on_import': numpy_on_import,
+    'events_loaded': len(simulator.events),
+}))
+simulator.close()
+"""
+
+
+def import_times(module: str, top: int = 5) -> Dict[str, Any]:
+    """Parse `python -X importtime -c "import <module>"` output."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            imports.append((match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3))))
+    names = {name for name, _, _, _ in imports}
+    # Top-level entries only, so nested imports are not counted twice
+    total_us = sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+    own_us = next(cumulative for name, _, cumulative, depth in imports if name == module and depth == 0)
+    slowest = sorted(imports, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        'module_ms': own_us / 1000.0,
+        'total_ms': total_us / 1000.0,
+        'modules': len(names),
+        'numpy': 'numpy' in names,
+        'slowest_self_ms': {name: self_us / 1000.0 for name, self_us, _, _ in slowest},
+    }
+
+
+def write_fixture(directory: str, patterns: int, events: int = 200) -> str:
+    """patterns synthetic binary patterns, one pending action and a config file. Returns the config path."""
+    recording = generate_recording(events)
+    for i in range(patterns):
+        action = ACTIONS[i % len(ACTIONS)]
+        metadata = {'action_name_line': f"{action} [{i % 8}]", 'parsed_action_type': action,
+                    'parsed_box_id': i % 8, 'total_events': len(recording)}
+        filename = f"{action}_box{i % 8}_20250101_000000_{i:06d}{PATTERN_EXTENSION}"
+        write_pattern(os.path.join(directory, filename), recording, metadata, delta=True)
+    with open(os.path.join(directory, 'suggested_actions.txt'), 'w', encoding='utf-8') as f:
+        f.write(f"{ACTIONS[0].replace('_', ' ')} [0].\n")
+    config_path = os.path.join(directory, 'config.ini')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        f.write(f"[Paths]\npatterns_directory = {directory}\n"
+                f"suggested_actions = {os.path.join(directory, 'suggested_actions.txt')}\n"
+                "[Simulation]\ninput_backend = null\n"
+                "[Window]\nfocus_backend = poll\n")
+    return config_path
+
+
+def time_to_ready(config_path: str) -> Dict[str, Any]:
+    result = subprocess.run([sys.executable, '-c', _READY_SCRIPT, config_path],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _summary(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {}
+    for key, value in runs[0].items():
+        if isinstance(value, float):
+            values = [run[key] for run in runs]
+            summary[key] = {'median': statistics.median(values), 'min': min(values)}
+        else:
+            summary[key] = value
+    return summary
+
+
+def run(repeat: int = 5, patterns: int = 500) -> Dict[str, Any]:
+    results: Dict[str, Any] = {'imports': {}}
+    for module in MODULES:
+        runs = [import_times(module) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r['module_ms'])
+        best['module_ms_median'] = statistics.median(r['module_ms'] for r in runs)
+        results['imports'][module] = best
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as directory:
+        config_path = write_fixture(directory, patterns)
+        catalog_path = os.path.join(directory, DEFAULT_CATALOG_NAME)
+        cold, warm = [], []
+        for _ in range(repeat):
+            if os.path.exists(catalog_path):
+                os.remove(catalog_path)
+            cold.append(time_to_ready(config_path))
+            warm.append(time_to_ready(config_path))
+        results['ready_cold'] = _summary(cold)
+        results['ready_warm'] = _summary(warm)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--patterns', type=int, default=500, help="Synthetic pattern files to discover")
+    parser.add_argument('--json', help="Write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.patterns)
+    for module, result in results['imports'].items():
+        print(f"import {module:>15}: {result['module_ms']:7.1f} ms (median {result['module_ms_median']:.1f}), "
+              f"{result['modules']} modules, numpy {'loaded' if result['numpy'] else 'not loaded'}")
+        print("    slowest: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in result['slowest_self_ms'].items()))
+    for name in ('ready_cold', 'ready_warm'):
+        result = results[name]
+        print(f"{name:>22}: import {result['import_ms']['median']:6.1f} ms, "
+              f"constructor {result['construct_ms']['median']:6.1f} ms, "
+              f"patterns ready {result['ready_ms']['median']:6.1f} ms ({args.patterns} patterns, "
+              f"{result['events_loaded']} events loaded)")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'patterns': args.patterns, 'results': results}, f, indent=2)
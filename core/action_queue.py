@@ -0,0 +1,156 @@
+"""Durable queue of suggested actions.
+
+The copilot appends actions to suggested_actions.txt; the simulator used to
+consume them by rewriting the file without its first line, which costs a
+full rewrite per action and loses lines the plugin appends in between.
+ActionQueue leaves the file alone: it tails it with an ActionFileWatcher
+and records how far it has consumed in a small cursor file (the offset just
+past the last consumed line, plus a fingerprint of the bytes before it).
+
+On restart the cursor is validated against the file and consumption
+resumes right after the last committed action, so nothing is replayed or
+skipped. If the file no longer matches the cursor (it was replaced or
+rewritten by the plugin), every line of the new content is pending.
+
+Consumers take() all pending actions at once and commit() each one as they
+start it; the cursor file is replaced atomically, so a crash leaves either
+the old or the new cursor. When the file is replaced, lines taken from its
+previous content can no longer be committed, so a late commit cannot move
+the cursor past the new content.
+
+Delivery is at-most-once by design: the simulator and the orchestrator
+commit an action before replaying it, so an action interrupted by a crash
+is dropped rather than replayed a second time (repeating a buy or sell in
+the game is worse than missing one). A consumer that wants at-least-once
+delivery commits after its work instead.
+"""
+import os
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+from core.action_watcher import ActionFileWatcher, ActionLine
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SUFFIX = '.cursor'
+
+
+class ActionQueue:
+    """Pending lines of an append-only actions file, with a persistent consume cursor.
+    Actions are delivered at most once when committed before they are acted on."""
+
+    def __init__(self, path: str, cursor_path: Optional[str] = None, parse: Optional[Callable[[str], Any]] = None,
+                 backend: str = 'auto', poll_interval: float = 0.1):
+        self.path = os.path.abspath(path)
+        self.cursor_path = os.path.abspath(cursor_path) if cursor_path else self.path + CURSOR_SUFFIX
+        self.watcher = ActionFileWatcher(self.path, parse=parse, backend=backend, poll_interval=poll_interval)
+        self.watcher.subscribe(self._on_lines, positions=True)
+        self._pending: Deque[ActionLine] = deque()
+        # Guards _pending, _taken and _committed, shared by the watcher and consumer threads
+        self._condition = threading.Condition()
+        self._committed: Optional[ActionLine] = None
+        # Taken, uncommitted lines of the current file content, oldest first
+        self._taken: Deque[ActionLine] = deque()
+        # Serializes cursor file writes
+        self._cursor_lock = threading.Lock()
+        self._opened = False
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    @property
+    def committed_offset(self) -> int:
+        with self._condition:
+            return self._committed.end_offset if self._committed else 0
+
+    def open(self) -> None:
+        """Load the cursor and read the actions pending in the file (no background thread)."""
+        if self._opened:
+            return
+        cursor = self._load_cursor()
+        if cursor is not None:
+            with self._condition:
+                self._committed = cursor
+            self.watcher.seek(cursor.end_offset, cursor.fingerprint)
+        self.watcher.check(final=True)
+        self._opened = True
+
+    def start(self) -> None:
+        """Open the queue and follow the file on the watcher thread."""
+        self.open()
+        self.watcher.start(from_start=True)
+
+    def stop(self) -> None:
+        self.watcher.stop()
+
+    def peek(self) -> Optional[ActionLine]:
+        with self._condition:
+            return self._pending[0] if self._pending else None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until an action is pending (or timeout). Returns whether one is."""
+        with self._condition:
+            return self._condition.wait_for(lambda: bool(self._pending), timeout)
+
+    def take(self, max_items: Optional[int] = None) -> List[ActionLine]:
+        """Remove and return the pending actions (at most max_items), oldest first.
+        They stay uncommitted until commit() is called for them."""
+        with self._condition:
+            count = len(self._pending) if max_items is None else min(max_items, len(self._pending))
+            taken = [self._pending.popleft() for _ in range(count)]
+            self._taken.extend(taken)
+            return taken
+
+    def commit(self, line: ActionLine) -> None:
+        """Record line, a line returned by take(), and every line before it as consumed.
+        Lines already covered by a commit, or taken before the file was replaced, are ignored."""
+        with self._cursor_lock:
+            with self._condition:
+                if not self._release(line):
+                    return
+                self._committed = line
+            tmp_path = f"{self.cursor_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'offset': line.end_offset, 'fingerprint': line.fingerprint.hex()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.cursor_path)
+
+    def _release(self, line: ActionLine) -> bool:
+        """Drop line and the lines taken before it from _taken; False if it is not there."""
+        for position, taken in enumerate(self._taken):
+            if taken is line:
+                for _ in range(position + 1):
+                    self._taken.popleft()
+                return True
+            if taken.end_offset > line.end_offset:
+                break
+        return False
+
+    def _load_cursor(self) -> Optional[ActionLine]:
+        try:
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return ActionLine(None, int(data['offset']), bytes.fromhex(data['fingerprint']))
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Ignoring unreadable action cursor {self.cursor_path}: {str(e)}")
+            return None
+
+    def _on_lines(self, lines: List[ActionLine], reset: bool) -> None:
+        with self._condition:
+            if reset:
+                if self._committed is not None and self._committed.end_offset:
+                    logger.info(f"{self.path} no longer matches the consumed position; "
+                                f"treating its {len(lines)} lines as new actions")
+                    self._committed = None
+                self._pending.clear()
+                self._taken.clear()
+            self._pending.extend(lines)
+            if self._pending:
+                self._condition.notify_all()
@@ -0,0 +1,295 @@
+"""Event-driven tailing of the copilot's suggested_actions.txt.
+
+The watcher keeps the byte offset of what it has already consumed and, on
+every change, reads only the bytes appended since then. Complete lines are
+parsed and handed to subscribers as one batch. A trailing line without a
+newline is delivered once the writer is done with it (the file is closed,
+or it stayed unchanged for one poll interval). When the file is replaced,
+truncated or rewritten in place, the watcher starts over at offset 0 and
+tells subscribers the batch is the file's whole content (reset=True).
+A file replaced by one that starts with the same content (e.g. rewritten
+through a rename with lines appended) is still read as an append.
+
+Subscribers registered with positions=True get ActionLine tuples carrying
+the offset just past each line and a fingerprint of the bytes before it;
+persisting them and passing them to seek() resumes after a restart.
+
+Two backends are available:
+
+    inotify  Linux only. An inotify watch on the file's directory; changes
+             are pushed by the kernel, so there is no polling delay.
+    poll     os.stat() every poll_interval seconds; the file is only read
+             when its size or modification time changed.
+
+'auto' picks inotify on Linux and falls back to polling elsewhere or if the
+watch cannot be installed. Every detected change also sets the `changed`
+event, for consumers that only need a wake-up.
+"""
+import os
+import sys
+import select
+import struct
+import logging
+import threading
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ActionSubscriber = Callable[[List[Any], bool], None]
+
+BACKENDS = ('auto', 'inotify', 'poll')
+
+# Bytes before the consumed offset compared on every read to tell appends from in-place rewrites
+FINGERPRINT_BYTES = 64
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class ActionLine(NamedTuple):
+    action: Any
+    end_offset: int      # file offset just past the line
+    fingerprint: bytes   # up to FINGERPRINT_BYTES bytes ending at end_offset
+
+
+class ActionFileWatcher:
+    """Tails a suggested-actions file and publishes new lines to subscribers."""
+
+    def __init__(self, path: str, parse: Optional[Callable[[str], Any]] = None, backend: str = 'auto',
+                 poll_interval: float = 0.1):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown watch backend {backend!r}; expected one of {BACKENDS}")
+        self.path = os.path.abspath(path)
+        self.parse = parse
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.changed = threading.Event()
+        self.active_backend: Optional[str] = None
+        self._subscribers: List[Tuple[ActionSubscriber, bool]] = []
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._identity: Optional[Tuple[int, int]] = None
+        self._fingerprint = b''
+        self._stat: Optional[Tuple[int, int]] = None
+        self._stop_event = threading.Event()
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    # ---- public API -------------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def offset(self) -> int:
+        """Bytes of the file consumed so far."""
+        return self._offset
+
+    def subscribe(self, subscriber: ActionSubscriber, positions: bool = False) -> None:
+        """Call subscriber(actions, reset) from the watcher thread for every batch of new lines.
+        With positions, actions are ActionLine tuples."""
+        self._subscribers.append((subscriber, positions))
+
+    def seek(self, offset: int, fingerprint: bytes) -> None:
+        """Continue after a previously consumed position (an ActionLine's end_offset and
+        fingerprint). If the file no longer matches, the next batch is a reset."""
+        with self._lock:
+            self._offset, self._fingerprint = offset, fingerprint
+            self._identity, self._stat = None, None
+
+    def start(self, from_start: bool = False) -> None:
+        """Start watching. Existing content (from the seek() position, if any) is delivered
+        first if from_start, otherwise only lines written from now on are."""
+        if self.is_running:
+            return
+        if not from_start:
+            self._skip_to_end()
+        self._stop_event.clear()
+        self._started.clear()
+        use_inotify = self.backend == 'inotify' or (self.backend == 'auto' and sys.platform.startswith('linux'))
+        target = self._run_inotify if use_inotify else self._run_poll
+        self._thread = threading.Thread(target=target, name='ActionFileWatcher', daemon=True)
+        self._thread.start()
+        self._started.wait(1.0)
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b'x')
+        self._thread.join(timeout)
+        self._thread = None
+
+    def check(self, final: bool = True) -> bool:
+        """Read whatever was written since the last check and deliver it.
+        A trailing partial line is only consumed if final. Returns whether anything was delivered."""
+        with self._lock:
+            lines, reset = self._read_new(final)
+        if not lines and not reset:
+            return False
+        self.changed.set()
+        actions = [line.action for line in lines]
+        for subscriber, positions in self._subscribers:
+            try:
+                subscriber(lines if positions else actions, reset)
+            except Exception as e:
+                logger.error(f"Action subscriber error: {str(e)}")
+        return True
+
+    # ---- reading ----------------------------------------------------------
+
+    def _skip_to_end(self) -> None:
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    st = os.fstat(f.fileno())
+                    self._offset = st.st_size
+                    self._identity = (st.st_dev, st.st_ino)
+                    f.seek(max(0, st.st_size - FINGERPRINT_BYTES))
+                    self._fingerprint = f.read(FINGERPRINT_BYTES)
+                    self._stat = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                self._offset, self._identity, self._fingerprint, self._stat = 0, None, b'', None
+
+    def _parse_lines(self, data: bytes, start: int, before: bytes) -> List[ActionLine]:
+        """Lines of data, read at offset start and preceded in the file by before."""
+        lines = []
+        pos = 0
+        for raw in data.split(b'\n'):
+            end = min(pos + len(raw) + 1, len(data))
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line:
+                action: Any = line
+                if self.parse is not None:
+                    try:
+                        action = self.parse(line)
+                    except Exception as e:
+                        logger.error(f"Cannot parse action line {line!r}: {str(e)}")
+                        action = None
+                if action is not None:
+                    fingerprint = data[max(0, end - FINGERPRINT_BYTES):end]
+                    if len(fingerprint) < FINGERPRINT_BYTES:
+                        fingerprint = (before + fingerprint)[-FINGERPRINT_BYTES:]
+                    lines.append(ActionLine(action, start + end, fingerprint))
+            pos = end
+        return lines
+
+    def _read_new(self, final: bool) -> Tuple[List[ActionLine], bool]:
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            reset = self._identity is not None
+            self._offset, self._identity, self._fingerprint, self._stat = 0, None, b'', None
+            return [], reset
+        with f:
+            st = os.fstat(f.fileno())
+            self._stat = (st.st_size, st.st_mtime_ns)
+            identity = (st.st_dev, st.st_ino)
+            if st.st_size < self._offset:
+                reset = True
+            elif self._offset and self._fingerprint:
+                # Rewrites (in place or by rename) are told apart from appends by the bytes before the offset
+                f.seek(self._offset - len(self._fingerprint))
+                reset = f.read(len(self._fingerprint)) != self._fingerprint
+            else:
+                reset = identity != self._identity
+            start = 0 if reset else self._offset
+            if st.st_size == start and not reset:
+                return [], False
+            f.seek(start)
+            data = f.read(st.st_size - start)
+
+        end = len(data) if final else data.rfind(b'\n') + 1
+        consumed = data[:end]
+        before = b'' if reset else self._fingerprint
+        self._identity = identity
+        self._offset = start + len(consumed)
+        self._fingerprint = (before + consumed)[-FINGERPRINT_BYTES:]
+        return self._parse_lines(consumed, start, before), reset
+
+    # ---- watcher thread ---------------------------------------------------
+
+    def _file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _run_poll(self) -> None:
+        self.active_backend = 'poll'
+        self._started.set()
+        while True:
+            if self._file_stat() != self._stat:
+                self.check(final=False)
+            elif self._stat is not None and self._offset < self._stat[0]:
+                # The partial last line stayed unchanged for a whole interval
+                self.check(final=True)
+            if self._stop_event.wait(self.poll_interval):
+                break
+
+    def _run_inotify(self) -> None:
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        except (OSError, AttributeError) as e:
+            logger.info(f"inotify unavailable ({str(e)}); polling {self.path} instead")
+            self._run_poll()
+            return
+        directory = os.path.dirname(self.path)
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            logger.warning(f"Cannot watch {directory}; polling {self.path} instead")
+            os.close(fd)
+            self._run_poll()
+            return
+
+        self.active_backend = 'inotify'
+        name = os.fsencode(os.path.basename(self.path))
+        self._wake_r, self._wake_w = os.pipe()
+        self._started.set()
+        try:
+            self.check(final=True)
+            while not self._stop_event.is_set():
+                # With a partial last line pending, give the writer one poll interval to finish it
+                partial = self._stat is not None and self._offset < self._stat[0]
+                readable, _, _ = select.select([fd, self._wake_r], [], [], self.poll_interval if partial else None)
+                if self._stop_event.is_set():
+                    break
+                if not readable:
+                    self.check(final=True)
+                    continue
+                mask_seen = 0
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                pos = 0
+                while pos + _EVENT_HEADER.size <= len(data):
+                    _wd, event_mask, _cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+                    event_name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length].rstrip(b'\0')
+                    pos += _EVENT_HEADER.size + length
+                    if event_name == name or event_mask & IN_Q_OVERFLOW:
+                        mask_seen |= event_mask
+                if mask_seen:
+                    self.check(final=not (mask_seen & IN_MODIFY) or bool(mask_seen & IN_CLOSE_WRITE))
+        finally:
+            os.close(fd)
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self._wake_r = self._wake_w = None
@@ -0,0 +1,104 @@
+"""Off-hook processing of raw input events.
+
+Listener callbacks only push a raw (kind, t_ns, x, y, payload) tuple into
+their own queue. A worker thread drains all queues every few milliseconds,
+merges the streams by timestamp and hands each raw event to a handler, so
+derived metrics, pause detection and storage never run inside the OS input
+hook and all state is mutated from a single thread.
+
+Events are held back for a short reorder window before being emitted, which
+makes the merged order deterministic even when one listener thread
+delivers slightly later than another.
+"""
+import time
+import heapq
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+RawEvent = Tuple[int, int, int, int, Any]
+
+# Raw event kinds
+RAW_MOVE = 0
+RAW_CLICK_PRESS = 1
+RAW_CLICK_RELEASE = 2
+RAW_KEY_PRESS = 3
+RAW_KEY_RELEASE = 4
+RAW_CONTROL = 5  # non-input markers (e.g. action changes) ordered with the input
+
+
+class CaptureMerger:
+    """Per-source raw event queues merged by timestamp on a worker thread."""
+
+    def __init__(self, handler: Callable[[RawEvent], None],
+                 sources: Iterable[str] = ('mouse', 'keyboard', 'control'),
+                 reorder_window: float = 0.005, poll_interval: float = 0.002):
+        self.handler = handler
+        self.queues: Dict[str, 'queue.SimpleQueue'] = {name: queue.SimpleQueue() for name in sources}
+        self.reorder_window_ns = int(reorder_window * 1e9)
+        self.poll_interval = poll_interval
+
+        self._pending: List[Tuple[int, int, RawEvent]] = []
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed = 0
+        self.max_pending = 0
+
+    def queue(self, source: str) -> 'queue.SimpleQueue':
+        """The queue a listener pushes its raw events into (put is thread-safe and lock-free)."""
+        return self.queues[source]
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='CaptureMerger', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after processing everything already queued."""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Capture merger did not stop in time")
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.poll_interval):
+            self._drain()
+            self._emit(time.time_ns() - self.reorder_window_ns)
+        self._drain()
+        self._emit(None)
+
+    def _drain(self) -> None:
+        pending = self._pending
+        for source_queue in self.queues.values():
+            while True:
+                try:
+                    raw = source_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._seq += 1
+                heapq.heappush(pending, (raw[1], self._seq, raw))
+        if len(pending) > self.max_pending:
+            self.max_pending = len(pending)
+
+    def _emit(self, horizon_ns: Optional[int]) -> None:
+        pending = self._pending
+        while pending and (horizon_ns is None or pending[0][0] <= horizon_ns):
+            raw = heapq.heappop(pending)[2]
+            try:
+                self.handler(raw)
+            except Exception as e:
+                logger.error(f"Error processing raw input event {raw!r}: {str(e)}", exc_info=True)
+            self.processed += 1
@@ -0,0 +1,94 @@
+"""Parser for the copilot's action lines.
+
+A suggested_actions.txt line is
+
+    [<timestamp> - ]<action type>[ [<box id>]][.]
+
+for example "2024-05-01 12:00:03 - Buy item [3]." or "Collect items". The
+optional timestamp is a date and/or time followed by " - "; a " - " inside
+the action type itself is kept. The box id is only recognised as a
+bracketed integer at the end of the line, and trailing periods are dropped.
+
+parse_command() is memoized: the same line seen again (the recorder and the
+simulator both see every line, and a line may be read more than once) is a
+dictionary lookup. Timestamps make most lines distinct, but the action part
+after them repeats, so it is memoized separately; the "YYYY-MM-DD HH:MM:SS"
+timestamps the copilot writes are recognised by a cheaper pattern than the
+general one.
+
+This module has no dependencies outside the standard library, so any entry
+point can parse action lines without loading the pattern catalog.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+_TIME = r'\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?'
+_DATE = r'\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}'
+_TIMESTAMP_RE = re.compile(rf'\s*((?:{_DATE})(?:[ T]{_TIME})?|{_TIME})\s+-\s+')
+# A subset of _TIMESTAMP_RE's timestamps, for the " - " separated fast path
+_COMMON_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', re.ASCII)
+
+# Distinct lines kept by the parse cache
+CACHE_SIZE = 4096
+
+
+def normalize_action_type(action_type: str) -> str:
+    """Canonical form of an action type, shared by filenames and action lines."""
+    sanitized = "".join(c if c.isalnum() or c in ('_', '-') else '_' for c in action_type.strip())
+    return sanitized.lower()
+
+
+class Command(NamedTuple):
+    """One parsed action line."""
+    action_type: str
+    box_id: Optional[int] = None
+    timestamp: Optional[str] = None
+    line: str = ''
+
+    @property
+    def key(self) -> str:
+        """Normalized action type, as used by the pattern catalog."""
+        return normalize_action_type(self.action_type)
+
+    def describe(self) -> str:
+        return self.action_type + (f" in box {self.box_id}" if self.box_id is not None else "")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_action(text: str) -> Tuple[str, Optional[int]]:
+    """(action type, box id) of a line without its timestamp."""
+    action_type = text.lstrip().rstrip(' .')
+    box_id = None
+    # Only a bracketed integer at the very end is a box id
+    if action_type[-1:] == ']':
+        start = action_type.rfind('[')
+        if start >= 0:
+            digits = action_type[start + 1:-1].strip()
+            if digits.isdecimal():
+                box_id = int(digits)
+                action_type = action_type[:start].rstrip(' .')
+    return action_type, box_id
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_command(line: str) -> Optional[Command]:
+    """Parse an action line. Returns None for blank lines and lines without an action type."""
+    stripped = line.strip()
+    timestamp = None
+    rest = stripped
+    # Only lines starting with a digit and containing a dash can carry a timestamp
+    if '-' in stripped and stripped[:1].isdigit():
+        head, separator, tail = stripped.partition(' - ')
+        if separator and _COMMON_TIMESTAMP_RE.fullmatch(head):
+            timestamp, rest = head, tail
+        else:
+            match = _TIMESTAMP_RE.match(stripped)
+            if match is not None:
+                timestamp = match.group(1)
+                rest = stripped[match.end():]
+    action_type, box_id = _parse_action(rest)
+    if not action_type:
+        return None
+    # tuple.__new__ skips the generated Command.__new__, a Python-level call
+    return tuple.__new__(Command, (action_type, box_id, timestamp, stripped))
@@ -0,0 +1,112 @@
+"""Single-copy event store for the recorder.
+
+Every captured event is stored exactly once. Action segments are (start,
+end) ranges of absolute event indices, and callers get read-only sequence
+views instead of copies. Once a segment has been persisted it is evicted,
+and events that no live segment needs are dropped, so the store holds
+roughly the active action instead of the whole session.
+"""
+import threading
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class EventView(Sequence):
+    """Read-only view of a contiguous range of a store's events."""
+
+    def __init__(self, events: Sequence, offset: int, length: int):
+        # events is the store's backing sequence at the time the view was made;
+        # eviction swaps in a new one, so existing views stay valid.
+        self._events = events
+        self._offset = offset
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            return [self._events[self._offset + i] for i in range(start, stop, step)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("event view index out of range")
+        return self._events[self._offset + index]
+
+    def __iter__(self):
+        events, offset = self._events, self._offset
+        for i in range(offset, offset + self._length):
+            yield events[i]
+
+
+class EventStore:
+    """Append-only event store with per-segment views and eviction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: List[Any] = []
+        self._base = 0  # absolute index of self._events[0]
+        self._segments: Dict[Any, List[Optional[int]]] = {}
+
+    def __len__(self) -> int:
+        """Number of events appended since the store was created or cleared."""
+        return self._base + len(self._events)
+
+    @property
+    def retained(self) -> int:
+        """Number of events currently held in memory."""
+        return len(self._events)
+
+    def append(self, event: Any) -> int:
+        with self._lock:
+            self._events.append(event)
+            return self._base + len(self._events) - 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events = []
+            self._base = 0
+            self._segments.clear()
+
+    def begin_segment(self, segment_id: Any) -> None:
+        with self._lock:
+            self._segments[segment_id] = [self._base + len(self._events), None]
+
+    def end_segment(self, segment_id: Any) -> None:
+        with self._lock:
+            bounds = self._segments.get(segment_id)
+            if bounds is not None and bounds[1] is None:
+                bounds[1] = self._base + len(self._events)
+
+    def segment_bounds(self, segment_id: Any) -> Tuple[int, int]:
+        with self._lock:
+            start, end = self._segments[segment_id]
+            return start, end if end is not None else self._base + len(self._events)
+
+    def segment_view(self, segment_id: Any) -> EventView:
+        start, end = self.segment_bounds(segment_id)
+        return self.view(start, end)
+
+    def view(self, start: Optional[int] = None, end: Optional[int] = None) -> EventView:
+        """View of events [start, end) by absolute index (defaults: everything retained)."""
+        with self._lock:
+            total = self._base + len(self._events)
+            start = self._base if start is None else start
+            end = total if end is None else end
+            if start < self._base:
+                raise IndexError(f"Events before index {self._base} were already evicted")
+            end = min(end, total)
+            return EventView(self._events, start - self._base, max(0, end - start))
+
+    def evict_segment(self, segment_id: Any) -> None:
+        """Forget a persisted segment and drop events no live segment still needs."""
+        with self._lock:
+            self._segments.pop(segment_id, None)
+            total = self._base + len(self._events)
+            keep_from = min((start for start, _ in self._segments.values()), default=total)
+            drop = keep_from - self._base
+            if drop > 0:
+                # Rebind instead of deleting in place so outstanding views stay valid
+                self._events = self._events[drop:]
+                self._base = keep_from
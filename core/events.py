@@ -0,0 +1,88 @@
+"""Compact in-memory event representation.
+
+Recorder callbacks and the replay path work with Event, a __slots__ record,
+instead of building a dict per input event. Conversion to the dict schema
+used by JSON patterns and the recording log happens only at those export
+boundaries (to_dict/from_dict). Movement metrics are not stored; they are
+derived from the raw samples by core.movement_metrics.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+EVENT_TYPES: Tuple[str, ...] = (
+    'mouse_move',
+    'mouse_click_press',
+    'mouse_click_release',
+    'key_press',
+    'key_release',
+    'pause',
+)
+TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+MOUSE_MOVE = TYPE_CODES['mouse_move']
+MOUSE_PRESS = TYPE_CODES['mouse_click_press']
+MOUSE_RELEASE = TYPE_CODES['mouse_click_release']
+KEY_PRESS = TYPE_CODES['key_press']
+KEY_RELEASE = TYPE_CODES['key_release']
+PAUSE = TYPE_CODES['pause']
+
+# Columns of core.movement_metrics arrays, matching the legacy movement_metrics dict
+METRIC_FIELDS: Tuple[str, ...] = ('dt', 'distance', 'speed', 'angle', 'dx', 'dy')
+
+
+class Event:
+    """One recorded input event.
+
+    symbol is the button name for clicks and the key name for key events;
+    hold_ms is the hold duration of releases and the duration of pauses
+    (-1 when absent).
+    """
+
+    __slots__ = ('type_code', 'time_offset_ms', 'x', 'y', 'symbol', 'hold_ms', 'timestamp')
+
+    def __init__(self, type_code: int, time_offset_ms: int, x: int = 0, y: int = 0,
+                 symbol: Optional[str] = None, hold_ms: int = -1, timestamp: Optional[float] = None):
+        self.type_code = type_code
+        self.time_offset_ms = time_offset_ms
+        self.x = x
+        self.y = y
+        self.symbol = symbol
+        self.hold_ms = hold_ms
+        self.timestamp = timestamp
+
+    @property
+    def type(self) -> str:
+        return EVENT_TYPES[self.type_code]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Export to the dict schema used by JSON patterns."""
+        type_code = self.type_code
+        event: Dict[str, Any] = {'type': EVENT_TYPES[type_code], 'time_offset_ms': self.time_offset_ms}
+        if type_code in (KEY_PRESS, KEY_RELEASE):
+            event['key'] = self.symbol
+        else:
+            event['x'] = self.x
+            event['y'] = self.y
+            if type_code in (MOUSE_PRESS, MOUSE_RELEASE):
+                event['button'] = self.symbol
+        if self.hold_ms >= 0:
+            event['duration_ms' if type_code == PAUSE else 'hold_duration_ms'] = self.hold_ms
+        if self.timestamp is not None:
+            event['timestamp'] = self.timestamp
+        return event
+
+    @classmethod
+    def from_dict(cls, event: Dict[str, Any]) -> 'Event':
+        """Import a JSON-schema dict; legacy movement_metrics entries are ignored."""
+        type_code = TYPE_CODES[event['type']]
+        hold = event.get('duration_ms' if type_code == PAUSE else 'hold_duration_ms', -1)
+        return cls(type_code, event['time_offset_ms'], event.get('x', 0), event.get('y', 0),
+                   event.get('button', event.get('key')), hold, event.get('timestamp'))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Event({fields})"
@@ -0,0 +1,166 @@
+"""Background game-window focus monitor.
+
+Focus state is tracked on its own thread and published through a
+threading.Event, so the replay loop never queries the window manager:
+checking focus is an Event.is_set() call, and a paused replay blocks on
+wait_focused() and resumes as soon as the game window is active again.
+
+Two backends are available:
+
+    winevent  Windows only. A SetWinEventHook(EVENT_SYSTEM_FOREGROUND) hook
+              with its own message loop; focus changes are pushed by the OS.
+    poll      Queries the active window title (pygetwindow) every
+              poll_interval seconds. Works wherever pygetwindow does.
+
+'auto' picks winevent on Windows and falls back to polling elsewhere or if
+the hook cannot be installed.
+"""
+import sys
+import logging
+import threading
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TitleProvider = Callable[[], Optional[str]]
+FocusListener = Callable[[bool], None]
+
+BACKENDS = ('auto', 'winevent', 'poll')
+
+
+def active_window_title() -> Optional[str]:
+    """Title of the active window, via pygetwindow (imported on first use)."""
+    import pygetwindow as gw
+    window = gw.getActiveWindow()
+    return window.title if window else None
+
+
+class FocusMonitor:
+    """Publishes whether the game window is in the foreground."""
+
+    def __init__(self, window_title: str, poll_interval: float = 0.05, backend: str = 'auto',
+                 title_provider: Optional[TitleProvider] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown focus backend {backend!r}; expected one of {BACKENDS}")
+        self.window_title = window_title
+        self.poll_interval = poll_interval
+        self.backend = backend
+        self.title_provider = title_provider or active_window_title
+        self.focused = threading.Event()
+        self.active_backend: Optional[str] = None
+        self._listeners: List[FocusListener] = []
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id: Optional[int] = None
+        self._started = threading.Event()
+
+    # ---- public API -------------------------------------------------------
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def is_focused(self) -> bool:
+        return self.focused.is_set()
+
+    def wait_focused(self, timeout: Optional[float] = None) -> bool:
+        """Block until the game window is focused (or timeout). Returns the focus state."""
+        return self.focused.wait(timeout)
+
+    def add_listener(self, listener: FocusListener) -> None:
+        """Call listener(focused) from the monitor thread on every focus change."""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """Start the monitor thread; returns once the initial focus state is known."""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._started.clear()
+        use_hook = self.backend == 'winevent' or (self.backend == 'auto' and sys.platform == 'win32')
+        target = self._run_winevent if use_hook else self._run_poll
+        self._thread = threading.Thread(target=target, name='FocusMonitor', daemon=True)
+        self._thread.start()
+        self._started.wait(1.0)
+
+    def stop(self, timeout: Optional[float] = 1.0) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        if self.active_backend == 'winevent' and self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, 0x0012, 0, 0)  # WM_QUIT
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ---- monitor thread ---------------------------------------------------
+
+    def _publish(self, title: Optional[str]) -> None:
+        focused = bool(title) and self.window_title in title
+        if focused == self.focused.is_set():
+            return
+        if focused:
+            self.focused.set()
+        else:
+            self.focused.clear()
+        logger.debug(f"Game window {'gained' if focused else 'lost'} focus ({title!r})")
+        for listener in self._listeners:
+            try:
+                listener(focused)
+            except Exception as e:
+                logger.error(f"Focus listener error: {str(e)}")
+
+    def _poll_once(self) -> None:
+        try:
+            self._publish(self.title_provider())
+        except Exception as e:
+            logger.error(f"Error checking window focus: {str(e)}")
+            self._publish(None)
+
+    def _run_poll(self) -> None:
+        self.active_backend = 'poll'
+        self._poll_once()
+        self._started.set()
+        while not self._stop_event.wait(self.poll_interval):
+            self._poll_once()
+
+    def _run_winevent(self) -> None:
+        try:
+            import ctypes
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+        except (ImportError, AttributeError) as e:
+            logger.info(f"Event-driven focus tracking unavailable ({str(e)}); polling instead")
+            self._run_poll()
+            return
+
+        def window_title(hwnd) -> Optional[str]:
+            length = user32.GetWindowTextLengthW(hwnd)
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            return buffer.value
+
+        event_system_foreground = 0x0003
+        winevent_outofcontext = 0x0000
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        callback = WinEventProc(lambda _hook, _event, hwnd, *_args: self._publish(window_title(hwnd)))
+        hook = user32.SetWinEventHook(event_system_foreground, event_system_foreground, 0, callback,
+                                      0, 0, winevent_outofcontext)
+        if not hook:
+            logger.warning("SetWinEventHook failed; polling window focus instead")
+            self._run_poll()
+            return
+
+        self.active_backend = 'winevent'
+        self._thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        self._publish(window_title(user32.GetForegroundWindow()))
+        self._started.set()
+        try:
+            msg = wintypes.MSG()
+            while not self._stop_event.is_set() and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWinEvent(hook)
+            self._thread_id = None
@@ -0,0 +1,191 @@
+"""One global keyboard hook shared by every consumer.
+
+The recorder used to run a keyboard listener for its data and another one
+for its hotkeys, and the simulator a third; every one of them is an OS
+level hook that each keystroke has to pass through. HotkeyManager installs
+a single pynput keyboard listener and fans each event out to its
+subscribers (e.g. the recorder's data capture) and to a chord matcher for
+the hotkeys.
+
+Hotkeys are written as in config.ini: 'Key.f3', '<control>+<alt>+p', 'q'.
+They are parsed once, when registered, into sets of canonical key names
+(left/right modifier variants are the same key). Per keystroke the matcher
+only checks whether the key takes part in any hotkey, a set lookup; for
+those keys, the set of held hotkey keys is looked up in the chord table.
+As with pynput's HotKey, a hotkey fires once when its last key goes down
+and not again on key repeat.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+KeyCallback = Callable[[Any], None]
+Subscription = Tuple[KeyCallback, Optional[KeyCallback]]
+
+# Different names for the same key, mapped to one canonical name
+KEY_ALIASES = {
+    'control': 'ctrl', 'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt', 'option': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift',
+    'cmd_l': 'cmd', 'cmd_r': 'cmd', 'win': 'cmd', 'super': 'cmd',
+    'return': 'enter', 'escape': 'esc',
+}
+
+
+def canonical_key(name: str) -> str:
+    name = name.strip()
+    if len(name) == 1:
+        return name.lower()
+    name = name.lower()
+    return KEY_ALIASES.get(name, name)
+
+
+def key_name(key: Any) -> str:
+    """Canonical name of a pynput key (Key member or KeyCode) or of a key name string."""
+    if isinstance(key, str):
+        return canonical_key(key[4:] if key.startswith('Key.') else key)
+    name = getattr(key, 'name', None)
+    if name:
+        # pynput.keyboard.Key member
+        return KEY_ALIASES.get(name, name)
+    char = getattr(key, 'char', None)
+    if char and char.isprintable():
+        return char.lower()
+    # With Ctrl held, Windows reports letters as control characters; the virtual key still names them
+    vk = getattr(key, 'vk', None)
+    if vk is not None:
+        if 0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5A:
+            return chr(vk).lower()
+        return f"vk{vk}"
+    return str(key)
+
+
+def parse_hotkey(spec: str) -> FrozenSet[str]:
+    """Parse 'Key.f3', '<f3>', '<control>+<alt>+p' or 'q' into a set of canonical key names."""
+    keys = []
+    for part in spec.split('+'):
+        part = part.strip()
+        if part.startswith('Key.') and len(part) > 4:
+            part = part[4:]
+        elif part.startswith('<') and part.endswith('>') and len(part) > 2:
+            part = part[1:-1]
+        elif len(part) != 1:
+            raise ValueError(f"Invalid key {part!r} in hotkey {spec!r}")
+        keys.append(canonical_key(part))
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Repeated key in hotkey {spec!r}")
+    return frozenset(keys)
+
+
+class ChordMatcher:
+    """Precompiled hotkey chords, matched against the hotkey keys currently held."""
+
+    def __init__(self):
+        self._bindings: Dict[FrozenSet[str], List[Callable[[], None]]] = {}
+        # Every key that is part of some chord; other keys are ignored
+        self._keys: FrozenSet[str] = frozenset()
+        self._held: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._bindings)
+
+    def add(self, chord: FrozenSet[str], callback: Callable[[], None]) -> None:
+        self._bindings.setdefault(chord, []).append(callback)
+        self._keys = self._keys | chord
+
+    def remove(self, chord: FrozenSet[str], callback: Callable[[], None]) -> None:
+        callbacks = self._bindings.get(chord)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._bindings[chord]
+                self._keys = frozenset().union(*self._bindings)
+
+    def press(self, name: str) -> Sequence[Callable[[], None]]:
+        """Register a key press. Returns the callbacks of the chord it completes, if any."""
+        if name not in self._keys or name in self._held:
+            return ()
+        self._held.add(name)
+        return self._bindings.get(frozenset(self._held), ())
+
+    def release(self, name: str) -> None:
+        self._held.discard(name)
+
+    def reset(self) -> None:
+        self._held.clear()
+
+
+class HotkeyManager:
+    """Owns the process's keyboard hook; fans key events out to subscribers and hotkeys."""
+
+    def __init__(self):
+        self.matcher = ChordMatcher()
+        # Replaced, never mutated, so the hook thread iterates it without a lock
+        self._subscribers: Tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self._listener: Optional[Any] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._listener is not None and self._listener.is_alive()
+
+    def add_hotkey(self, spec: str, callback: Callable[[], None]) -> FrozenSet[str]:
+        """Call callback() on the hook thread when the hotkey is pressed. Raises ValueError
+        for an unparsable spec. Returns the parsed chord (for remove_hotkey)."""
+        chord = parse_hotkey(spec)
+        with self._lock:
+            self.matcher.add(chord, callback)
+        return chord
+
+    def remove_hotkey(self, chord: FrozenSet[str], callback: Callable[[], None]) -> None:
+        with self._lock:
+            self.matcher.remove(chord, callback)
+
+    def subscribe(self, on_press: KeyCallback, on_release: Optional[KeyCallback] = None) -> Subscription:
+        """Receive every raw key event on the hook thread. Returns a token for unsubscribe()."""
+        subscription = (on_press, on_release)
+        with self._lock:
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def start(self) -> None:
+        """Install the keyboard hook (pynput is imported here, so the module loads headless)."""
+        if self.is_running:
+            return
+        from pynput import keyboard
+        self.matcher.reset()
+        self._listener = keyboard.Listener(on_press=self.press, on_release=self.release)
+        self._listener.start()
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def press(self, key: Any) -> None:
+        """Dispatch a key press (called by the hook; callable directly to inject keys)."""
+        for on_press, _ in self._subscribers:
+            try:
+                on_press(key)
+            except Exception as e:
+                logger.error(f"Key subscriber error: {str(e)}", exc_info=True)
+        for callback in self.matcher.press(key_name(key)):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Hotkey callback error: {str(e)}", exc_info=True)
+
+    def release(self, key: Any) -> None:
+        for _, on_release in self._subscribers:
+            if on_release is not None:
+                try:
+                    on_release(key)
+                except Exception as e:
+                    logger.error(f"Key subscriber error: {str(e)}", exc_info=True)
+        self.matcher.release(key_name(key))
@@ -0,0 +1,300 @@
+"""Input backends used to replay patterns.
+
+The simulator drives input through an InputBackend instead of talking to
+pynput directly, which keeps the replay path importable and runnable on a
+headless machine. Backends are selected with [Simulation] input_backend:
+
+    pynput     pynput mouse/keyboard controllers (default)
+    pyautogui  pyautogui moveTo/mouseDown/keyDown calls
+    null       RecordingBackend: performs no input, logs every call with a
+               monotonic timestamp into arrays (tests, benchmarks)
+
+Backends that set supports_batching buffer their calls until flush(); the
+replay loop flushes once per deadline, so operations due at the same
+instant (a move followed by a click) are delivered together.
+"""
+import abc
+import time
+import logging
+from array import array
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, Type
+
+# NumPy is only needed to read RecordingBackend's log
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Call codes logged by RecordingBackend
+CALL_MOVE = 0
+CALL_BUTTON_PRESS = 1
+CALL_BUTTON_RELEASE = 2
+CALL_KEY_PRESS = 3
+CALL_KEY_RELEASE = 4
+
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+
+class InputBackend(abc.ABC):
+    """Interface of an input backend. Targets come from resolve_key/resolve_button.
+    A backend missing one of the abstract methods fails when constructed."""
+
+    name = 'base'
+    supports_batching = False
+
+    @abc.abstractmethod
+    def resolve_key(self, key_str: str) -> Any:
+        """Map a recorded key name ('a', 'Key.enter', '<65437>') to a backend key."""
+
+    @abc.abstractmethod
+    def resolve_button(self, button_str: str) -> Any:
+        """Map a recorded button name ('Button.left') to a backend button."""
+
+    @abc.abstractmethod
+    def move(self, x: int, y: int) -> None:
+        """Move the cursor to (x, y)."""
+
+    @abc.abstractmethod
+    def press_button(self, button: Any) -> None:
+        """Press a button returned by resolve_button."""
+
+    @abc.abstractmethod
+    def release_button(self, button: Any) -> None:
+        """Release a button returned by resolve_button."""
+
+    @abc.abstractmethod
+    def press_key(self, key: Any) -> None:
+        """Press a key returned by resolve_key."""
+
+    @abc.abstractmethod
+    def release_key(self, key: Any) -> None:
+        """Release a key returned by resolve_key."""
+
+    def flush(self) -> None:
+        """Deliver buffered calls (batching backends only)."""
+
+    def screen_size(self) -> Tuple[int, int]:
+        return DEFAULT_SCREEN_SIZE
+
+    def close(self) -> None:
+        self.flush()
+
+
+def _button_name(button_str: str) -> str:
+    button_str = button_str.lower()
+    for name in ('left', 'right', 'middle'):
+        if name in button_str:
+            return name
+    return 'left'
+
+
+class PynputBackend(InputBackend):
+    """pynput mouse and keyboard controllers."""
+
+    name = 'pynput'
+
+    def __init__(self):
+        from pynput import mouse, keyboard
+        self._mouse = mouse
+        self._keyboard = keyboard
+        self.mouse_controller = mouse.Controller()
+        self.keyboard_controller = keyboard.Controller()
+
+    def resolve_key(self, key_str: str) -> Any:
+        keyboard = self._keyboard
+        name = key_str[4:] if key_str.startswith('Key.') else key_str
+        try:
+            return keyboard.Key[name]
+        except KeyError:
+            pass
+        if len(key_str) > 2 and key_str.startswith('<') and key_str.endswith('>'):
+            return keyboard.KeyCode.from_vk(int(key_str[1:-1]))
+        return keyboard.KeyCode.from_char(key_str)
+
+    def resolve_button(self, button_str: str) -> Any:
+        return getattr(self._mouse.Button, _button_name(button_str))
+
+    def move(self, x: int, y: int) -> None:
+        self.mouse_controller.position = (x, y)
+
+    def press_button(self, button: Any) -> None:
+        self.mouse_controller.press(button)
+
+    def release_button(self, button: Any) -> None:
+        self.mouse_controller.release(button)
+
+    def press_key(self, key: Any) -> None:
+        self.keyboard_controller.press(key)
+
+    def release_key(self, key: Any) -> None:
+        self.keyboard_controller.release(key)
+
+    def screen_size(self) -> Tuple[int, int]:
+        try:
+            import pyautogui
+            return tuple(pyautogui.size())
+        except Exception as e:
+            logger.error(f"Failed to get screen size: {str(e)}")
+            return DEFAULT_SCREEN_SIZE
+
+
+# pynput Key names that pyautogui spells differently
+_PYAUTOGUI_KEYS = {
+    'alt_l': 'altleft', 'alt_r': 'altright', 'alt_gr': 'altright',
+    'ctrl': 'ctrl', 'ctrl_l': 'ctrlleft', 'ctrl_r': 'ctrlright',
+    'shift_l': 'shiftleft', 'shift_r': 'shiftright',
+    'cmd': 'win', 'cmd_l': 'winleft', 'cmd_r': 'winright',
+    'page_up': 'pageup', 'page_down': 'pagedown', 'caps_lock': 'capslock',
+    'num_lock': 'numlock', 'scroll_lock': 'scrolllock', 'print_screen': 'printscreen',
+    'esc': 'esc', 'media_play_pause': 'playpause',
+}
+
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui, with its per-call PAUSE disabled (pacing is the scheduler's job)."""
+
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+        pyautogui.PAUSE = 0
+        self._pyautogui = pyautogui
+
+    def resolve_key(self, key_str: str) -> Any:
+        if key_str.startswith('Key.'):
+            name = key_str[4:]
+            return _PYAUTOGUI_KEYS.get(name, name)
+        return key_str
+
+    def resolve_button(self, button_str: str) -> Any:
+        return _button_name(button_str)
+
+    def move(self, x: int, y: int) -> None:
+        self._pyautogui.moveTo(x, y)
+
+    def press_button(self, button: Any) -> None:
+        self._pyautogui.mouseDown(button=button)
+
+    def release_button(self, button: Any) -> None:
+        self._pyautogui.mouseUp(button=button)
+
+    def press_key(self, key: Any) -> None:
+        self._pyautogui.keyDown(key)
+
+    def release_key(self, key: Any) -> None:
+        self._pyautogui.keyUp(key)
+
+    def screen_size(self) -> Tuple[int, int]:
+        return tuple(self._pyautogui.size())
+
+
+class RecordingBackend(InputBackend):
+    """Performs no input; logs (code, time, x, y, target) for every call.
+
+    Times come from clock (time.perf_counter by default) and are taken when
+    the call is made, even when batching defers the append to flush().
+    """
+
+    name = 'null'
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, batching: bool = True,
+                 screen: Tuple[int, int] = DEFAULT_SCREEN_SIZE):
+        self.clock = clock
+        self.supports_batching = batching
+        self._screen = screen
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop the call log."""
+        self.codes = array('B')
+        self.times = array('d')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.targets: List[Any] = []
+        self._pending: List[Tuple[int, float, int, int, Any]] = []
+        self.flushes = 0
+        self.position = (0, 0)
+
+    def resolve_key(self, key_str: str) -> Any:
+        return key_str
+
+    def resolve_button(self, button_str: str) -> Any:
+        return _button_name(button_str)
+
+    def _log(self, code: int, x: int, y: int, target: Any) -> None:
+        call = (code, self.clock(), x, y, target)
+        if self.supports_batching:
+            self._pending.append(call)
+        else:
+            self._append(call)
+
+    def _append(self, call: Tuple[int, float, int, int, Any]) -> None:
+        code, t, x, y, target = call
+        self.codes.append(code)
+        self.times.append(t)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.targets.append(target)
+
+    def move(self, x: int, y: int) -> None:
+        self.position = (x, y)
+        self._log(CALL_MOVE, x, y, None)
+
+    def press_button(self, button: Any) -> None:
+        self._log(CALL_BUTTON_PRESS, self.position[0], self.position[1], button)
+
+    def release_button(self, button: Any) -> None:
+        self._log(CALL_BUTTON_RELEASE, self.position[0], self.position[1], button)
+
+    def press_key(self, key: Any) -> None:
+        self._log(CALL_KEY_PRESS, 0, 0, key)
+
+    def release_key(self, key: Any) -> None:
+        self._log(CALL_KEY_RELEASE, 0, 0, key)
+
+    def flush(self) -> None:
+        if self._pending:
+            for call in self._pending:
+                self._append(call)
+            self._pending = []
+            self.flushes += 1
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self._screen
+
+    def __len__(self) -> int:
+        return len(self.codes) + len(self._pending)
+
+    def calls(self) -> Dict[str, 'np.ndarray']:
+        """The call log as NumPy arrays (code, time, x, y). The arrays are copies: views
+        would pin the log's buffers and make the next logged call fail."""
+        import numpy as np
+        self.flush()
+        return {
+            'code': np.frombuffer(self.codes, dtype=np.uint8).copy(),
+            'time': np.frombuffer(self.times, dtype=np.float64).copy(),
+            'x': np.frombuffer(self.xs, dtype=np.intc).copy(),
+            'y': np.frombuffer(self.ys, dtype=np.intc).copy(),
+        }
+
+    def call_counts(self) -> Dict[str, int]:
+        import numpy as np
+        counts = np.bincount(self.calls()['code'], minlength=5)
+        return {name: int(counts[code]) for code, name in enumerate(
+            ('move', 'button_press', 'button_release', 'key_press', 'key_release'))}
+
+
+BACKENDS: Dict[str, Type[InputBackend]] = {
+    'pynput': PynputBackend,
+    'pyautogui': PyAutoGUIBackend,
+    'null': RecordingBackend,
+}
+
+
+def create_backend(name: str, **kwargs: Any) -> InputBackend:
+    """Instantiate the backend registered under name."""
+    try:
+        backend_class = BACKENDS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown input backend {name!r}; expected one of {sorted(BACKENDS)}") from None
+    return backend_class(**kwargs)
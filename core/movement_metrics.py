@@ -0,0 +1,72 @@
+"""Vectorized mouse movement metrics.
+
+Patterns store raw samples only (type, time offset, x, y). The per-move
+metrics the simulator replays (dt, distance, speed, angle, dx, dy) are
+derived from consecutive mouse_move samples in one NumPy pass over a
+segment, instead of being computed with scalar math in the capture
+callback and stored in every event.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from core.events import MOUSE_MOVE, METRIC_FIELDS
+
+# Below this dt (seconds) speed is reported as 0 instead of dividing
+MIN_DT = 1e-6
+
+
+def event_columns(events: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(type, time_offset_ms, x, y) arrays for a sequence of Events.
+
+    Binary patterns expose their column arrays directly, so no Event
+    objects are built for them.
+    """
+    columns = getattr(events, 'columns', None)
+    if columns is not None:
+        return columns['type'], columns['time_offset_ms'], columns['x'], columns['y']
+    count = len(events)
+    types = np.fromiter((event.type_code for event in events), dtype=np.uint8, count=count)
+    offsets = np.fromiter((event.time_offset_ms for event in events), dtype=np.int64, count=count)
+    xs = np.fromiter((event.x for event in events), dtype=np.int64, count=count)
+    ys = np.fromiter((event.y for event in events), dtype=np.int64, count=count)
+    return types, offsets, xs, ys
+
+
+def compute_metrics(time_offset_ms: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Metrics for consecutive samples, as an (n, len(METRIC_FIELDS)) float array.
+
+    The first sample has no predecessor: its dt is measured from the start
+    of the recording and its displacement is zero.
+    """
+    t = np.asarray(time_offset_ms, dtype=np.float64) / 1000.0
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    metrics = np.zeros((len(t), len(METRIC_FIELDS)), dtype=np.float64)
+    if not len(t):
+        return metrics
+
+    dt = np.diff(t, prepend=0.0)
+    dx = np.diff(x, prepend=x[0])
+    dy = np.diff(y, prepend=y[0])
+    distance = np.hypot(dx, dy)
+    speed = np.divide(distance, dt, out=np.zeros_like(distance), where=dt > MIN_DT)
+    angle = np.degrees(np.arctan2(dy, dx))
+
+    metrics[:, 0] = dt
+    metrics[:, 1] = distance
+    metrics[:, 2] = speed
+    metrics[:, 3] = angle
+    metrics[:, 4] = dx
+    metrics[:, 5] = dy
+    return metrics
+
+
+def movement_metrics(events: Sequence) -> np.ndarray:
+    """Per-event metrics aligned with events; rows of non-move events are zero."""
+    types, offsets, xs, ys = event_columns(events)
+    metrics = np.zeros((len(types), len(METRIC_FIELDS)), dtype=np.float64)
+    moves = np.flatnonzero(types == MOUSE_MOVE)
+    if len(moves):
+        metrics[moves] = compute_metrics(offsets[moves], xs[moves], ys[moves])
+    return metrics
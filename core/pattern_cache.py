@@ -0,0 +1,123 @@
+"""Bounded LRU cache of parsed patterns.
+
+Entries are keyed by file path and validated against the file's mtime and
+size on every lookup (one stat call, no read), so a pattern that gets
+re-recorded in place is reloaded while repeated actions skip parsing
+entirely. The cache is bounded both by entry count and by an approximate
+byte budget.
+
+Values whose source never changes in place (a pattern pack record, which is
+immutable once appended) are validated against a caller supplied version
+instead: an append to the pack changes the pack file's size and mtime but
+must not evict the records already cached.
+"""
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _CacheEntry(NamedTuple):
+    version: Any  # (mtime_ns, size) of the file, or the caller's version
+    value: Any
+    nbytes: int
+
+
+def estimate_nbytes(value: Any, file_size: int) -> int:
+    """Approximate memory held by a cached value.
+
+    Objects exposing nbytes (binary patterns, compiled plans) report their
+    own size; anything else is charged its file size.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    return int(nbytes) if nbytes is not None else file_size
+
+
+class PatternCache:
+    """LRU cache with entry and byte budgets and stat-based invalidation."""
+
+    def __init__(self, max_entries: int = 32, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, filepath: str, loader: Callable[[str], Any], key: Optional[str] = None,
+            version: Any = None) -> Any:
+        """Return the cached value for filepath, (re)loading it with loader if needed.
+
+        key distinguishes several values derived from the same file (e.g. the
+        records of a pattern pack); it defaults to filepath. With a version,
+        the entry is valid while the version is unchanged and the file is not
+        stat'ed on a hit.
+        """
+        key = key or filepath
+        if version is None:
+            stat = os.stat(filepath)
+            version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                self._drop(key)
+                self.invalidations += 1
+            self.misses += 1
+
+        value = loader(filepath)
+        nbytes = estimate_nbytes(value, os.path.getsize(filepath))
+        if nbytes > self.max_bytes or self.max_entries <= 0:
+            logger.debug(f"Not caching {key}: {nbytes} bytes exceeds the cache budget")
+            return value
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _CacheEntry(version, value, nbytes)
+            self.current_bytes += nbytes
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                evicted_path, _ = next(iter(self._entries.items()))
+                self._drop(evicted_path)
+                self.evictions += 1
+        return value
+
+    def _drop(self, filepath: str) -> None:
+        entry = self._entries.pop(filepath)
+        self.current_bytes -= entry.nbytes
+
+    def invalidate(self, filepath: str) -> None:
+        with self._lock:
+            if filepath in self._entries:
+                self._drop(filepath)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, filepath: str) -> bool:
+        return filepath in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
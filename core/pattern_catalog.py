@@ -0,0 +1,192 @@
+"""Persistent catalog of pattern files.
+
+The catalog is a small SQLite database kept in the patterns directory that
+maps (action type, box id) to the pattern files recorded for it. The
+recorder adds each file as it saves it and the simulator syncs the
+directory once at startup, so resolving "the best pattern for this action"
+is an indexed lookup (memoized in memory) instead of a directory scan.
+
+Action types are compared in normalized form: the recorder's sanitized
+filenames ("Buy_an_item_box6_...") and the copilot's action lines
+("Buy an item [6].") both normalize to "buy_an_item".
+"""
+import os
+import re
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from core.command_parser import normalize_action_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_NAME = 'pattern_catalog.sqlite3'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patterns (
+    path TEXT PRIMARY KEY,
+    action_key TEXT NOT NULL,
+    action_type TEXT NOT NULL,
+    box_id INTEGER,
+    created REAL NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patterns_action ON patterns (action_key, box_id, created);
+"""
+
+# "<action>[_box<N>|_<N>]_<YYYYmmdd>_<HHMMSS>[_<micros>]" as written by the
+# recorder ("Buy_an_item_box6_...") and by older builds ("Buy an item_6_...").
+_FILENAME_RE = re.compile(
+    r'^(?P<action>.+?)(?:_box(?P<box>\d+)|_(?P<legacy_box>\d{1,3}))?_\d{8}_\d{6}(?:_\d+)?$')
+
+# Same as core.pattern_format's JSON_EXTENSION and PATTERN_EXTENSION, which are
+# not imported here: pattern_format needs NumPy, and this module is on the
+# recorder's and the simulator's import path
+JSON_EXTENSION = '.json'
+PATTERN_EXTENSION = '.agp'
+_PATTERN_EXTENSIONS = (JSON_EXTENSION, PATTERN_EXTENSION)
+
+
+def parse_pattern_filename(filename: str) -> Tuple[str, Optional[int]]:
+    """Best-effort (action_type, box_id) from a pattern filename."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = _FILENAME_RE.match(stem)
+    if not match:
+        return stem, None
+    box = match.group('box') or match.group('legacy_box')
+    return match.group('action'), int(box) if box is not None else None
+
+
+def read_pattern_key(filepath: str) -> Tuple[str, Optional[int]]:
+    """(action_type, box_id) for a pattern file.
+
+    Binary patterns carry it in their header; JSON patterns are identified by
+    filename so the (possibly large) event list never has to be parsed.
+    """
+    if filepath.endswith(PATTERN_EXTENSION):
+        from core.pattern_format import decode_header
+        try:
+            with open(filepath, 'rb') as f:
+                head = f.read(64 * 1024)
+            metadata = decode_header(head)[0].get('metadata', {})
+            action_type = metadata.get('parsed_action_type') or metadata.get('action_type')
+            if action_type:
+                return action_type, metadata.get('parsed_box_id', metadata.get('box_id'))
+        except Exception as e:
+            logger.debug(f"Could not read pattern header of {filepath}: {str(e)}")
+    return parse_pattern_filename(filepath)
+
+
+class PatternCatalog:
+    """SQLite-backed index of the pattern files in a directory."""
+
+    def __init__(self, patterns_dir: str, db_path: Optional[str] = None):
+        self.patterns_dir = os.path.abspath(patterns_dir)
+        os.makedirs(self.patterns_dir, exist_ok=True)
+        if db_path is None:
+            db_path = DEFAULT_CATALOG_NAME
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(self.patterns_dir, db_path)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._best: Dict[Tuple[str, Optional[int]], Optional[str]] = {}
+        self._data_version = self._query_data_version()
+
+    def _query_data_version(self) -> int:
+        return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _invalidate_if_changed(self) -> None:
+        # data_version changes when another connection (e.g. the recorder
+        # process) commits, which makes the memoized answers stale.
+        version = self._query_data_version()
+        if version != self._data_version:
+            self._data_version = version
+            self._best.clear()
+
+    def _relative(self, filepath: str) -> str:
+        return os.path.relpath(os.path.abspath(filepath), self.patterns_dir)
+
+    def _upsert(self, filepath: str, action_type: str, box_id: Optional[int]) -> None:
+        stat = os.stat(filepath)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO patterns (path, action_key, action_type, box_id, created, mtime_ns, size) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (self._relative(filepath), normalize_action_type(action_type), action_type, box_id,
+             stat.st_ctime, stat.st_mtime_ns, stat.st_size))
+
+    def add(self, filepath: str, action_type: Optional[str] = None, box_id: Optional[int] = None) -> None:
+        """Add or refresh one pattern file, e.g. right after the recorder saved it."""
+        if action_type is None:
+            action_type, box_id = read_pattern_key(filepath)
+        with self._lock:
+            self._upsert(filepath, action_type, box_id)
+            self._conn.commit()
+            self._best.clear()
+
+    def remove(self, filepath: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM patterns WHERE path = ?', (self._relative(filepath),))
+            self._conn.commit()
+            self._best.clear()
+
+    def sync(self) -> Tuple[int, int]:
+        """Reconcile the catalog with the directory. Returns (added_or_updated, removed)."""
+        with self._lock:
+            known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                     self._conn.execute('SELECT path, mtime_ns, size FROM patterns')}
+            present = set()
+            updated = 0
+            with os.scandir(self.patterns_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith(_PATTERN_EXTENSIONS):
+                        continue
+                    present.add(entry.name)
+                    stat = entry.stat()
+                    if known.get(entry.name) == (stat.st_mtime_ns, stat.st_size):
+                        continue
+                    action_type, box_id = read_pattern_key(entry.path)
+                    self._upsert(entry.path, action_type, box_id)
+                    updated += 1
+            removed = [(path,) for path in known if path not in present]
+            self._conn.executemany('DELETE FROM patterns WHERE path = ?', removed)
+            self._conn.commit()
+            self._best.clear()
+        if updated or removed:
+            logger.info(f"Pattern catalog synced: {updated} added/updated, {len(removed)} removed")
+        return updated, len(removed)
+
+    def best(self, action_type: str, box_id: Optional[int] = None) -> Optional[str]:
+        """Absolute path of the newest pattern for the action.
+
+        With a box_id, only patterns recorded for that box match: another
+        box's clicks land in the wrong place. Without one, a pattern recorded
+        without a box is preferred, then the newest pattern for any box.
+        """
+        key = (normalize_action_type(action_type), box_id)
+        with self._lock:
+            self._invalidate_if_changed()
+            if key in self._best:
+                return self._best[key]
+            row = self._conn.execute(
+                'SELECT path FROM patterns WHERE action_key = ? AND box_id IS ? '
+                'ORDER BY created DESC LIMIT 1', key).fetchone()
+            if row is None and box_id is None:
+                row = self._conn.execute(
+                    'SELECT path FROM patterns WHERE action_key = ? '
+                    'ORDER BY created DESC LIMIT 1', (key[0],)).fetchone()
+            result = os.path.join(self.patterns_dir, row[0]) if row else None
+            self._best[key] = result
+            return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM patterns').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,382 @@
+"""Columnar binary pattern format.
+
+A binary pattern stores a recording as fixed-width NumPy column arrays
+(type code, time offset, x, y, button/key id, hold duration) preceded by a
+small JSON header holding the recording metadata and the button/key symbol
+table. Layout of a pattern blob:
+
+    prelude   '<4sHHI'  magic, format version, flags, header length
+    header    UTF-8 JSON, space padded to an 8 byte boundary
+    columns   one array per entry of header['columns'], each 8 byte aligned
+
+Column offsets in the header are relative to the start of the blob, so a
+blob can be decoded in place from any buffer (file bytes, mmap) without
+copying the arrays.
+
+Blobs written with delta=True (format version 2, FLAG_DELTA) store the
+time offset and coordinate columns as differences from their first value
+in the narrowest integer dtype that holds them; those columns are rebuilt with a cumulative
+sum on decode, the others are still zero-copy views.
+
+Wall-clock timestamps are not stored per event. The header keeps one
+start_timestamp (derived from the first event that has one) and each
+event's timestamp is rebuilt as start_timestamp + time_offset_ms / 1000, so
+decoded timestamps are quantized to the whole milliseconds of the time
+offsets and any sub-millisecond part recorded after the first event is
+lost. Replay only uses the offsets.
+"""
+import json
+import os
+import struct
+import logging
+import argparse
+from collections.abc import Sequence
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+import numpy as np
+
+from core.events import Event, TYPE_CODES, PAUSE
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'AGEP'
+FORMAT_VERSION = 2
+# Version written for blobs without delta columns, readable by older readers
+BASE_FORMAT_VERSION = 1
+FLAG_DELTA = 0x1
+PATTERN_EXTENSION = '.agp'
+JSON_EXTENSION = '.json'
+
+_PRELUDE = struct.Struct('<4sHHI')
+_ALIGNMENT = 8
+
+# (column name, dtype). 'code' indexes the header symbol table (-1 = none),
+# 'hold_ms' holds hold_duration_ms for releases and duration_ms for pauses
+# (-1 = absent).
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('type', '<u1'),
+    ('time_offset_ms', '<u4'),
+    ('x', '<i2'),
+    ('y', '<i2'),
+    ('code', '<i2'),
+    ('hold_ms', '<i4'),
+)
+_COLUMN_DTYPES: Dict[str, str] = dict(COLUMNS)
+
+# Columns that are delta encoded when requested
+DELTA_COLUMNS = ('time_offset_ms', 'x', 'y')
+_DELTA_DTYPES = ('<i1', '<i2', '<i4', '<i8')
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+class PatternFormatError(ValueError):
+    """Raised when a buffer does not hold a valid binary pattern."""
+
+
+def _pad(length: int) -> int:
+    return (-length) % _ALIGNMENT
+
+
+def _delta_encode(values: np.ndarray) -> Tuple[int, np.ndarray]:
+    """(base, deltas): first differences from values[0] in the narrowest signed dtype that fits."""
+    if not len(values):
+        return 0, np.zeros(0, dtype=_DELTA_DTYPES[0])
+    values = values.astype(np.int64)
+    deltas = np.diff(values, prepend=values[0])
+    low, high = int(deltas.min()), int(deltas.max())
+    for dtype in _DELTA_DTYPES:
+        info = np.iinfo(np.dtype(dtype))
+        if info.min <= low and high <= info.max:
+            return int(values[0]), deltas.astype(dtype)
+    raise PatternFormatError("Delta out of range")
+
+
+def events_to_columns(events: Sequence) -> Tuple[Dict[str, np.ndarray], List[str], Optional[float]]:
+    """Convert a sequence of Events (or event dicts) into column arrays and a symbol table.
+
+    Returns (columns, symbols, start_timestamp) where start_timestamp is the
+    wall-clock time corresponding to time_offset_ms == 0, if known. Other
+    per-event timestamps are dropped (see the module docstring).
+    """
+    # Fields are gathered into lists and each column is converted once; assigning
+    # NumPy scalars one event at a time is several times slower
+    types: List[int] = []
+    offsets: List[int] = []
+    xs: List[int] = []
+    ys: List[int] = []
+    codes: List[int] = []
+    holds: List[int] = []
+    symbols: List[str] = []
+    symbol_ids: Dict[Optional[str], int] = {None: -1}
+    start_timestamp: Optional[float] = None
+
+    for event in events:
+        if isinstance(event, Event):
+            type_code, offset, symbol, timestamp = event.type_code, event.time_offset_ms, event.symbol, event.timestamp
+            x, y, hold = event.x, event.y, event.hold_ms
+        else:
+            # Same fields as Event.from_dict, without building an Event per dict
+            try:
+                type_code = TYPE_CODES[event['type']]
+                offset = event['time_offset_ms']
+            except KeyError as e:
+                raise PatternFormatError(f"Invalid event {event!r}: missing or unknown {e}") from None
+            get = event.get
+            x, y = get('x', 0), get('y', 0)
+            symbol = get('button', get('key'))
+            hold = get('duration_ms' if type_code == PAUSE else 'hold_duration_ms', -1)
+            timestamp = get('timestamp')
+
+        code = symbol_ids.get(symbol)
+        if code is None:
+            code = symbol_ids[symbol] = len(symbols)
+            symbols.append(symbol)
+
+        types.append(type_code)
+        offsets.append(offset)
+        xs.append(x)
+        ys.append(y)
+        codes.append(code)
+        holds.append(hold)
+        if start_timestamp is None and timestamp is not None:
+            start_timestamp = timestamp - offset / 1000.0
+
+    columns: Dict[str, np.ndarray] = {}
+    for name, values in (('type', types), ('time_offset_ms', offsets), ('x', xs), ('y', ys),
+                         ('code', codes), ('hold_ms', holds)):
+        dtype = np.dtype(_COLUMN_DTYPES[name])
+        wide = np.array(values, dtype=np.int64) if values else np.zeros(0, dtype=np.int64)
+        # Values that do not fit the column (e.g. coordinates beyond '<i2') are rejected, not wrapped
+        if len(wide):
+            info = np.iinfo(dtype)
+            if wide.min() < info.min or wide.max() > info.max:
+                raise PatternFormatError(f"Column {name!r} has values outside the {dtype.name} range "
+                                         f"[{info.min}, {info.max}]")
+        columns[name] = wide.astype(dtype)
+
+    return columns, symbols, start_timestamp
+
+
+def encode_pattern(events: Sequence, metadata: Optional[Dict[str, Any]] = None,
+                   delta: bool = False) -> bytes:
+    """Serialize events plus metadata into a binary pattern blob.
+
+    With delta=True the DELTA_COLUMNS are stored as narrow first differences.
+    """
+    columns, symbols, start_timestamp = events_to_columns(events)
+    count = len(events)
+    layout = [{'name': name, 'dtype': dtype, 'offset': 0} for name, dtype in COLUMNS]
+    if delta:
+        for column in layout:
+            if column['name'] in DELTA_COLUMNS:
+                base, encoded = _delta_encode(columns[column['name']])
+                columns[column['name']] = encoded
+                column['dtype'] = encoded.dtype.str
+                column['encoding'] = 'delta'
+                column['base'] = base
+
+    # Column offsets depend on the header length and the header lists the
+    # offsets, so grow the data start until the encoded header fits before it.
+    relative_offsets = []
+    data_length = 0
+    for name, _ in COLUMNS:
+        relative_offsets.append(data_length)
+        data_length += columns[name].nbytes
+        data_length += _pad(data_length)
+
+    header: Dict[str, Any] = {
+        'metadata': dict(metadata or {}),
+        'count': count,
+        'symbols': symbols,
+        'start_timestamp': start_timestamp,
+        'columns': layout,
+    }
+    data_start = _PRELUDE.size
+    while True:
+        for column, relative in zip(layout, relative_offsets):
+            column['offset'] = data_start + relative
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        needed = _PRELUDE.size + len(header_bytes)
+        needed += _pad(needed)
+        if needed <= data_start:
+            break
+        data_start = needed
+    header_bytes += b' ' * (data_start - _PRELUDE.size - len(header_bytes))
+
+    version, flags = (FORMAT_VERSION, FLAG_DELTA) if delta else (BASE_FORMAT_VERSION, 0)
+    parts = [_PRELUDE.pack(MAGIC, version, flags, len(header_bytes)), header_bytes]
+    for name, _ in COLUMNS:
+        raw = columns[name].tobytes()
+        parts.append(raw)
+        parts.append(b'\0' * _pad(len(raw)))
+    return b''.join(parts)
+
+
+def decode_header(buffer: BufferLike, offset: int = 0) -> Tuple[Dict[str, Any], int]:
+    """Parse the prelude and JSON header of a blob. Returns (header, header_end)."""
+    if len(buffer) - offset < _PRELUDE.size:
+        raise PatternFormatError("Buffer too small for a pattern prelude")
+    magic, version, _flags, header_len = _PRELUDE.unpack_from(buffer, offset)
+    if magic != MAGIC:
+        raise PatternFormatError(f"Bad pattern magic: {magic!r}")
+    if version > FORMAT_VERSION:
+        raise PatternFormatError(f"Unsupported pattern format version: {version}")
+    start = offset + _PRELUDE.size
+    header = json.loads(bytes(buffer[start:start + header_len]).decode('utf-8'))
+    return header, start + header_len
+
+
+def decode_pattern(buffer: BufferLike, offset: int = 0) -> 'Pattern':
+    """Decode a pattern blob located at offset in buffer.
+
+    The column arrays are read-only views into buffer; no data is copied,
+    except for delta encoded columns, which are rebuilt with a cumulative sum.
+    """
+    header, _ = decode_header(buffer, offset)
+    count = header['count']
+    columns = {}
+    for column in header['columns']:
+        values = np.frombuffer(
+            buffer, dtype=np.dtype(column['dtype']), count=count,
+            offset=offset + column['offset'])
+        if column.get('encoding') == 'delta':
+            values = (np.cumsum(values, dtype=np.int64) + column['base']).astype(_COLUMN_DTYPES[column['name']])
+        columns[column['name']] = values
+    return Pattern(header, columns)
+
+
+def blob_size(header: Dict[str, Any]) -> int:
+    """Total size in bytes of the blob described by header."""
+    end = 0
+    for column in header['columns']:
+        nbytes = np.dtype(column['dtype']).itemsize * header['count']
+        end = max(end, column['offset'] + nbytes + _pad(nbytes))
+    return end
+
+
+class Pattern(Sequence):
+    """A decoded binary pattern.
+
+    Behaves as a read-only sequence of Events built on access from the
+    underlying column arrays; to_events() exports the JSON dict schema.
+    """
+
+    def __init__(self, header: Dict[str, Any], columns: Dict[str, np.ndarray]):
+        self.header = header
+        self.columns = columns
+        self.symbols: List[str] = header.get('symbols', [])
+        self.start_timestamp: Optional[float] = header.get('start_timestamp')
+        self._count = header['count']
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.header.get('metadata', {})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.event(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("pattern index out of range")
+        return self.event(index)
+
+    def event(self, i: int) -> Event:
+        """Build the Event for row i."""
+        columns = self.columns
+        offset = int(columns['time_offset_ms'][i])
+        code = int(columns['code'][i])
+        return Event(
+            int(columns['type'][i]), offset, int(columns['x'][i]), int(columns['y'][i]),
+            self.symbols[code] if code >= 0 else None, int(columns['hold_ms'][i]),
+            self.start_timestamp + offset / 1000.0 if self.start_timestamp is not None else None)
+
+    def to_events(self) -> List[Dict[str, Any]]:
+        """Export every event as a JSON-schema dict."""
+        return [self.event(i).to_dict() for i in range(self._count)]
+
+
+def is_binary_pattern(filepath: str) -> bool:
+    return filepath.endswith(PATTERN_EXTENSION)
+
+
+def write_pattern(filepath: str, events: Sequence, metadata: Optional[Dict[str, Any]] = None,
+                  delta: bool = False) -> str:
+    """Write events to filepath as a binary pattern, atomically."""
+    blob = encode_pattern(events, metadata, delta)
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
+def read_pattern(filepath: str) -> Pattern:
+    """Read a binary pattern file."""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    return decode_pattern(data)
+
+
+def load_pattern_events(filepath: str) -> Tuple[Sequence, Dict[str, Any]]:
+    """Load events and metadata from either a JSON or a binary pattern file."""
+    if is_binary_pattern(filepath):
+        pattern = read_pattern(filepath)
+        return pattern, pattern.metadata
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    events = data.pop('events')
+    return events, data
+
+
+def convert_json_pattern(json_path: str, output_path: Optional[str] = None,
+                         remove_source: bool = False) -> str:
+    """Convert a JSON pattern file into the binary format."""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    events = data.pop('events')
+    if output_path is None:
+        output_path = os.path.splitext(json_path)[0] + PATTERN_EXTENSION
+    write_pattern(output_path, events, data)
+    if remove_source:
+        os.remove(json_path)
+    logger.info(f"Converted {json_path} -> {output_path} ({len(events)} events)")
+    return output_path
+
+
+def convert_directory(directory: str, remove_source: bool = False) -> List[str]:
+    """Convert every JSON pattern in directory that has no binary twin yet."""
+    converted = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(JSON_EXTENSION):
+            continue
+        json_path = os.path.join(directory, name)
+        output_path = os.path.splitext(json_path)[0] + PATTERN_EXTENSION
+        if os.path.exists(output_path):
+            continue
+        try:
+            converted.append(convert_json_pattern(json_path, output_path, remove_source))
+        except Exception as e:
+            logger.error(f"Failed to convert {json_path}: {str(e)}")
+    return converted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Convert JSON patterns to the binary pattern format.")
+    parser.add_argument('paths', nargs='+', help="JSON pattern files or pattern directories")
+    parser.add_argument('--remove-source', action='store_true', help="Delete the JSON files after conversion")
+    args = parser.parse_args()
+    for path in args.paths:
+        if os.path.isdir(path):
+            convert_directory(path, args.remove_source)
+        else:
+            convert_json_pattern(path, remove_source=args.remove_source)
@@ -0,0 +1,340 @@
+"""Append-only pattern pack store.
+
+A pack holds many binary patterns (see core/pattern_format.py) in a single
+file that readers memory-map once; patterns are decoded as zero-copy views
+into the mapping, so a whole library opens with one mmap call and its pages
+are shared by every process replaying from it.
+
+Pack layout:
+
+    file header   '<4sHH'   magic, pack version, reserved
+    records       '<4sIQ'   record magic, crc32 of blob, blob length
+                  blob      binary pattern, padded to an 8 byte boundary
+
+The index lives next to the pack (<pack>.idx) as one JSON line per record
+with the action type, box id, timestamp and byte offsets. Both files are
+only ever appended to; if the index is missing or behind the pack it is
+rebuilt from the record headers. An index line torn by a crash is
+terminated before the next line is written and skipped when read; its
+record is indexed again from the pack.
+
+Appends from several PatternPack instances or processes are serialized by
+an exclusive lock on the pack file. Under the lock a writer first indexes
+the records other writers appended since its last refresh; only bytes that
+do not form a valid record (a torn tail) are truncated.
+"""
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import logging
+import argparse
+import threading
+import contextlib
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Sequence
+
+from core.pattern_format import (
+    encode_pattern, decode_pattern, decode_header, load_pattern_events, Pattern,
+    PATTERN_EXTENSION, JSON_EXTENSION,
+)
+from core.command_parser import normalize_action_type
+
+logger = logging.getLogger(__name__)
+
+PACK_MAGIC = b'AGEK'
+PACK_VERSION = 1
+RECORD_MAGIC = b'AGER'
+INDEX_SUFFIX = '.idx'
+
+_FILE_HEADER = struct.Struct('<4sHH')
+_RECORD_HEADER = struct.Struct('<4sIQ')
+_ALIGNMENT = 8
+
+
+class PackEntry(NamedTuple):
+    action_type: str
+    box_id: Optional[int]
+    timestamp: float
+    offset: int  # offset of the pattern blob inside the pack
+    length: int  # blob length, without padding
+
+
+class PackFormatError(ValueError):
+    """Raised when a file is not a valid pattern pack."""
+
+
+def _pad(length: int) -> int:
+    return (-length) % _ALIGNMENT
+
+
+@contextlib.contextmanager
+def _exclusive_lock(f):
+    """Hold an exclusive OS lock on an open file (blocks until other writers release it)."""
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _metadata_key(metadata: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+    """Extract (action_type, box_id) from recorder or legacy pattern metadata."""
+    action_type = metadata.get('parsed_action_type') or metadata.get('action_type') or 'unknown_action'
+    box_id = metadata.get('parsed_box_id', metadata.get('box_id'))
+    return action_type.strip(), box_id
+
+
+class PatternPack:
+    """Append-only, memory-mapped store of binary patterns."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._entries: List[PackEntry] = []
+        self._offsets = set()
+        self._latest: Dict[Tuple[str, Optional[int]], PackEntry] = {}
+        # Newest entry per action for any box, for action lines without a box
+        self._latest_any: Dict[str, PackEntry] = {}
+        self._index_read_pos = 0
+        self._indexed_end = _FILE_HEADER.size
+        self._scanned_size = 0
+        self._ensure_files()
+        self.refresh()
+
+    # ---- file management -------------------------------------------------
+
+    def _ensure_files(self) -> None:
+        if not os.path.exists(self.path):
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'wb') as f:
+                f.write(_FILE_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0))
+            open(self.index_path, 'w').close()
+            return
+        with open(self.path, 'rb') as f:
+            magic, version, _ = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+        if magic != PACK_MAGIC:
+            raise PackFormatError(f"{self.path} is not a pattern pack")
+        if version > PACK_VERSION:
+            raise PackFormatError(f"Unsupported pack version: {version}")
+
+    def _mapping(self, needed_end: int) -> mmap.mmap:
+        """Return a mapping that covers at least needed_end bytes."""
+        if self._map is None or len(self._map) < needed_end:
+            # Older mappings stay alive for as long as patterns reference them.
+            with open(self.path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def close(self) -> None:
+        self._map = None
+
+    def __enter__(self) -> 'PatternPack':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---- index -----------------------------------------------------------
+
+    def _add_entry(self, entry: PackEntry) -> None:
+        # A reader may index a record from its header before the writer's own
+        # index line lands; skip the duplicate.
+        if entry.offset in self._offsets:
+            return
+        self._offsets.add(entry.offset)
+        self._entries.append(entry)
+        key = (normalize_action_type(entry.action_type), entry.box_id)
+        current = self._latest.get(key)
+        if current is None or entry.timestamp >= current.timestamp:
+            self._latest[key] = entry
+        current = self._latest_any.get(key[0])
+        if current is None or entry.timestamp >= current.timestamp:
+            self._latest_any[key[0]] = entry
+        self._indexed_end = max(self._indexed_end, entry.offset + entry.length + _pad(entry.length))
+
+    def refresh(self) -> None:
+        """Pick up records appended since the last refresh (by any process)."""
+        with self._lock:
+            self._read_index_tail()
+            pack_size = os.path.getsize(self.path)
+            if pack_size > self._indexed_end and pack_size != self._scanned_size:
+                self._rebuild_index_tail(pack_size)
+                self._scanned_size = pack_size
+
+    def _read_index_tail(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_read_pos)
+            data = f.read()
+        # Only consume complete lines; a concurrent writer may be mid-line.
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = PackEntry(**json.loads(line))
+            except (ValueError, TypeError):
+                logger.warning(f"Skipping unreadable index line in {self.index_path}")
+                continue
+            self._add_entry(entry)
+        self._index_read_pos += end
+
+    def _write_index(self, entries: Sequence[PackEntry]) -> None:
+        with open(self.index_path, 'a+b') as index:
+            size = index.seek(0, os.SEEK_END)
+            if size:
+                index.seek(size - 1)
+                if index.read(1) != b'\n':
+                    # Terminate a line torn by a crash so it is not glued to ours
+                    index.write(b'\n')
+            index.write(''.join(json.dumps(entry._asdict()) + '\n' for entry in entries).encode('utf-8'))
+
+    def _rebuild_index_tail(self, pack_size: int) -> None:
+        """Scan record headers past the indexed end and append them to the index."""
+        buffer = self._mapping(pack_size)
+        position = self._indexed_end
+        recovered = []
+        while position + _RECORD_HEADER.size <= len(buffer):
+            magic, crc, length = _RECORD_HEADER.unpack_from(buffer, position)
+            blob_start = position + _RECORD_HEADER.size
+            if magic != RECORD_MAGIC or blob_start + length > len(buffer):
+                logger.warning(f"Ignoring torn record at offset {position} in {self.path}")
+                break
+            if zlib.crc32(buffer[blob_start:blob_start + length]) != crc:
+                logger.warning(f"CRC mismatch at offset {position} in {self.path}; stopping scan")
+                break
+            header, _ = decode_header(buffer, blob_start)
+            action_type, box_id = _metadata_key(header.get('metadata', {}))
+            timestamp = header.get('metadata', {}).get('pack_timestamp', 0.0)
+            recovered.append(PackEntry(action_type, box_id, timestamp, blob_start, length))
+            position = blob_start + length + _pad(length)
+        if recovered:
+            logger.info(f"Recovered {len(recovered)} unindexed records in {self.path}")
+            self._write_index(recovered)
+            self._index_read_pos = os.path.getsize(self.index_path)
+            for entry in recovered:
+                self._add_entry(entry)
+
+    # ---- public API ------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entries(self) -> List[PackEntry]:
+        return list(self._entries)
+
+    def find(self, action_type: str, box_id: Optional[int] = None) -> Optional[PackEntry]:
+        """Most recent entry for (action_type, box_id). Without a box_id, an entry recorded
+        without a box is preferred, then the most recent one for any box (as PatternCatalog.best)."""
+        self.refresh()
+        action_key = normalize_action_type(action_type)
+        entry = self._latest.get((action_key, box_id))
+        if entry is None and box_id is None:
+            entry = self._latest_any.get(action_key)
+        return entry
+
+    def load(self, entry: PackEntry) -> Pattern:
+        """Decode entry as zero-copy views into the pack mapping."""
+        buffer = self._mapping(entry.offset + entry.length)
+        return decode_pattern(buffer, entry.offset)
+
+    def append(self, events: Sequence, metadata: Optional[Dict[str, Any]] = None,
+               delta: bool = False) -> PackEntry:
+        """Append a recording to the pack and index it."""
+        metadata = dict(metadata or {})
+        metadata.setdefault('pack_timestamp', time.time())
+        blob = encode_pattern(events, metadata, delta)
+        action_type, box_id = _metadata_key(metadata)
+
+        with self._lock, open(self.path, 'r+b') as f, _exclusive_lock(f):
+            # Index what other writers appended since our last refresh, so only
+            # bytes that fail the record checks count as a torn tail
+            self._read_index_tail()
+            pack_size = f.seek(0, os.SEEK_END)
+            if pack_size > self._indexed_end:
+                self._rebuild_index_tail(pack_size)
+                self._scanned_size = pack_size
+            if pack_size > self._indexed_end:
+                logger.warning(f"Truncating {pack_size - self._indexed_end} bytes of torn tail in {self.path}")
+                f.truncate(self._indexed_end)
+            record_start = f.seek(self._indexed_end)
+            f.write(_RECORD_HEADER.pack(RECORD_MAGIC, zlib.crc32(blob), len(blob)))
+            f.write(blob)
+            f.write(b'\0' * _pad(len(blob)))
+            f.flush()
+            os.fsync(f.fileno())
+            entry = PackEntry(action_type, box_id, metadata['pack_timestamp'],
+                              record_start + _RECORD_HEADER.size, len(blob))
+            self._write_index([entry])
+            self._read_index_tail()
+        logger.info(f"Appended {len(events)} events for '{action_type}' to {self.path}")
+        return entry
+
+    def add_file(self, filepath: str) -> PackEntry:
+        """Import a JSON or binary pattern file into the pack."""
+        events, metadata = load_pattern_events(filepath)
+        metadata = dict(metadata)
+        metadata.setdefault('pack_timestamp', os.path.getmtime(filepath))
+        metadata.setdefault('source_file', os.path.basename(filepath))
+        return self.append(events, metadata)
+
+
+def build_pack(pack_path: str, directory: str) -> PatternPack:
+    """Append every pattern file in directory to the pack at pack_path."""
+    pack = PatternPack(pack_path)
+    imported = set(_pack_sources(pack))
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith((JSON_EXTENSION, PATTERN_EXTENSION)) or name in imported:
+            continue
+        try:
+            pack.add_file(os.path.join(directory, name))
+        except Exception as e:
+            logger.error(f"Failed to add {name} to pack: {str(e)}")
+    return pack
+
+
+def _pack_sources(pack: PatternPack) -> List[str]:
+    sources = []
+    for entry in pack.entries():
+        source = pack.load(entry).metadata.get('source_file')
+        if source:
+            sources.append(source)
+    return sources
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or inspect a pattern pack.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Import a pattern directory into a pack")
+    build_parser.add_argument('pack')
+    build_parser.add_argument('directory')
+    list_parser = subparsers.add_parser('list', help="List the records in a pack")
+    list_parser.add_argument('pack')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        built = build_pack(args.pack, args.directory)
+        print(f"{len(built)} records in {args.pack}")
+    else:
+        for pack_entry in PatternPack(args.pack).entries():
+            print(f"{pack_entry.action_type!r} box={pack_entry.box_id} "
+                  f"ts={pack_entry.timestamp:.0f} offset={pack_entry.offset} length={pack_entry.length}")
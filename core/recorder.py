@@ -1,50 +1,63 @@
 import json
 import time
-from typing import List, Dict, Any, Optional, Tuple
-from pynput import mouse, keyboard
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 import logging
 import os
 from datetime import datetime
+import threading
 import configparser
-import math
-# numpy e deque não são usados atualmente, podem ser removidos se não planejados para uso futuro
-# import numpy as np 
-# from collections import deque
-import threading # Adicionado para a thread de verificação de ação
+from core.pattern_catalog import PatternCatalog, PATTERN_EXTENSION
+from core.recording_log import RecordingLog
+from core.event_store import EventStore, EventView
+from core.action_watcher import ActionFileWatcher
+from core.command_parser import parse_command
+from core.hotkey_manager import HotkeyManager, Subscription
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE, PAUSE
+from core.capture_merger import (
+    CaptureMerger, RawEvent, RAW_MOVE, RAW_CLICK_PRESS, RAW_CLICK_RELEASE, RAW_KEY_PRESS, RAW_KEY_RELEASE, RAW_CONTROL,
+)
+
+# Os módulos de gravação de padrões (NumPy) só são importados ao salvar, fora da inicialização
+if TYPE_CHECKING:
+    from core.pattern_pack import PatternPack
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class EventRecorder:
-    def __init__(self):
+    def __init__(self, hotkey_manager: Optional[HotkeyManager] = None):
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.project_root = os.path.dirname(self.script_dir)
 
-        self.events: List[Dict[str, Any]] = []
+        # Armazenamento único de eventos; cada segmento de ação é uma faixa (início, fim) dele
+        self.event_store = EventStore()
+        self.current_segment: Optional[int] = None
         self.start_time: Optional[float] = None 
         self.is_recording: bool = False
         
-        self.mouse_listener: Optional[mouse.Listener] = None
-        self.keyboard_listener: Optional[keyboard.Listener] = None # Para eventos de dados
+        # Listeners do pynput (importado sob demanda, para que o módulo carregue sem display)
+        self.mouse_listener: Optional[Any] = None
+        # Hook de teclado único, compartilhado entre a captura de dados e as hotkeys
+        # (e com o orquestrador, que passa o seu)
+        self.hotkeys = hotkey_manager if hotkey_manager is not None else HotkeyManager()
+        self._keyboard_subscription: Optional[Subscription] = None # Para eventos de dados
+        self._session_done = threading.Event()
         
         self.config = self._load_config()
         
         self.last_mouse_position: Optional[Tuple[int, int]] = None
-        self.last_mouse_time: Optional[float] = None
         
         self.last_event_time: Optional[float] = None
         self.pause_threshold = self.config.getfloat('Recording', 'pause_threshold', fallback=0.05)
         
         self.button_press_times: Dict[str, float] = {}
         
-        self.screen_width = 1920 
-        self.screen_height = 1080 
-        self._initialize_screen_info()
+        # Tamanho da tela, consultado (via pyautogui) apenas no primeiro acesso
+        self._screen_size: Optional[Tuple[int, int]] = None
         
         self.current_action: Optional[str] = None
         self.action_start_time: Optional[float] = None
-        self.action_events: List[Dict[str, Any]] = []
         
         _suggested_actions_path_config = self.config.get('Paths', 'suggested_actions', fallback='suggested_actions.txt')
         if not os.path.isabs(_suggested_actions_path_config):
@@ -53,18 +66,67 @@ class EventRecorder:
             self.suggested_actions_file = _suggested_actions_path_config
         logger.info(f"Caminho do arquivo de ações sugeridas resolvido para: {self.suggested_actions_file}")
 
-        self.last_action_check_time = 0.0
         self.action_check_interval = self.config.getfloat('Recording', 'action_check_interval', fallback=0.5)
-
-    def _initialize_screen_info(self) -> None:
-        try:
-            import pyautogui
-            self.screen_width, self.screen_height = pyautogui.size()
-            logger.info(f"Tamanho da tela detectado: {self.screen_width}x{self.screen_height}")
-        except ImportError: 
-            logger.warning("pyautogui não encontrado. Usando tamanho de tela padrão 1920x1080.")
-        except Exception as e: 
-            logger.error(f"Falha ao obter o tamanho da tela usando pyautogui: {str(e)}. Usando padrão.")
+        # Mudanças no arquivo de ações chegam por inotify (ou stat periódico); só os bytes novos são lidos
+        self.action_watcher = ActionFileWatcher(
+            self.suggested_actions_file,
+            backend=self.config.get('Paths', 'actions_watch_backend', fallback='auto').strip().lower(),
+            poll_interval=self.config.getfloat('Paths', 'actions_poll_interval', fallback=self.action_check_interval))
+        self.action_watcher.subscribe(self._on_new_actions)
+        # Primeira linha do arquivo (a ação atual), mantida a partir das notificações do watcher
+        self._action_file_head: Optional[str] = None
+        # 'binary' grava o formato colunar (core/pattern_format.py); 'json' mantém o formato legado;
+        # 'pack' anexa ao arquivo de pacote configurado em [Paths] pattern_pack
+        self.pattern_format = self.config.get('Recording', 'pattern_format', fallback='json').strip().lower()
+        self.pattern_pack: Optional['PatternPack'] = None
+        self.pattern_catalog: Optional[PatternCatalog] = None
+        # Simplificação das trajetórias do mouse ao salvar (0 desativa) e codificação delta do formato binário
+        self.simplify_tolerance_px = self.config.getfloat('Recording', 'simplify_tolerance_px', fallback=0.0)
+        self.simplify_max_gap_ms = self.config.getfloat('Recording', 'simplify_max_gap_ms', fallback=100.0)
+        self.delta_encoding = self.config.getboolean('Recording', 'delta_encoding', fallback=False)
+
+        # Log de gravação em disco: os eventos de cada ação são transmitidos para um segmento
+        # e finalizados em arquivo de padrão quando a ação termina (ver core/recording_log.py)
+        self.patterns_dir = self._resolve_patterns_dir()
+        wal_dir = self.config.get('Recording', 'wal_directory', fallback='.wal')
+        if not os.path.isabs(wal_dir):
+            wal_dir = os.path.join(self.patterns_dir, wal_dir)
+        self.recording_log = RecordingLog(
+            wal_dir, finalize=self.save_recording_for_action,
+            flush_bytes=self.config.getint('Recording', 'wal_flush_bytes', fallback=64 * 1024),
+            flush_interval=self.config.getfloat('Recording', 'wal_flush_interval', fallback=0.5),
+            on_segment_closed=self.event_store.evict_segment)
+
+        # Os callbacks dos listeners apenas enfileiram tuplas brutas; o processamento (métricas,
+        # pausas, armazenamento) e a ordenação por timestamp acontecem na thread do merger
+        self.capture_merger = CaptureMerger(
+            self._process_raw_event,
+            reorder_window=self.config.getfloat('Recording', 'reorder_window', fallback=0.005))
+        self._mouse_queue = self.capture_merger.queue('mouse')
+        self._keyboard_queue = self.capture_merger.queue('keyboard')
+        self._control_queue = self.capture_merger.queue('control')
+
+    @property
+    def screen_width(self) -> int:
+        return self._get_screen_size()[0]
+
+    @property
+    def screen_height(self) -> int:
+        return self._get_screen_size()[1]
+
+    def _get_screen_size(self) -> Tuple[int, int]:
+        if self._screen_size is None:
+            self._screen_size = (1920, 1080)
+            try:
+                import pyautogui
+                width, height = pyautogui.size()
+                self._screen_size = (width, height)
+                logger.info(f"Tamanho da tela detectado: {width}x{height}")
+            except ImportError:
+                logger.warning("pyautogui não encontrado. Usando tamanho de tela padrão 1920x1080.")
+            except Exception as e:
+                logger.error(f"Falha ao obter o tamanho da tela usando pyautogui: {str(e)}. Usando padrão.")
+        return self._screen_size
 
     def _load_config(self) -> configparser.ConfigParser:
         config = configparser.ConfigParser()
@@ -72,7 +134,7 @@ class EventRecorder:
         if not os.path.exists(config_path):
             logger.warning(f"Arquivo de configuração não encontrado em {config_path}. Usando valores padrão.")
             config['Paths'] = {'patterns_directory': 'patterns', 'suggested_actions': 'suggested_actions.txt'}
-            config['Recording'] = {'pause_threshold': '0.05', 'action_check_interval': '0.5'}
+            config['Recording'] = {'pause_threshold': '0.05', 'action_check_interval': '0.5', 'pattern_format': 'binary'}
             # Removido Analysis -> movement_history_size pois não é usado
             config['Hotkeys'] = {'start_recording': 'Key.f2', 'stop_recording': 'Key.f3'}
             return config
@@ -80,63 +142,89 @@ class EventRecorder:
         logger.info(f"Configuração carregada de {config_path}")
         return config
 
-    def _get_time_offset(self) -> int:
+    def _get_time_offset(self, event_time: Optional[float] = None) -> int:
         if self.start_time is None: return 0
-        return int((time.time() - self.start_time) * 1000)
-
-    def _parse_action_line(self, action_line: str) -> Tuple[Optional[str], Optional[int]]:
-        if not action_line: return None, None
-        try:
-            # Remove timestamp potencial como "YYYY-MM-DD HH:MM:SS - "
-            if " - " in action_line and action_line.count(':') >= 2: 
-                action_line = action_line.split(" - ", 1)[1]
-            
-            box_id: Optional[int] = None
-            action_type_str: str = action_line.strip()
-
-            if '[' in action_type_str and action_type_str.endswith(']'):
-                try:
-                    action_name_part = action_type_str[:action_type_str.rfind('[')].strip()
-                    box_id_str = action_type_str[action_type_str.rfind('[')+1:-1]
-                    box_id = int(box_id_str)
-                    action_type_str = action_name_part
-                except ValueError:
-                    logger.warning(f"Não foi possível analisar box_id de '{action_line}'. Tratando como nome de ação.")
-                    action_type_str = action_line.strip() 
-                    box_id = None
-            return action_type_str, box_id
-        except Exception as e:
-            logger.error(f"Erro ao analisar linha de ação '{action_line}': {str(e)}")
-            return action_line.strip(), None
+        if event_time is None: event_time = time.time()
+        return int((event_time - self.start_time) * 1000)
 
     def _check_for_new_action_from_file(self) -> None:
-        current_time = time.time()
-        if current_time - self.last_action_check_time < self.action_check_interval:
-            return 
-        self.last_action_check_time = current_time
-        
+        """Lê a ação atual (primeira linha) diretamente do arquivo; usado ao iniciar a gravação."""
         try:
             if os.path.exists(self.suggested_actions_file):
                 with open(self.suggested_actions_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if lines:
-                        new_action_line = lines[0].strip()
-                        if not new_action_line: return
-
-                        if new_action_line != self.current_action:
-                            logger.info(f"Nova linha de ação detectada: '{new_action_line}'")
-                            # Salva a ação anterior somente se a gravação tiver sido iniciada
-                            if self.current_action and self.action_events and self.start_time is not None:
-                                logger.info(f"Salvando ação anterior: {self.current_action}")
-                                self.save_recording_for_action(self.current_action, self.action_events)
-                            
-                            self.current_action = new_action_line
-                            self.action_start_time = current_time 
-                            self.action_events = [] 
-                            logger.info(f"Mundando para nova ação: {self.current_action}")
+                    new_action_line = f.readline().strip()
+                if new_action_line:
+                    self.switch_action(new_action_line)
         except Exception as e:
             logger.error(f"Erro ao verificar novas ações do arquivo: {str(e)}")
 
+    def _on_new_actions(self, lines: List[str], reset: bool) -> None:
+        """Recebe as linhas novas do watcher (executa na thread do watcher). A ação atual continua
+        sendo a primeira linha do arquivo: ela só muda quando o arquivo é reescrito (reset)
+        ou quando linhas chegam a um arquivo que estava vazio."""
+        if reset:
+            self._action_file_head = lines[0] if lines else None
+        elif self._action_file_head is None and lines:
+            self._action_file_head = lines[0]
+        else:
+            return
+        if self.is_recording and self._action_file_head:
+            self.switch_action(self._action_file_head)
+
+    def switch_action(self, new_action_line: str) -> None:
+        """Passa a gravar os eventos seguintes como a ação new_action_line (thread-safe)."""
+        if new_action_line == self.current_action:
+            return
+        logger.info(f"Nova linha de ação detectada: '{new_action_line}'")
+        # A troca de segmento é enfileirada com timestamp para que a thread do
+        # merger a ordene junto com os eventos de entrada
+        if self.start_time is not None:
+            self._control_queue.put(
+                (RAW_CONTROL, time.time_ns(), 0, 0, (self.current_action, new_action_line)))
+
+        self.current_action = new_action_line
+        self.action_start_time = time.time()
+        logger.info(f"Mundando para nova ação: {self.current_action}")
+
+    def _process_action_change(self, previous_action: Optional[str], new_action_line: str) -> None:
+        """Fecha o segmento anterior e abre o da nova ação (executa na thread do merger).
+        O segmento da ação anterior é finalizado em segundo plano; o segmento
+        genérico (sem ação) é descartado, como antes."""
+        if previous_action:
+            logger.info(f"Finalizando ação anterior: {previous_action}")
+        self._end_segment(discard=previous_action is None)
+        self._begin_segment(new_action_line)
+
+    def _process_raw_event(self, raw: RawEvent) -> None:
+        """Converte um evento bruto dos listeners em Event (executa na thread do merger)."""
+        kind, t_ns, x, y, payload = raw
+        event_time = t_ns / 1e9
+        if kind == RAW_MOVE:
+            self._process_mouse_move(x, y, event_time)
+        elif kind == RAW_CLICK_PRESS or kind == RAW_CLICK_RELEASE:
+            self._process_mouse_click(x, y, payload, kind == RAW_CLICK_PRESS, event_time)
+        elif kind == RAW_KEY_PRESS:
+            self._process_key_event(payload, KEY_PRESS, event_time)
+        elif kind == RAW_KEY_RELEASE:
+            self._process_key_event(payload, KEY_RELEASE, event_time)
+        elif kind == RAW_CONTROL:
+            self._process_action_change(*payload)
+
+    def _store_event(self, event: Event) -> None:
+        """Guarda o evento uma única vez na memória e o transmite para o log em disco."""
+        self.event_store.append(event)
+        self.recording_log.append(event)
+
+    def _begin_segment(self, action_name_line: str) -> None:
+        self.current_segment = self.recording_log.begin_segment(action_name_line)
+        self.event_store.begin_segment(self.current_segment)
+
+    def _end_segment(self, discard: bool = False) -> None:
+        if self.current_segment is not None:
+            self.event_store.end_segment(self.current_segment)
+            self.current_segment = None
+        self.recording_log.end_segment(discard=discard)
+
     def _check_for_pause(self, current_event_time: float) -> None:
         if not self.start_time: # Gravação não iniciada
             return
@@ -154,84 +242,60 @@ class EventRecorder:
             pause_event_x = self.last_mouse_position[0] if self.last_mouse_position else 0
             pause_event_y = self.last_mouse_position[1] if self.last_mouse_position else 0
 
-            event_data = {
-                'type': 'pause',
-                'time_offset_ms': int((pause_start_time - self.start_time) * 1000),
-                'duration_ms': int(pause_duration * 1000),
-                'x': pause_event_x, 
-                'y': pause_event_y,
-                'timestamp': pause_start_time 
-            }
-            self.events.append(event_data)
-            if self.current_action:
-                self.action_events.append(event_data)
-            logger.debug(f"Pausa registrada: duração {pause_duration:.3f}s, começando no offset {event_data['time_offset_ms']}")
+            event = Event(PAUSE, int((pause_start_time - self.start_time) * 1000),
+                          pause_event_x, pause_event_y, None, int(pause_duration * 1000), pause_start_time)
+            self._store_event(event)
+            logger.debug(f"Pausa registrada: duração {pause_duration:.3f}s, começando no offset {event.time_offset_ms}")
         
         # Atualiza o tempo do último evento para o timestamp do evento atual sendo processado
         self.last_event_time = current_event_time
 
+    # Callbacks dos listeners: executam no hook de entrada do SO, então apenas enfileiram
     def _on_mouse_move(self, x: int, y: int) -> None:
-        if not self.is_recording or self.start_time is None: return
-        current_time = time.time()
+        if self.is_recording: self._mouse_queue.put((RAW_MOVE, time.time_ns(), x, y, None))
+
+    def _on_mouse_click(self, x: int, y: int, button: Any, pressed: bool) -> None:
+        if self.is_recording:
+            self._mouse_queue.put((RAW_CLICK_PRESS if pressed else RAW_CLICK_RELEASE, time.time_ns(), x, y, button))
+
+    def _on_key_event(self, key_obj: Any, type_code: int) -> None:
+        if self.is_recording:
+            self._keyboard_queue.put((RAW_KEY_PRESS if type_code == KEY_PRESS else RAW_KEY_RELEASE,
+                                      time.time_ns(), 0, 0, key_obj))
+
+    def _on_key_press(self, key: Any) -> None: self._on_key_event(key, KEY_PRESS)
+    def _on_key_release(self, key: Any) -> None: self._on_key_event(key, KEY_RELEASE)
+
+    def _process_mouse_move(self, x: int, y: int, current_time: float) -> None:
+        if self.start_time is None: return
         self._check_for_pause(current_time)
-        
-        dt = (current_time - self.last_mouse_time) if self.last_mouse_time is not None else 0.0
-        
-        dx, dy, distance, speed, angle = 0, 0, 0.0, 0.0, 0.0
-        if self.last_mouse_position is not None:
-            dx = x - self.last_mouse_position[0]
-            dy = y - self.last_mouse_position[1]
-            distance = math.sqrt(dx*dx + dy*dy)
-            if dt > 1e-6: # Evita divisão por zero ou dt muito pequeno
-                speed = distance / dt
-            angle = math.atan2(dy, dx) * 180 / math.pi
-        
-        movement_metrics = {
-            'dt': dt, 'distance': distance, 'speed': speed, 
-            'angle': angle, 'dx': dx, 'dy': dy
-        }
-        
-        event = {
-            'type': 'mouse_move', 'time_offset_ms': self._get_time_offset(), 
-            'x': x, 'y': y, 'timestamp': current_time, 
-            'movement_metrics': movement_metrics 
-        }
-        self.events.append(event)
-        if self.current_action: self.action_events.append(event)
-        
+        # Somente a amostra bruta é gravada; as métricas de movimento são derivadas
+        # em lote (core.movement_metrics) quando o padrão é reproduzido
+        self._store_event(Event(MOUSE_MOVE, self._get_time_offset(current_time), x, y, None, -1, current_time))
         self.last_mouse_position = (x, y)
-        self.last_mouse_time = current_time
         # self.last_event_time é atualizado por _check_for_pause
 
-    def _on_mouse_click(self, x: int, y: int, button: mouse.Button, pressed: bool) -> None:
-        if not self.is_recording or self.start_time is None: return
-        current_time = time.time()
+    def _process_mouse_click(self, x: int, y: int, button: Any, pressed: bool, current_time: float) -> None:
+        if self.start_time is None: return
         self._check_for_pause(current_time)
 
         button_str = str(button)
-        event_type = 'mouse_click_press' if pressed else 'mouse_click_release'
-        
-        event_data: Dict[str, Any] = {
-            'type': event_type, 'time_offset_ms': self._get_time_offset(), 
-            'x': x, 'y': y, 'button': button_str, 'timestamp': current_time
-        }
+        hold_duration_ms = -1
 
         if pressed:
             self.button_press_times[button_str] = current_time
         else:
             press_time = self.button_press_times.pop(button_str, current_time) # Default to current_time if not found to avoid error
             hold_duration_ms = int((current_time - press_time) * 1000)
-            event_data['hold_duration_ms'] = hold_duration_ms
         
-        self.events.append(event_data)
-        if self.current_action: self.action_events.append(event_data)
+        self._store_event(Event(MOUSE_PRESS if pressed else MOUSE_RELEASE, self._get_time_offset(current_time),
+                                x, y, button_str, hold_duration_ms, current_time))
         
         self.last_mouse_position = (x,y) 
         # self.last_event_time é atualizado por _check_for_pause
 
-    def _on_key_event(self, key_obj: Any, event_type: str) -> None:
-        if not self.is_recording or self.start_time is None: return
-        current_time = time.time()
+    def _process_key_event(self, key_obj: Any, type_code: int, current_time: float) -> None:
+        if self.start_time is None: return
         self._check_for_pause(current_time)
 
         key_str = ""
@@ -242,54 +306,54 @@ class EventRecorder:
         except AttributeError: # Para teclas especiais (ex: Key.space, Key.f1)
             key_str = str(key_obj)
         
-        event_data: Dict[str, Any] = {
-            'type': event_type, 'time_offset_ms': self._get_time_offset(), 
-            'key': key_str, 'timestamp': current_time
-        }
-
-        if event_type == 'key_press':
+        hold_duration_ms = -1
+        if type_code == KEY_PRESS:
             self.button_press_times[key_str] = current_time
-        elif event_type == 'key_release':
+        else:
             press_time = self.button_press_times.pop(key_str, current_time)
             hold_duration_ms = int((current_time - press_time) * 1000)
-            event_data['hold_duration_ms'] = hold_duration_ms
             
-        self.events.append(event_data)
-        if self.current_action: self.action_events.append(event_data)
+        self._store_event(Event(type_code, self._get_time_offset(current_time), 0, 0, key_str, hold_duration_ms, current_time))
         # self.last_event_time é atualizado por _check_for_pause
 
-    def _on_key_press(self, key: keyboard.Key) -> None: self._on_key_event(key, 'key_press')
-    def _on_key_release(self, key: keyboard.Key) -> None: self._on_key_event(key, 'key_release')
-
-    def start_recording(self) -> None:
+    def start_recording(self, action_line: Optional[str] = None) -> None:
+        """Inicia a captura. Sem action_line, a ação inicial é a primeira linha do arquivo de ações."""
         if self.is_recording:
             logger.warning("A gravação já está em progresso")
             return
 
-        self.events = []
-        self.action_events = [] 
+        self._start_capture(action_line)
+        from pynput import mouse
+        self.mouse_listener = mouse.Listener(on_move=self._on_mouse_move, on_click=self._on_mouse_click)
+        self.mouse_listener.start()
+        self._keyboard_subscription = self.hotkeys.subscribe(self._on_key_press, self._on_key_release)
+        self.hotkeys.start()
+        logger.info("Gravação de eventos iniciada.")
+
+    def _start_capture(self, action_line: Optional[str] = None) -> None:
+        """Prepara a sessão e inicia o merger e o log em disco, sem os listeners do SO
+        (benchmarks/bench_recorder.py alimenta os callbacks diretamente)."""
+        self.event_store.clear()
         self.start_time = time.time() # Marca o início da sessão de gravação
         self.is_recording = True
         
         self.last_mouse_position = None
-        # Inicializa last_mouse_time para o tempo de início para o primeiro cálculo de dt
-        self.last_mouse_time = self.start_time 
         self.last_event_time = self.start_time # Inicializa para detecção de pausa
         self.button_press_times = {}
         
         self.current_action = None 
         self.action_start_time = self.start_time 
-        self.last_action_check_time = self.start_time # Reseta timer de verificação de ação
-        self._check_for_new_action_from_file() # Tenta carregar ação inicial
+        # Segmento genérico até que uma ação seja detectada
+        self.recording_log.start()
+        self.capture_merger.start()
+        self._begin_segment(f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        if action_line:
+            self.switch_action(action_line)
+        else:
+            self._check_for_new_action_from_file() # Tenta carregar ação inicial
         if not self.current_action:
             logger.info("Nenhuma ação inicial especificada em suggested_actions.txt. Gravação será geral.")
 
-        self.mouse_listener = mouse.Listener(on_move=self._on_mouse_move, on_click=self._on_mouse_click)
-        self.mouse_listener.start()
-        self.keyboard_listener = keyboard.Listener(on_press=self._on_key_press, on_release=self._on_key_release)
-        self.keyboard_listener.start()
-        logger.info("Gravação de eventos iniciada.")
-
     def _trigger_stop_sequence(self) -> None:
         """Inicia a sequência para parar a gravação, parando a captura de dados."""
         if not self.is_recording and self.start_time is None:
@@ -304,41 +368,79 @@ class EventRecorder:
             logger.debug("Parando listener de mouse...")
             self.mouse_listener.stop()
         
-        if self.keyboard_listener: # Listener de dados do teclado
-            logger.debug("Parando listener de teclado (dados)...")
-            self.keyboard_listener.stop()
-        # Joins para esses listeners ocorrerão no bloco finally de run_hotkey_listener
-
-    def _handle_hotkey_press(self, key: Any) -> Optional[bool]:
-        """Lida com pressionamentos de hotkey (executa na thread do listener de hotkeys)."""
-        start_hotkey_str = self.config.get('Hotkeys', 'start_recording', fallback='Key.f2')
-        stop_hotkey_str = self.config.get('Hotkeys', 'stop_recording', fallback='Key.f3')
-
-        key_pressed_str = ""
-        if isinstance(key, keyboard.Key): # Teclas especiais
-            key_pressed_str = str(key) 
-        elif isinstance(key, keyboard.KeyCode): # Teclas alfanuméricas
-            if key.char: key_pressed_str = key.char
-
-        # Normaliza a string da tecla pressionada (ex: remove aspas de caracteres)
-        if len(key_pressed_str) == 3 and key_pressed_str.startswith("'") and key_pressed_str.endswith("'"):
-            key_pressed_str = key_pressed_str[1]
-
-        if key_pressed_str == start_hotkey_str:
-            if not self.is_recording:
-                logger.info(f"Hotkey '{start_hotkey_str}' pressionada - Iniciando gravação")
-                self.start_recording()
-            else:
-                logger.info(f"Hotkey '{start_hotkey_str}' pressionada, mas já gravando.")
-        elif key_pressed_str == stop_hotkey_str:
-            # Verifica se a gravação está ativa ou foi iniciada
-            if self.is_recording or self.start_time is not None:
-                logger.info(f"Hotkey '{stop_hotkey_str}' pressionada - Sinalizando parada da gravação.")
-                self._trigger_stop_sequence() # Para a captura de dados
-                return False # IMPORTANTE: Para este listener de hotkeys
-            else:
-                logger.info(f"Hotkey '{stop_hotkey_str}' pressionada, mas não gravando ou não iniciada.")
-        return None # Continua escutando por padrão
+        if self._keyboard_subscription is not None: # Eventos de dados do teclado
+            logger.debug("Cancelando inscrição de teclado (dados)...")
+            self.hotkeys.unsubscribe(self._keyboard_subscription)
+            self._keyboard_subscription = None
+        # Joins para esses listeners ocorrerão em stop_recording
+
+    def stop_recording(self) -> None:
+        """Para a captura, processa o que já foi enfileirado e finaliza o segmento aberto.
+        Bloqueia até o log em disco salvar o padrão."""
+        self._trigger_stop_sequence()
+        # Garante que os listeners de dados sejam juntados
+        if self.mouse_listener and self.mouse_listener.is_alive():
+            logger.debug("Joining mouse_listener...")
+            self.mouse_listener.join(timeout=1.0) 
+        self.mouse_listener = None 
+
+        # Processa tudo o que os listeners já enfileiraram (inclusive trocas de ação pendentes)
+        self.capture_merger.stop(timeout=10.0)
+        logger.debug(f"Merger de captura: {self.capture_merger.processed} eventos brutos processados, "
+                     f"pico de {self.capture_merger.max_pending} pendentes")
+
+        logger.info("Realizando limpeza final e salvamento...")
+
+        # Salva somente se a gravação foi de fato iniciada
+        if self.start_time is not None: 
+            final_event_time = time.time() # Tempo para a verificação da pausa final
+            # Verifica se uma pausa ocorreu entre o último evento e a parada
+            if self.last_event_time and (final_event_time > self.last_event_time + self.pause_threshold):
+                logger.debug(f"Verificando pausa final. current_time: {final_event_time}, last_event_time: {self.last_event_time}")
+                self._check_for_pause(final_event_time)
+
+            # Lógica de salvamento: o segmento aberto (ação atual ou genérico) é finalizado pelo log
+            total_events = len(self.event_store)
+            if not total_events: # Nenhum evento na sessão
+                 logger.info("Nenhum evento foi gravado nesta sessão.")
+            elif self.current_action:
+                logger.info(f"Finalizando segmento da ação: {self.current_action}")
+            else: # Se não houver ação específica, mas houver eventos gerais
+                logger.info(f"Nenhum nome de ação específico. Salvando todos os {total_events} eventos gravados com nome genérico.")
+            self._end_segment()
+            self.recording_log.close(timeout=30.0)
+        else:
+            logger.info("Gravação não foi iniciada ou nenhum evento significativo para salvar.")
+
+        self.is_recording = False # Garante que o estado seja falso
+        self.start_time = None # Reseta para a próxima sessão de gravação
+
+    def pause_recording(self) -> None:
+        """Suspende a captura sem encerrar a sessão; o intervalo fica gravado como pausa."""
+        if self.start_time is not None:
+            self.is_recording = False
+
+    def resume_recording(self) -> None:
+        if self.start_time is not None:
+            self.is_recording = True
+
+    def _on_start_hotkey(self) -> None:
+        """Hotkey de início (executa na thread do hook de teclado)."""
+        if not self.is_recording:
+            logger.info("Hotkey de início pressionada - Iniciando gravação")
+            self.start_recording()
+        else:
+            logger.info("Hotkey de início pressionada, mas já gravando.")
+
+    def _on_stop_hotkey(self) -> None:
+        """Hotkey de parada: para a captura e encerra run_hotkey_listener."""
+        # Verifica se a gravação está ativa ou foi iniciada
+        if self.is_recording or self.start_time is not None:
+            logger.info("Hotkey de parada pressionada - Sinalizando parada da gravação.")
+            self._trigger_stop_sequence() # Para a captura de dados
+            self._session_done.set()
+        else:
+            logger.info("Hotkey de parada pressionada, mas não gravando ou não iniciada.")
 
     def run_hotkey_listener(self) -> None:
         """Executa o listener de hotkeys na thread atual. Bloqueante até ser parado."""
@@ -346,103 +448,86 @@ class EventRecorder:
         stop_hk = self.config.get('Hotkeys', 'stop_recording', fallback='Key.f3')
         logger.info(f"Listener de hotkeys iniciado. Pressione '{start_hk}' para iniciar, '{stop_hk}' para parar.")
         
-        action_check_active = True
-        action_check_thread = None
-
-        def _periodic_action_check():
-            while action_check_active:
-                if self.is_recording: # Somente verifica se estiver gravando ativamente
-                    self._check_for_new_action_from_file()
-                time.sleep(self.action_check_interval)
-            logger.debug("Thread de verificação de ação periódica terminando.")
-
-        action_check_thread = threading.Thread(target=_periodic_action_check, daemon=True)
-        action_check_thread.start()
-
+        # As hotkeys são compiladas uma única vez no matcher do hook compartilhado
+        hotkeys = []
+        for spec, callback in ((start_hk, self._on_start_hotkey), (stop_hk, self._on_stop_hotkey)):
+            try:
+                hotkeys.append((self.hotkeys.add_hotkey(spec, callback), callback))
+            except ValueError as e:
+                logger.error(f"Hotkey inválida '{spec}': {e}")
+
+        # Trocas de ação chegam do watcher assim que o plugin escreve o arquivo
+        self.action_watcher.start(from_start=True)
+        logger.debug(f"Observando {self.suggested_actions_file} ({self.action_watcher.active_backend})")
+
+        self._session_done.clear()
         try:
-            # O listener de hotkeys principal
-            with keyboard.Listener(on_press=self._handle_hotkey_press) as k_listener:
-                k_listener.join() # Bloqueia aqui até on_press retornar False ou erro
-            logger.debug("Listener de hotkeys principal (keyboard.Listener) terminou normalmente.")
+            self.hotkeys.start()
+            # Bloqueia até a hotkey de parada; o timeout só mantém o Ctrl+C responsivo
+            while not self._session_done.wait(0.5):
+                pass
+            logger.debug("Hotkey de parada recebida.")
 
         except KeyboardInterrupt:
             logger.info("Interrupção de teclado (Ctrl+C) recebida. Acionando parada...")
             self._trigger_stop_sequence() 
-            # A saída do bloco 'with' garantirá que k_listener seja parado.
         except Exception as e:
             logger.error(f"Erro inesperado no listener de hotkeys: {e}", exc_info=True)
             self._trigger_stop_sequence() # Tenta parar a captura de dados
         finally:
             logger.info("Bloco finally do run_hotkey_listener alcançado.")
-            action_check_active = False # Sinaliza a thread de verificação para parar
-            if action_check_thread and action_check_thread.is_alive():
-                logger.debug("Aguardando a thread de verificação de ação periódica terminar...")
-                action_check_thread.join(timeout=max(1.0, self.action_check_interval * 2 + 0.1))
-                if action_check_thread.is_alive():
-                    logger.warning("Thread de verificação de ação periódica não terminou a tempo.")
-            
-            # Garante que os listeners de dados sejam juntados
-            if self.mouse_listener and self.mouse_listener.is_alive():
-                logger.debug("Joining mouse_listener no finally...")
-                self.mouse_listener.join(timeout=1.0) 
-            self.mouse_listener = None 
-            
-            if self.keyboard_listener and self.keyboard_listener.is_alive():
-                logger.debug("Joining keyboard_listener (data) no finally...")
-                self.keyboard_listener.join(timeout=1.0)
-            self.keyboard_listener = None
-
-            logger.info("Realizando limpeza final e salvamento...")
-            
-            # Salva somente se a gravação foi de fato iniciada
-            if self.start_time is not None: 
-                final_event_time = time.time() # Tempo para a verificação da pausa final
-                # Verifica se uma pausa ocorreu entre o último evento e a parada
-                if self.last_event_time and (final_event_time > self.last_event_time + self.pause_threshold):
-                    logger.debug(f"Verificando pausa final. current_time: {final_event_time}, last_event_time: {self.last_event_time}")
-                    self._check_for_pause(final_event_time)
-
-                # Lógica de salvamento
-                if self.current_action and self.action_events:
-                    self.save_recording_for_action(self.current_action, self.action_events)
-                elif not self.current_action and self.events: # Se não houver ação específica, mas houver eventos gerais
-                    logger.info(f"Nenhum nome de ação específico. Salvando todos os {len(self.events)} eventos gravados com nome genérico.")
-                    generic_action_name = f"recording_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                    self.save_recording_for_action(generic_action_name, self.events)
-                elif not self.events: # Se self.events estiver vazio
-                     logger.info("Nenhum evento foi gravado nesta sessão.")
-                else: # Outras condições (ex: current_action existe mas action_events está vazio)
-                    logger.info("Condição para salvamento não atendida (ex: ação atual sem eventos de ação).")
-            else:
-                logger.info("Gravação não foi iniciada ou nenhum evento significativo para salvar.")
+            self.action_watcher.stop()
+            for chord, callback in hotkeys:
+                self.hotkeys.remove_hotkey(chord, callback)
+            self.hotkeys.stop()
             
-            self.is_recording = False # Garante que o estado seja falso
-            self.start_time = None # Reseta para a próxima sessão de gravação
+            self.stop_recording()
             logger.info("Listener de hotkeys e limpeza finalizados.")
 
+    def _resolve_patterns_dir(self) -> str:
+        """Resolve o diretório de padrões configurado para um caminho absoluto."""
+        patterns_dir_config = self.config.get('Paths', 'patterns_directory', fallback='patterns')
+        if not os.path.isabs(patterns_dir_config):
+            return os.path.join(self.project_root, patterns_dir_config)
+        return patterns_dir_config
+
+    def _get_pattern_pack(self, abs_patterns_dir: str) -> 'PatternPack':
+        """Abre (uma vez) o pacote de padrões configurado."""
+        if self.pattern_pack is None:
+            from core.pattern_pack import PatternPack
+            pack_config = self.config.get('Paths', 'pattern_pack', fallback='').strip() or 'patterns.pack'
+            if not os.path.isabs(pack_config):
+                pack_config = os.path.join(abs_patterns_dir, pack_config)
+            self.pattern_pack = PatternPack(pack_config)
+        return self.pattern_pack
+
+    def _get_pattern_catalog(self, abs_patterns_dir: str) -> PatternCatalog:
+        """Abre (uma vez) o catálogo de padrões do diretório de padrões."""
+        if self.pattern_catalog is None:
+            self.pattern_catalog = PatternCatalog(
+                abs_patterns_dir, self.config.get('Paths', 'pattern_catalog', fallback=None))
+        return self.pattern_catalog
+
     def save_recording_for_action(self, action_name_line: str, events_to_save: List[Dict[str, Any]]) -> Optional[str]:
-        """Salva os eventos fornecidos em um arquivo JSON para a linha de nome de ação especificada."""
+        """Salva os eventos fornecidos em um arquivo de padrão (binário ou JSON) para a linha de ação especificada."""
         if not events_to_save:
             logger.warning(f"Nenhum evento para salvar para a ação: {action_name_line}")
             return None
         try:
-            patterns_dir_config = self.config.get('Paths', 'patterns_directory', fallback='patterns')
-            # Garante que patterns_dir seja absoluto
-            if not os.path.isabs(patterns_dir_config):
-                 abs_patterns_dir = os.path.join(self.project_root, patterns_dir_config)
-            else:
-                 abs_patterns_dir = patterns_dir_config
+            abs_patterns_dir = self.patterns_dir
             os.makedirs(abs_patterns_dir, exist_ok=True)
 
-            action_type, box_id = self._parse_action_line(action_name_line)
-            action_type = action_type or "unknown_action" # Fallback
+            command = parse_command(action_name_line)
+            action_type = command.action_type if command else "unknown_action" # Fallback
+            box_id = command.box_id if command else None
             
             safe_action_filename_base = "".join(c if c.isalnum() or c in ('_','-') else '_' for c in action_type)
             if box_id is not None:
                 safe_action_filename_base = f"{safe_action_filename_base}_box{box_id}"
 
             timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S_%f") # Adicionado microssegundos
-            filename = f"{safe_action_filename_base}_{timestamp_str}.json"
+            extension = PATTERN_EXTENSION if self.pattern_format == 'binary' else '.json'
+            filename = f"{safe_action_filename_base}_{timestamp_str}{extension}"
             filepath = os.path.join(abs_patterns_dir, filename)
             
             recording_data = {
@@ -450,20 +535,48 @@ class EventRecorder:
                 'parsed_action_type': action_type,
                 'parsed_box_id': box_id,
                 'save_timestamp': datetime.now().isoformat(),
-                'total_events': len(events_to_save),
-                'events': events_to_save
             }
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(recording_data, f, indent=2, ensure_ascii=False)
+            if self.simplify_tolerance_px > 0:
+                from core.trajectory import simplify_events, SIMPLIFIED_KEY
+                recorded_count = len(events_to_save)
+                events_to_save = simplify_events(events_to_save, self.simplify_tolerance_px, self.simplify_max_gap_ms)
+                recording_data[SIMPLIFIED_KEY] = {'tolerance_px': self.simplify_tolerance_px,
+                                                  'max_gap_ms': self.simplify_max_gap_ms}
+                logger.debug(f"Trajetória simplificada: {recorded_count} -> {len(events_to_save)} eventos")
+            recording_data['total_events'] = len(events_to_save)
+            if self.pattern_format == 'pack':
+                pack = self._get_pattern_pack(abs_patterns_dir)
+                entry = pack.append(events_to_save, recording_data, self.delta_encoding)
+                filepath = f"{pack.path}@{entry.offset}"
+            elif self.pattern_format == 'binary':
+                from core.pattern_format import write_pattern
+                write_pattern(filepath, events_to_save, recording_data, self.delta_encoding)
+            else:
+                recording_data['events'] = events_to_save
+                # Escreve em arquivo temporário e renomeia atomicamente
+                tmp_filepath = f"{filepath}.tmp"
+                with open(tmp_filepath, 'w', encoding='utf-8') as f:
+                    json.dump(recording_data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_filepath, filepath)
+            if self.pattern_format != 'pack':
+                # Atualiza o catálogo incrementalmente para o simulador encontrar o novo padrão
+                self._get_pattern_catalog(abs_patterns_dir).add(filepath, action_type, box_id)
             logger.info(f"Salvos {len(events_to_save)} eventos com sucesso em: {filepath}")
             return filepath
         except Exception as e:
             logger.error(f"Falha ao salvar gravação para ação '{action_name_line}': {str(e)}", exc_info=True)
             return None
 
-    def get_events(self) -> List[Dict[str, Any]]:
-        """Retorna uma cópia da lista de todos os eventos gravados (lista mestre)."""
-        return self.events.copy()
+    def get_events(self) -> EventView:
+        """Retorna uma visão somente leitura dos eventos ainda retidos em memória (sem cópia).
+        Segmentos já persistidos em disco foram descartados da memória."""
+        return self.event_store.view()
+
+    def get_current_action_events(self) -> EventView:
+        """Retorna uma visão somente leitura dos eventos do segmento de ação atual."""
+        if self.current_segment is None:
+            return self.event_store.view(len(self.event_store))
+        return self.event_store.segment_view(self.current_segment)
 
 
 if __name__ == "__main__":
@@ -472,11 +585,7 @@ if __name__ == "__main__":
     logger.info(f"Arquivo de configuração esperado em: {os.path.join(recorder.project_root, 'config.ini')}")
     logger.info(f"Arquivo de ações sugeridas: {recorder.suggested_actions_file}") 
     
-    patterns_dir_config_val = recorder.config.get('Paths', 'patterns_directory', fallback='patterns')
-    resolved_patterns_dir = patterns_dir_config_val
-    if not os.path.isabs(patterns_dir_config_val):
-        resolved_patterns_dir = os.path.join(recorder.project_root, patterns_dir_config_val)
-    logger.info(f"Diretório de padrões: {resolved_patterns_dir}")
+    logger.info(f"Diretório de padrões: {recorder.patterns_dir}")
 
     recorder.run_hotkey_listener()
     logger.info("Programa EventRecorder encerrado.")
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""Streaming write-ahead log for recordings.
+
+Capture callbacks hand events to RecordingLog.append, which only enqueues
+them. A background writer thread serializes the events as JSON lines into
+one append-only segment file per action, flushing whenever the buffered
+data exceeds a size budget or a time budget elapses. When an action ends,
+its segment is replayed from disk into the finalize callback (which writes
+the pattern file through a temporary file and an atomic rename) and the
+segment file is deleted.
+
+Segments left behind by a crash are finalized the next time the log
+starts, so at most the last flush interval of a session can be lost.
+Recovery runs on the writer thread, before it handles the new session's
+events, so starting a recording never waits for it. Segment filenames carry
+the writer's pid; segments of a process that is still running (another
+recorder sharing the directory, or this one) are left alone, except for
+segments this log itself failed to finalize, which are retried the next
+time it starts.
+"""
+import os
+import re
+import json
+import glob
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from core.events import Event
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.wal'
+
+# segment_<pid>_<milliseconds>_<seq>.wal, as written by _open_segment
+_SEGMENT_RE = re.compile(r'^segment_(\d+)_\d+_\d+' + re.escape(SEGMENT_SUFFIX) + '$')
+
+# Writer queue commands
+_EVENT = 0
+_BEGIN = 1
+_END = 2
+_STOP = 3
+
+FinalizeCallback = Callable[[str, List[Dict[str, Any]]], Optional[str]]
+SegmentClosedCallback = Callable[[int], None]
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with this pid is running (a reused pid counts as alive)."""
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def segment_owner(path: str) -> Optional[int]:
+    """The pid in a segment filename, or None for a name this module did not write."""
+    match = _SEGMENT_RE.match(os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def read_segment(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Read a segment file. Returns (header, events); a torn last line is skipped."""
+    header: Dict[str, Any] = {}
+    events: List[Dict[str, Any]] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping unreadable line {line_number + 1} in {path}")
+                continue
+            if line_number == 0:
+                header = record
+            else:
+                events.append(record)
+    return header, events
+
+
+class RecordingLog:
+    """Append-only on-disk event log with a background writer thread."""
+
+    def __init__(self, log_dir: str, finalize: FinalizeCallback,
+                 flush_bytes: int = 64 * 1024, flush_interval: float = 0.5, fsync: bool = True,
+                 on_segment_closed: Optional[SegmentClosedCallback] = None):
+        self.log_dir = log_dir
+        self.finalize = finalize
+        # Called from the writer thread with the segment id once the segment
+        # no longer needs to be kept in memory (finalized, discarded or empty)
+        self.on_segment_closed = on_segment_closed
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._queue: 'queue.SimpleQueue' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._segment_seq = 0
+        self._segment_open = False
+        # Own segments whose finalize failed, retried by the next recover()
+        self._kept: Set[str] = set()
+
+        # Writer thread state
+        self._file = None
+        self._seq: Optional[int] = None
+        self._path: Optional[str] = None
+        self._header: Dict[str, Any] = {}
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._event_count = 0
+        self._last_flush = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the writer thread, which first recovers leftover segments."""
+        if self.is_running:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='RecordingLogWriter', daemon=True)
+        self._thread.start()
+
+    def recover(self) -> List[str]:
+        """Finalize segments left behind by a previous session, and own segments
+        that failed to finalize earlier. Other segments of running processes,
+        this one included, are skipped."""
+        saved = []
+        for path in sorted(glob.glob(os.path.join(self.log_dir, f'*{SEGMENT_SUFFIX}'))):
+            owner = segment_owner(path)
+            if owner is not None and path not in self._kept and _pid_alive(owner):
+                logger.debug(f"Skipping segment {path} of running process {owner}")
+                continue
+            logger.info(f"Recovering unfinished recording segment {path}")
+            result = self._finalize_segment(path)
+            if result:
+                saved.append(result)
+        return saved
+
+    # ---- producer side (capture threads) ---------------------------------
+
+    def begin_segment(self, action_name_line: str) -> int:
+        """Start a new segment; events appended from now on belong to it. Returns its id."""
+        self._segment_seq += 1
+        self._segment_open = True
+        self._queue.put((_BEGIN, (self._segment_seq, action_name_line)))
+        return self._segment_seq
+
+    def append(self, event: Union[Event, Dict[str, Any]]) -> None:
+        """Queue an event for the current segment. Never blocks on I/O."""
+        if self._segment_open:
+            self._queue.put((_EVENT, event))
+
+    def end_segment(self, discard: bool = False) -> None:
+        """Close the current segment and finalize it into a pattern (or drop it)."""
+        if self._segment_open:
+            self._segment_open = False
+            self._queue.put((_END, discard))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Finalize the open segment and stop the writer, waiting up to timeout."""
+        self.end_segment()
+        if self._thread is not None:
+            self._queue.put((_STOP, None))
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Recording log writer did not stop in time")
+            self._thread = None
+
+    # ---- writer thread ---------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Recording segment recovery failed: {str(e)}", exc_info=True)
+        while True:
+            timeout = self.flush_interval
+            if self._buffer:
+                timeout = max(0.0, self._last_flush + self.flush_interval - time.monotonic())
+            try:
+                command, payload = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush()
+                continue
+
+            try:
+                if command == _EVENT:
+                    self._write_event(payload)
+                elif command == _BEGIN:
+                    self._close_segment(discard=False)
+                    self._open_segment(*payload)
+                elif command == _END:
+                    self._close_segment(discard=payload)
+                elif command == _STOP:
+                    self._close_segment(discard=False)
+                    return
+            except Exception as e:
+                logger.error(f"Recording log writer error: {str(e)}", exc_info=True)
+
+    def _open_segment(self, seq: int, action_name_line: str) -> None:
+        self._seq = seq
+        self._path = os.path.join(self.log_dir, f"segment_{os.getpid()}_{int(time.time() * 1000)}_{seq}{SEGMENT_SUFFIX}")
+        self._header = {'action_name_line': action_name_line, 'started': time.time()}
+        self._file = open(self._path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(self._header, ensure_ascii=False) + '\n')
+        self._event_count = 0
+        self._last_flush = time.monotonic()
+
+    def _write_event(self, event: Union[Event, Dict[str, Any]]) -> None:
+        if self._file is None:
+            return
+        if isinstance(event, Event):
+            event = event.to_dict()
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self._buffer.append(line)
+        self._buffered_bytes += len(line)
+        self._event_count += 1
+        if self._buffered_bytes >= self.flush_bytes:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if self._file is None or not self._buffer:
+            return
+        self._file.write(''.join(self._buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._buffer = []
+        self._buffered_bytes = 0
+
+    def _close_segment(self, discard: bool) -> None:
+        if self._file is None:
+            return
+        self._flush()
+        self._file.close()
+        self._file = None
+        path, self._path = self._path, None
+        seq, self._seq = self._seq, None
+        try:
+            if discard or self._event_count == 0:
+                os.remove(path)
+            else:
+                self._finalize_segment(path)
+        finally:
+            if self.on_segment_closed is not None:
+                self.on_segment_closed(seq)
+
+    def _finalize_segment(self, path: str) -> Optional[str]:
+        header, events = read_segment(path)
+        if not events:
+            os.remove(path)
+            self._kept.discard(path)
+            return None
+        action_name_line = header.get('action_name_line') or 'recovered_recording'
+        # Marked before finalize so a segment is retried even if finalize raises
+        self._kept.add(path)
+        result = self.finalize(action_name_line, events)
+        if result:
+            os.remove(path)
+            self._kept.discard(path)
+        else:
+            # Keep the segment so the next start can retry it
+            logger.error(f"Finalizing {path} failed; segment kept for recovery")
+        return result
@@ -0,0 +1,156 @@
+"""Stop and pause requests for a running replay.
+
+Any thread (a hotkey, the orchestrator) may request a stop, a pause or a
+resume; the replay loop notices the request at its next operation or, if
+it is waiting for a deadline, for the game window or for a resume, as soon
+as the request is made: every wait of the replay is a Condition wait that
+the request notifies, never a plain sleep. The loop then acknowledges the
+request, and the time between request and acknowledgement is recorded so
+the responsiveness of the replay can be reported and held to a budget.
+
+A replay job (loading a pattern, then replaying it) calls new_job() when it
+starts running and passes the token to begin(): a stop requested while the
+job was still loading is kept, so the replay stops before its first input.
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STOP = 'stop'
+PAUSE = 'pause'
+RESUME = 'resume'
+
+
+class ReplayControl:
+    """Interruptible waits for the replay loop and acknowledgement latency of control requests."""
+
+    def __init__(self, budget: float = 0.05, clock: Callable[[], float] = time.perf_counter):
+        # Acknowledgements slower than this (seconds) are logged as warnings
+        self.budget = budget
+        self.clock = clock
+        self._condition = threading.Condition()
+        # Plain attributes so the replay loop can check them without taking the lock
+        self.interrupted = False
+        self.stop_requested = False
+        self.pause_requested = False
+        # Token of the running job, and the job during which the pending stop was requested
+        self.job = 0
+        self._stop_job = -1
+        self._requested_at: Dict[str, float] = {}
+        self.latencies: Dict[str, List[float]] = {STOP: [], PAUSE: [], RESUME: []}
+
+    # ---- requests (any thread) ---------------------------------------------
+
+    def request_stop(self) -> None:
+        with self._condition:
+            if not self.stop_requested:
+                self.stop_requested = True
+                self._requested_at[STOP] = self.clock()
+            self._stop_job = self.job
+            self.interrupted = True
+            self._condition.notify_all()
+
+    def request_pause(self) -> None:
+        """Hold the replay before its next operation. A pause requested between replays
+        holds the next one at its start."""
+        with self._condition:
+            if not self.pause_requested:
+                self.pause_requested = True
+                self._requested_at[PAUSE] = self.clock()
+                self._requested_at.pop(RESUME, None)
+            self.interrupted = True
+            self._condition.notify_all()
+
+    def request_resume(self) -> None:
+        with self._condition:
+            if self.pause_requested:
+                self.pause_requested = False
+                self._requested_at[RESUME] = self.clock()
+                self._requested_at.pop(PAUSE, None)
+            self.interrupted = self.stop_requested
+            self._condition.notify_all()
+
+    def notify(self) -> None:
+        """Wake up a wait() so it re-evaluates its predicate (e.g. on a focus change)."""
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait_acknowledged(self, kind: str, timeout: Optional[float] = None) -> bool:
+        """Block until the replay has acknowledged the pending request of this kind."""
+        with self._condition:
+            return self._condition.wait_for(lambda: kind not in self._requested_at, timeout)
+
+    # ---- replay side -------------------------------------------------------
+
+    def new_job(self) -> int:
+        """A replay job starts running (before it loads its pattern). Returns its token for begin()."""
+        with self._condition:
+            self.job += 1
+            return self.job
+
+    def begin(self, job: Optional[int] = None) -> None:
+        """A replay starts: stop requests made before its job started (or, without a job token,
+        all of them) no longer apply; a pause still does, and its latency counts from now. The
+        latencies of the previous replay are cleared."""
+        with self._condition:
+            if job is None or self._stop_job < job:
+                self.stop_requested = False
+                self._requested_at.pop(STOP, None)
+            if self.pause_requested:
+                self._requested_at[PAUSE] = self.clock()
+            self.interrupted = self.pause_requested or self.stop_requested
+            for latencies in self.latencies.values():
+                latencies.clear()
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep that returns early when a stop or pause is requested."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.interrupted, seconds)
+
+    def wait(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """Block until predicate() holds or a stop or pause is requested. Returns predicate()."""
+        with self._condition:
+            self._condition.wait_for(lambda: self.interrupted or predicate(), timeout)
+            return predicate()
+
+    def hold(self) -> float:
+        """Block a replay that saw a pause request until it is resumed or stopped.
+        Returns how long it was held (seconds)."""
+        held_at = self.clock()
+        self.acknowledge(PAUSE)
+        with self._condition:
+            self._condition.wait_for(lambda: not self.pause_requested or self.stop_requested)
+            resumed = not self.pause_requested
+        if resumed:
+            self.acknowledge(RESUME)
+        return self.clock() - held_at
+
+    def acknowledge(self, kind: str) -> Optional[float]:
+        """Record that the replay acted on the pending request of this kind.
+        Returns the latency (seconds), or None if nothing was pending."""
+        with self._condition:
+            requested_at = self._requested_at.pop(kind, None)
+            if requested_at is None:
+                return None
+            latency = self.clock() - requested_at
+            self.latencies[kind].append(latency)
+            self._condition.notify_all()
+        if latency > self.budget:
+            logger.warning(f"Replay acknowledged {kind} after {latency * 1000.0:.1f} ms "
+                           f"(budget {self.budget * 1000.0:.0f} ms)")
+        else:
+            logger.debug(f"Replay acknowledged {kind} after {latency * 1000.0:.2f} ms")
+        return latency
+
+    def report(self) -> Dict[str, float]:
+        """Count and mean/max acknowledgement latency (milliseconds) per request kind, since begin()."""
+        report: Dict[str, float] = {}
+        for kind, latencies in self.latencies.items():
+            if latencies:
+                report[f'{kind}_acks'] = len(latencies)
+                report[f'{kind}_ack_mean_ms'] = sum(latencies) / len(latencies) * 1000.0
+                report[f'{kind}_ack_max_ms'] = max(latencies) * 1000.0
+        return report
@@ -0,0 +1,239 @@
+"""Precompiled replay plans.
+
+A pattern is compiled once into flat per-operation columns: an opcode, the
+deadline (time offset in ms), the cursor position and the pre-resolved
+input target (a pynput Key/KeyCode/Button). Mouse interpolation points are
+expanded at compile time into OP_STEP operations with their own deadlines,
+so the replay loop is a single walk over the plan with no type dispatch on
+strings, no per-event metric math and no key or button name parsing.
+
+Cursor updates are rate limited to max_rate_hz: recorded moves that fall
+into the same update tick are coalesced into the last one, so dense traces
+pass through without extra work, and interpolation points are only added
+across gaps longer than two ticks, never more densely than one per tick.
+
+A plan can be retimed for faster replay: retimed(speed, max_idle_ms)
+shortens every gap between recorded events longer than max_idle_ms to
+that cap, divides all gaps by speed, and moves interpolation points
+proportionally with the gap they belong to.
+
+Plans hold no reference to pynput themselves: the caller passes the
+resolve_key/resolve_button functions, which are applied once per distinct
+symbol.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.events import MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE
+from core.movement_metrics import event_columns, movement_metrics
+
+logger = logging.getLogger(__name__)
+
+# Opcodes
+OP_STEP = 0            # interpolation point; dropped when replay is behind
+OP_MOVE = 1
+OP_BUTTON_PRESS = 2
+OP_BUTTON_RELEASE = 3
+OP_KEY_PRESS = 4
+OP_KEY_RELEASE = 5
+OP_WAIT = 6            # pause: nothing to do but keep the deadline
+
+_OPCODES = np.full(256, OP_WAIT, dtype=np.uint8)
+_OPCODES[MOUSE_MOVE] = OP_MOVE
+_OPCODES[MOUSE_PRESS] = OP_BUTTON_PRESS
+_OPCODES[MOUSE_RELEASE] = OP_BUTTON_RELEASE
+_OPCODES[KEY_PRESS] = OP_KEY_PRESS
+_OPCODES[KEY_RELEASE] = OP_KEY_RELEASE
+
+_BUTTON_OPS = (OP_BUTTON_PRESS, OP_BUTTON_RELEASE)
+_POSITION_OPS = (OP_STEP, OP_MOVE) + _BUTTON_OPS
+_KEY_OPS = (OP_KEY_PRESS, OP_KEY_RELEASE)
+
+Resolver = Callable[[str], Any]
+
+
+class ReplayPlan:
+    """A compiled, reusable replay of one pattern."""
+
+    def __init__(self, events: Sequence, opcodes: np.ndarray, deadlines_ms: np.ndarray,
+                 x: np.ndarray, y: np.ndarray, event_index: np.ndarray, targets: List[Any]):
+        self.events = events
+        self.opcodes = opcodes
+        self.deadlines_ms = deadlines_ms
+        self.x = x
+        self.y = y
+        self.event_index = event_index
+        self.targets = targets
+        self._lists: Optional[Tuple[list, ...]] = None
+        self._retimed: Dict[Tuple[float, float], 'ReplayPlan'] = {}
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    @property
+    def origin_ms(self) -> float:
+        """Deadline of the first operation; replay anchors it at its start time."""
+        return float(self.deadlines_ms[0]) if len(self.deadlines_ms) else 0.0
+
+    @property
+    def duration_ms(self) -> float:
+        return float(self.deadlines_ms[-1]) - self.origin_ms if len(self.deadlines_ms) else 0.0
+
+    @property
+    def step_count(self) -> int:
+        return int(np.count_nonzero(self.opcodes == OP_STEP))
+
+    @property
+    def position_writes(self) -> int:
+        """Number of cursor position updates a full replay performs."""
+        return int(np.count_nonzero(np.isin(self.opcodes, _POSITION_OPS)))
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.opcodes, self.deadlines_ms, self.x, self.y, self.event_index)
+        return sum(a.nbytes for a in arrays) + 8 * len(self.targets) + int(getattr(self.events, 'nbytes', 0))
+
+    def retimed(self, speed: float = 1.0, max_idle_ms: float = 0.0) -> 'ReplayPlan':
+        """This plan with compressed timing (see compress_deadlines); cached per setting."""
+        if speed == 1.0 and max_idle_ms <= 0:
+            return self
+        key = (speed, max_idle_ms)
+        plan = self._retimed.get(key)
+        if plan is None:
+            deadlines = compress_deadlines(self.deadlines_ms, self.opcodes, speed, max_idle_ms)
+            plan = ReplayPlan(self.events, self.opcodes, deadlines, self.x, self.y, self.event_index, self.targets)
+            self._retimed[key] = plan
+        return plan
+
+    def columns(self) -> Tuple[list, list, list, list, List[Any], list]:
+        """(opcodes, deadlines_ms, x, y, targets, event_index) as Python lists.
+
+        Indexing lists in the replay loop is much cheaper than indexing NumPy
+        scalars; the conversion is done once and kept with the plan.
+        """
+        if self._lists is None:
+            self._lists = (self.opcodes.tolist(), self.deadlines_ms.tolist(), self.x.tolist(),
+                           self.y.tolist(), self.targets, self.event_index.tolist())
+        return self._lists
+
+
+def compress_deadlines(deadlines_ms: np.ndarray, opcodes: np.ndarray, speed: float = 1.0,
+                       max_idle_ms: float = 0.0) -> np.ndarray:
+    """Deadlines with idle gaps between recorded events capped at max_idle_ms (if > 0)
+    and divided by speed. A gap during which a button or key is held is not idle: it
+    is only scaled by speed, so a long hold is never turned into a tap. Interpolation
+    steps keep their relative position in their gap."""
+    if speed <= 0:
+        raise ValueError(f"speed must be positive, got {speed}")
+    knots = np.flatnonzero(opcodes != OP_STEP)
+    if not len(knots):
+        return deadlines_ms.copy()
+    recorded = deadlines_ms[knots]
+    gaps = np.diff(recorded)
+    if max_idle_ms > 0:
+        ops = opcodes[knots]
+        presses = (ops == OP_BUTTON_PRESS) | (ops == OP_KEY_PRESS)
+        releases = (ops == OP_BUTTON_RELEASE) | (ops == OP_KEY_RELEASE)
+        # Buttons and keys held after each event; releases of nothing (a recording
+        # that starts mid-hold) do not go below zero
+        running = np.cumsum(presses.astype(np.int64) - releases.astype(np.int64))
+        held = running - np.minimum.accumulate(np.minimum(running, 0))
+        idle = held[:-1] == 0
+        gaps = np.where(idle, np.minimum(gaps, max_idle_ms), gaps)
+    compressed = recorded[0] + np.concatenate(([0.0], np.cumsum(gaps / speed)))
+    return np.interp(deadlines_ms, recorded, compressed)
+
+
+def _event_symbols(events: Sequence, indices: np.ndarray) -> List[Optional[str]]:
+    columns = getattr(events, 'columns', None)
+    if columns is not None:
+        symbols = events.symbols
+        return [symbols[code] if code >= 0 else None for code in columns['code'][indices].tolist()]
+    return [events[i].symbol for i in indices.tolist()]
+
+
+def compile_plan(events: Sequence, resolve_key: Resolver, resolve_button: Resolver,
+                 step_px: float = 2.0, max_rate_hz: float = 250.0) -> ReplayPlan:
+    """Compile events into a ReplayPlan.
+
+    A move recorded after a gap of more than two update ticks gets OP_STEP
+    points along the straight line from the previous sample, one every
+    step_px pixels but at most one per tick, spread evenly over the gap.
+    Moves sharing an update tick with the next move are dropped.
+    max_rate_hz <= 0 disables both limits.
+    """
+    tick_ms = 1000.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+    types, offsets, xs, ys = event_columns(events)
+    count = len(types)
+    event_ops = _OPCODES[types]
+    offsets = offsets.astype(np.float64)
+    xs = xs.astype(np.int32)
+    ys = ys.astype(np.int32)
+
+    # Interpolation steps per event (moves only)
+    metrics = movement_metrics(events)
+    dt_ms = metrics[:, 0] * 1000.0
+    distance = metrics[:, 1]
+    interpolate = (event_ops == OP_MOVE) & (distance > 0) & (metrics[:, 2] > 0) & (dt_ms > 2 * tick_ms)
+    segments = distance / step_px
+    if tick_ms > 0:
+        segments = np.minimum(segments, dt_ms / tick_ms)
+    segments = np.where(interpolate, np.maximum(1, segments.astype(np.int64)), 1)
+    steps = segments - 1
+
+    # Steps of event i come right before event i's own operation
+    total = count + int(steps.sum())
+    event_pos = np.arange(count) + np.cumsum(steps)
+    opcodes = np.full(total, OP_STEP, dtype=np.uint8)
+    deadlines = np.empty(total, dtype=np.float64)
+    plan_x = np.empty(total, dtype=np.int32)
+    plan_y = np.empty(total, dtype=np.int32)
+    event_index = np.empty(total, dtype=np.int32)
+    opcodes[event_pos] = event_ops
+    deadlines[event_pos] = offsets
+    plan_x[event_pos] = xs
+    plan_y[event_pos] = ys
+    event_index[event_pos] = np.arange(count)
+
+    owners = np.repeat(np.arange(count), steps)
+    if len(owners):
+        k = np.arange(len(owners)) - np.repeat(np.cumsum(steps) - steps, steps) + 1
+        progress = k / segments[owners]
+        step_pos = event_pos[owners] - steps[owners] + k - 1
+        deadlines[step_pos] = offsets[owners] - dt_ms[owners] * (1.0 - progress)
+        plan_x[step_pos] = np.rint(xs[owners] - metrics[owners, 4] * (1.0 - progress))
+        plan_y[step_pos] = np.rint(ys[owners] - metrics[owners, 5] * (1.0 - progress))
+        event_index[step_pos] = owners
+
+    # Resolve each distinct key/button name once
+    targets: List[Any] = [None] * total
+    resolved: Dict[Tuple[bool, str], Any] = {}
+    input_events = np.flatnonzero(np.isin(event_ops, _BUTTON_OPS + _KEY_OPS))
+    for i, symbol in zip(input_events.tolist(), _event_symbols(events, input_events)):
+        if symbol is None:
+            continue
+        is_key = int(event_ops[i]) in _KEY_OPS
+        cache_key = (is_key, symbol)
+        if cache_key not in resolved:
+            try:
+                resolved[cache_key] = resolve_key(symbol) if is_key else resolve_button(symbol)
+            except Exception as e:
+                logger.warning(f"Cannot resolve {'key' if is_key else 'button'} {symbol!r}: {str(e)}")
+                resolved[cache_key] = None
+        targets[int(event_pos[i])] = resolved[cache_key]
+
+    if tick_ms > 0 and total > 1:
+        # Coalesce cursor-only updates that share a tick with the next one
+        movable = (opcodes == OP_STEP) | (opcodes == OP_MOVE)
+        tick = np.floor(deadlines / tick_ms)
+        dropped = np.zeros(total, dtype=bool)
+        dropped[:-1] = movable[:-1] & movable[1:] & (tick[:-1] == tick[1:])
+        if dropped.any():
+            kept = np.flatnonzero(~dropped)
+            opcodes, deadlines, plan_x, plan_y, event_index = (
+                a[kept] for a in (opcodes, deadlines, plan_x, plan_y, event_index))
+            targets = [targets[i] for i in kept.tolist()]
+
+    return ReplayPlan(events, opcodes, deadlines, plan_x, plan_y, event_index, targets)
@@ -0,0 +1,101 @@
+"""Absolute-deadline pacing for pattern replay.
+
+Every replayed event (and every interpolation step) is executed at the
+deadline start + time_offset on a monotonic clock, instead of sleeping
+the gap since the previous event. Sleep overshoot and the time spent
+driving the input controllers therefore never accumulate: a late event
+is executed immediately and the following ones are back on schedule.
+Waits sleep until shortly before the deadline and spin for the rest,
+which keeps timing within about a millisecond on platforms with a coarse
+sleep granularity. With an interrupted() check (and a sleep that returns
+early, such as ReplayControl.sleep) a wait is cut short as soon as the
+replay is stopped or paused.
+"""
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayScheduler:
+    """Runs replay steps against absolute monotonic deadlines and tracks lateness."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep, spin_threshold: float = 0.002,
+                 interrupted: Optional[Callable[[], bool]] = None):
+        self.clock = clock
+        self.sleep = sleep
+        self.interrupted = interrupted
+        self.spin_threshold = spin_threshold
+        self.start_time: Optional[float] = None
+        self._started_at = 0.0
+        self.lateness: List[float] = []
+        self._origin_ms = 0.0
+        self._last_offset_ms = 0.0
+
+    def start(self, origin_ms: float = 0.0) -> None:
+        """Anchor offset origin_ms (usually the first event's) at the current time
+        and clear the lateness log."""
+        self._started_at = self.clock()
+        self.start_time = self._started_at - origin_ms / 1000.0
+        self.lateness = []
+        self._origin_ms = self._last_offset_ms = origin_ms
+
+    def shift(self, seconds: float) -> None:
+        """Move all remaining deadlines later, e.g. after replay was paused."""
+        if self.start_time is not None:
+            self.start_time += seconds
+
+    def deadline(self, offset_ms: float) -> float:
+        return self.start_time + offset_ms / 1000.0
+
+    def is_due(self, offset_ms: float) -> bool:
+        """Whether the deadline for offset_ms has already passed."""
+        return self.clock() >= self.deadline(offset_ms)
+
+    def wait_until(self, offset_ms: float) -> Optional[float]:
+        """Block until the deadline of offset_ms. Returns how late we are (seconds, >= 0),
+        or None if the wait was interrupted."""
+        if self.start_time is None:
+            self.start()
+        deadline = self.deadline(offset_ms)
+        remaining = deadline - self.clock()
+        if remaining > self.spin_threshold:
+            self.sleep(remaining - self.spin_threshold)
+        interrupted = self.interrupted
+        now = self.clock()
+        if interrupted is None:
+            while now < deadline:
+                now = self.clock()
+        else:
+            while now < deadline:
+                if interrupted():
+                    return None
+                now = self.clock()
+        return now - deadline
+
+    def record(self, offset_ms: float, lateness: float) -> None:
+        """Log the lateness of one replayed event."""
+        self.lateness.append(lateness)
+        self._last_offset_ms = offset_ms
+
+    def report(self) -> Dict[str, float]:
+        """Lateness statistics (milliseconds) and wall-clock vs scheduled duration (seconds)."""
+        import numpy as np
+        lateness_ms = np.asarray(self.lateness, dtype=np.float64) * 1000.0
+        report = {
+            'events': len(lateness_ms),
+            'scheduled_duration': (self._last_offset_ms - self._origin_ms) / 1000.0,
+            'elapsed': (self.clock() - self._started_at) if self.start_time is not None else 0.0,
+        }
+        if len(lateness_ms):
+            p50, p95, p99 = np.percentile(lateness_ms, (50, 95, 99))
+            report.update({
+                'lateness_mean_ms': float(lateness_ms.mean()),
+                'lateness_p50_ms': float(p50),
+                'lateness_p95_ms': float(p95),
+                'lateness_p99_ms': float(p99),
+                'lateness_max_ms': float(lateness_ms.max()),
+            })
+        return report
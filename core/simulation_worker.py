@@ -0,0 +1,95 @@
+"""Dedicated replay thread fed by a command queue.
+
+Replays used to run on whichever thread asked for them, including the
+hotkey listener, which then could not deliver the stop hotkey until the
+replay was over. SimulationWorker runs them one at a time on its own
+thread; callers submit a job and get a Future back immediately. Stopping
+and pausing do not go through the queue (the worker is busy with the very
+replay they target): they are ReplayControl requests, and
+cancel_pending() drops the jobs still queued behind it.
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_RUN = 0
+_SHUTDOWN = 1
+
+_Entry = Tuple[int, Optional[Callable[[], Any]], Optional[Future]]
+
+
+class SimulationWorker:
+    """Runs submitted replay jobs in order on one background thread."""
+
+    def __init__(self, name: str = 'SimulationWorker'):
+        self.name = name
+        self._commands: Deque[_Entry] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_busy(self) -> bool:
+        """Whether a job is running or queued."""
+        with self._condition:
+            return self._busy or any(kind == _RUN for kind, _, _ in self._commands)
+
+    def submit(self, job: Callable[[], Any]) -> Future:
+        """Queue job() behind the jobs already submitted; the thread is started on first use."""
+        future: Future = Future()
+        with self._condition:
+            self._commands.append((_RUN, job, future))
+            self._condition.notify()
+            if not self.is_running:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return future
+
+    def cancel_pending(self) -> int:
+        """Cancel the jobs that have not started yet. Returns how many were cancelled."""
+        with self._condition:
+            pending = [command for command in self._commands if command[0] == _RUN]
+            self._commands = deque(command for command in self._commands if command[0] != _RUN)
+        for _, _, future in pending:
+            future.cancel()
+        return len(pending)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Cancel queued jobs, let the running one finish and stop the thread."""
+        self.cancel_pending()
+        if self._thread is None:
+            return
+        with self._condition:
+            self._commands.append((_SHUTDOWN, None, None))
+            self._condition.notify()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("Simulation worker did not stop in time")
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._commands))
+                kind, job, future = self._commands.popleft()
+                if kind == _SHUTDOWN:
+                    return
+                self._busy = True
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(job())
+                    except BaseException as e:
+                        logger.error(f"Simulation job failed: {str(e)}", exc_info=True)
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._busy = False
@@ -1,16 +1,28 @@
 import json
 import time
-import math
-import numpy as np
-from typing import List, Dict, Any, Optional, Tuple
-from pynput import mouse, keyboard
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Sequence
 import logging
 import os
-from datetime import datetime
+import threading
 import configparser
-import random
-from collections import deque
-import pygetwindow as gw
+from concurrent.futures import Future
+from core.pattern_catalog import PatternCatalog
+from core.pattern_cache import PatternCache
+from core.replay_scheduler import ReplayScheduler
+from core.replay_control import ReplayControl, STOP
+from core.simulation_worker import SimulationWorker
+from core.hotkey_manager import HotkeyManager
+from core.focus_monitor import FocusMonitor
+from core.action_queue import ActionQueue
+from core.command_parser import Command, normalize_action_type, parse_command
+from core.events import Event
+
+# The NumPy-backed pattern modules and the input backends (pynput, pyautogui)
+# are imported where they are first used, keeping them off the startup path
+if TYPE_CHECKING:
+    from core.input_backends import InputBackend
+    from core.pattern_pack import PatternPack
+    from core.replay_plan import ReplayPlan
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,52 +30,141 @@ logger = logging.getLogger(__name__)
 
 class EventSimulator:
     def __init__(self):
-        self.events: List[Dict[str, Any]] = []
+        self.events: Sequence[Event] = []
+        # Compiled form of self.events, shared through the pattern cache
+        self.plan: Optional['ReplayPlan'] = None
+        self.plan_action_type: Optional[str] = None
         self.current_event_index: int = 0
         self.is_simulating: bool = False
-        self.mouse_controller: Optional[mouse.Controller] = None
-        self.keyboard_controller: Optional[keyboard.Controller] = None
         self.config = self._load_config()
+        # Stop/pause requests from other threads; every wait of the replay loop wakes up on them
+        self.replay_control = ReplayControl(
+            budget=self.config.getfloat('Simulation', 'control_ack_budget_ms', fallback=50.0) / 1000.0)
+        # Replays run here, never on the thread that asked for them (e.g. the hotkey listener)
+        self.worker = SimulationWorker()
+        # Replay control token of the job running on the worker
+        self._job: Optional[int] = None
+        # Mouse/keyboard output: pynput, pyautogui or the headless 'null' recorder, created on first use
+        self._input_backend: Optional['InputBackend'] = None
+        self._backend_lock = threading.Lock()
         
         # Movement tracking
         self.last_position: Optional[Tuple[int, int]] = None
-        self.last_time: Optional[float] = None
+
+        # Replay pacing against absolute deadlines; waits also end when the game window loses focus
+        control = self.replay_control
+        self.scheduler = ReplayScheduler(
+            sleep=self._replay_sleep, interrupted=self._replay_interrupted,
+            spin_threshold=self.config.getfloat('Simulation', 'scheduler_spin_ms', fallback=2.0) / 1000.0)
+        self.last_replay_report: Dict[str, float] = {}
+        # Cursor updates per second during replay; denser recorded moves are coalesced
+        self.max_mouse_update_hz = self.config.getfloat('Simulation', 'max_mouse_update_hz', fallback=250.0)
+        self.interpolation_step_px = self.config.getfloat('Simulation', 'interpolation_step_px', fallback=2.0)
         
-        # Screen information
-        self.screen_width = 0
-        self.screen_height = 0
-        self._initialize_screen_info()
+        # Screen information, queried from the input backend on first access
+        self._screen_size: Optional[Tuple[int, int]] = None
         
-        # Window focus tracking
+        # Window focus tracking, published by a background monitor thread
         self.game_window_title = self.config.get('Window', 'game_title', fallback='RuneLite')
-        self.last_focus_check = 0
-        self.focus_check_interval = 0.1  # Check focus every 100ms
+        self.focus_monitor = FocusMonitor(
+            self.game_window_title,
+            poll_interval=self.config.getfloat('Window', 'focus_poll_interval', fallback=0.05),
+            backend=self.config.get('Window', 'focus_backend', fallback='auto').strip().lower())
+        # Focus changes wake up a replay waiting for the game window
+        self.focus_monitor.add_listener(lambda focused: control.notify())
         
-        # Hotkey tracking
-        self.hotkey_listener: Optional[keyboard.Listener] = None
+        # Hotkeys (F2 start, F3 stop), on the shared keyboard hook while run() is active
+        self.hotkeys = HotkeyManager()
         
         # Pattern management
         self.patterns_dir = os.path.abspath(self.config.get('Paths', 'patterns_directory'))
         self.suggested_actions_file = os.path.abspath(self.config.get('Paths', 'suggested_actions'))
-        self.last_action_check = 0
-        self.action_check_interval = 0.1  # Check for new actions every 100ms
-        self.pattern_cache = {}  # Cache for loaded patterns
+        # Actions are tailed from suggested_actions.txt; consumption is tracked in a cursor file
+        self.action_queue = ActionQueue(
+            self.suggested_actions_file, parse=parse_command,
+            cursor_path=self.config.get('Paths', 'actions_cursor', fallback='').strip() or None,
+            backend=self.config.get('Paths', 'actions_watch_backend', fallback='auto').strip().lower(),
+            poll_interval=self.config.getfloat('Paths', 'actions_poll_interval', fallback=0.1))
+        self.action_queue.open()
+        # LRU cache of parsed patterns, invalidated when a pattern file changes
+        self.pattern_cache = PatternCache(
+            max_entries=self.config.getint('Simulation', 'pattern_cache_entries', fallback=32),
+            max_bytes=int(self.config.getfloat('Simulation', 'pattern_cache_mb', fallback=64) * 1024 * 1024))
         logger.info(f"Using absolute patterns directory: {self.patterns_dir}")
 
+        # Persistent (action_type, box_id) -> pattern file index
+        self.pattern_catalog = PatternCatalog(
+            self.patterns_dir, self.config.get('Paths', 'pattern_catalog', fallback=None))
+        # Optional memory-mapped pattern pack, consulted before individual files
+        self.pattern_pack: Optional['PatternPack'] = None
+
         # Initialize with most recent action
         self.current_action = self._get_most_recent_action()
-        if self.current_action:
-            self._load_pattern_for_action(self.current_action)
 
-    def _initialize_screen_info(self) -> None:
-        """Initialize screen information for movement scaling."""
+        # Catalog sync, opening the pack and loading the current action's pattern run in the
+        # background; everything that needs a pattern waits for patterns_ready first
+        self.patterns_ready = threading.Event()
+        self._discovery = threading.Thread(target=self._discover_patterns, name='PatternDiscovery', daemon=True)
+        self._discovery.start()
+
+    def _discover_patterns(self) -> None:
+        start = time.perf_counter()
         try:
-            import pyautogui
-            self.screen_width, self.screen_height = pyautogui.size()
+            self.pattern_catalog.sync()
+            pack_path = self.config.get('Paths', 'pattern_pack', fallback='').strip()
+            if pack_path:
+                try:
+                    from core.pattern_pack import PatternPack
+                    self.pattern_pack = PatternPack(os.path.join(self.patterns_dir, pack_path))
+                    logger.info(f"Using pattern pack {self.pattern_pack.path} ({len(self.pattern_pack)} records)")
+                except Exception as e:
+                    logger.error(f"Failed to open pattern pack {pack_path}: {str(e)}")
+            if self.current_action:
+                self._load_pattern_for_action(self.current_action)
         except Exception as e:
-            logger.error(f"Failed to get screen size: {str(e)}")
-            self.screen_width = 1920  # Default fallback
-            self.screen_height = 1080
+            logger.error(f"Pattern discovery failed: {str(e)}", exc_info=True)
+        finally:
+            self.patterns_ready.set()
+        logger.debug(f"Pattern discovery took {(time.perf_counter() - start) * 1000.0:.1f} ms")
+
+    def wait_for_patterns(self, timeout: Optional[float] = None) -> bool:
+        """Block until background pattern discovery has finished. Returns whether it has."""
+        if threading.current_thread() is self._discovery:
+            return self.patterns_ready.is_set()
+        return self.patterns_ready.wait(timeout)
+
+    @property
+    def input_backend(self) -> 'InputBackend':
+        if self._input_backend is None:
+            with self._backend_lock:
+                if self._input_backend is None:
+                    from core.input_backends import create_backend
+                    self._input_backend = create_backend(
+                        self.config.get('Simulation', 'input_backend', fallback='pynput'))
+        return self._input_backend
+
+    @input_backend.setter
+    def input_backend(self, backend: 'InputBackend') -> None:
+        self._input_backend = backend
+
+    @property
+    def screen_width(self) -> int:
+        return self._get_screen_size()[0]
+
+    @property
+    def screen_height(self) -> int:
+        return self._get_screen_size()[1]
+
+    def _get_screen_size(self) -> Tuple[int, int]:
+        """Screen size for movement scaling, from the input backend."""
+        if self._screen_size is None:
+            try:
+                width, height = self.input_backend.screen_size()
+                self._screen_size = (width, height)
+            except Exception as e:
+                logger.error(f"Failed to get screen size: {str(e)}")
+                self._screen_size = (1920, 1080)  # Default fallback
+        return self._screen_size
 
     def _load_config(self) -> configparser.ConfigParser:
         """Load configuration from config.ini."""
@@ -72,143 +173,112 @@ class EventSimulator:
         config.read(config_path)
         return config
 
+    @staticmethod
+    def _read_recording(filepath: str):
+        """Parse a recording file (JSON or binary pattern) into a sequence of Events."""
+        from core.pattern_format import is_binary_pattern, read_pattern
+        if is_binary_pattern(filepath):
+            return read_pattern(filepath)
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        return [Event.from_dict(event) for event in data['events']]
+
+    def _compile_plan(self, events: Sequence[Event]) -> 'ReplayPlan':
+        from core.replay_plan import compile_plan
+        backend = self.input_backend
+        return compile_plan(events, backend.resolve_key, backend.resolve_button,
+                            step_px=self.interpolation_step_px, max_rate_hz=self.max_mouse_update_hz)
+
+    def _read_plan(self, filepath: str) -> 'ReplayPlan':
+        """Cache loader: parse a pattern file and compile it."""
+        return self._compile_plan(self._read_recording(filepath))
+
+    def _set_plan(self, plan: 'ReplayPlan') -> None:
+        self.plan = plan
+        self.events = plan.events
+        self.current_event_index = 0
+
     def load_recording(self, filepath: str) -> bool:
-        """Load a recording file and prepare it for simulation."""
+        """Load a recording file through the pattern cache and prepare it for simulation."""
+        # Not overwritten afterwards by the initial action's pattern
+        self.wait_for_patterns()
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
-                self.events = data['events']
-                self.current_event_index = 0
-                logger.info(f"Loaded recording with {len(self.events)} events")
-                return True
+            self._set_plan(self.pattern_cache.get(filepath, self._read_plan))
+            logger.info(f"Loaded recording with {len(self.events)} events "
+                        f"({len(self.plan)} replay operations, {self.plan.position_writes} cursor updates)")
+            logger.debug(f"Pattern cache stats: {self.pattern_cache.stats()}")
+            return True
         except Exception as e:
             logger.error(f"Failed to load recording: {str(e)}")
             return False
 
+    def _load_pattern(self, action_type: str, box_id: Optional[int] = None) -> Optional[str]:
+        """Load the best pattern for an action, from the pack if possible.
+        Returns a description of the pattern source, or None if nothing was loaded."""
+        self.plan_action_type = action_type
+        if self.pattern_pack is not None:
+            entry = self.pattern_pack.find(action_type, box_id)
+            if entry is not None:
+                pack = self.pattern_pack
+                # Records never change once appended: validated by the entry, not the pack's stat
+                self._set_plan(self.pattern_cache.get(
+                    pack.path, lambda _path: self._compile_plan(pack.load(entry)),
+                    key=f"{pack.path}@{entry.offset}", version=entry))
+                logger.info(f"Loaded recording with {len(self.events)} events from pattern pack")
+                return f"{os.path.basename(self.pattern_pack.path)}@{entry.offset}"
+
+        pattern_file = self._get_pattern_file(action_type, box_id)
+        if pattern_file and self.load_recording(pattern_file):
+            return os.path.basename(pattern_file)
+        return None
+
     def _is_game_window_focused(self) -> bool:
-        """Check if the game window is currently focused."""
-        current_time = time.time()
-        if current_time - self.last_focus_check < self.focus_check_interval:
-            return True  # Return cached result if not enough time has passed
-            
-        self.last_focus_check = current_time
-        try:
-            active_window = gw.getActiveWindow()
-            return active_window and self.game_window_title in active_window.title
-        except Exception as e:
-            logger.error(f"Error checking window focus: {str(e)}")
-            return False
+        """Check if the game window is currently focused (no window query on this thread)."""
+        if not self.focus_monitor.is_running:
+            self.focus_monitor.start()
+        return self.focus_monitor.is_focused()
 
-    def _simulate_mouse_move(self, event: Dict[str, Any]) -> None:
-        """Simulate a mouse movement event with exact path replication."""
-        if not self._is_game_window_focused():
-            logger.warning("Game window not focused, skipping mouse movement")
-            return
-            
-        if not self.mouse_controller:
-            self.mouse_controller = mouse.Controller()
-        
-        # Get current position
-        current_pos = self.mouse_controller.position
-        target_pos = (event['x'], event['y'])
-        
-        # Calculate time to wait based on the event's time offset
-        if self.last_time is not None:
-            time_to_wait = (event['time_offset_ms'] - self.last_time) / 1000.0
-            if time_to_wait > 0:
-                time.sleep(time_to_wait)
-        
-        # If we have movement metrics, replicate the exact movement
-        if 'movement_metrics' in event and event['movement_metrics']:
-            metrics = event['movement_metrics']
-            
-            # Calculate number of steps based on distance and speed
-            distance = metrics['distance']
-            speed = metrics['speed']
-            dt = metrics['dt']
-            
-            if distance > 0 and speed > 0:
-                # Calculate number of steps to make movement smooth
-                num_steps = max(1, int(distance / 2))  # One step every 2 pixels
-                step_time = dt / num_steps
-                
-                # Move in small steps to replicate the exact path
-                for i in range(num_steps):
-                    # Calculate intermediate position
-                    progress = (i + 1) / num_steps
-                    dx = metrics['dx'] * progress
-                    dy = metrics['dy'] * progress
-                    
-                    # Move to intermediate position
-                    intermediate_pos = (
-                        current_pos[0] + dx,
-                        current_pos[1] + dy
-                    )
-                    self.mouse_controller.position = intermediate_pos
-                    
-                    # Wait for the exact time between steps
-                    time.sleep(step_time)
-        
-        # Ensure we end up at the exact target position
-        self.mouse_controller.position = target_pos
-        self.last_position = target_pos
-        self.last_time = event['time_offset_ms']
+    def _focus_lost(self) -> bool:
+        return not self.focus_monitor.focused.is_set()
 
-    def _simulate_mouse_click(self, event: Dict[str, Any]) -> None:
-        """Simulate a mouse click event with precise timing."""
-        if not self._is_game_window_focused():
-            logger.warning("Game window not focused, skipping mouse click")
-            return
-            
-        if not self.mouse_controller:
-            self.mouse_controller = mouse.Controller()
-        
-        # Move to click position first
-        self._simulate_mouse_move(event)
-        
-        # Get button from event
-        button_str = event['button']
-        button = mouse.Button.left if 'left' in button_str.lower() else mouse.Button.right
-        
-        if event['type'] == 'mouse_click_press':
-            self.mouse_controller.press(button)
-        else:  # mouse_click_release
-            # Use exact recorded hold duration
-            hold_duration = event.get('hold_duration_ms', 100) / 1000.0
-            time.sleep(hold_duration)
-            self.mouse_controller.release(button)
-
-    def _simulate_key_press(self, event: Dict[str, Any]) -> None:
-        """Simulate a keyboard press event with precise timing."""
-        if not self._is_game_window_focused():
-            logger.warning("Game window not focused, skipping key press")
-            return
-            
-        if not self.keyboard_controller:
-            self.keyboard_controller = keyboard.Controller()
-        
-        # Convert key string to Key object
-        key_str = event['key']
-        try:
-            key = keyboard.Key[key_str]
-        except KeyError:
-            key = keyboard.KeyCode.from_char(key_str)
-        
-        if event['type'] == 'key_press':
-            self.keyboard_controller.press(key)
-        else:  # key_release
-            # Use exact recorded hold duration
-            hold_duration = event.get('hold_duration_ms', 100) / 1000.0
-            time.sleep(hold_duration)
-            self.keyboard_controller.release(key)
-
-    def _simulate_pause(self, event: Dict[str, Any]) -> None:
-        """Simulate a pause event with precise timing."""
-        duration = event['duration_ms'] / 1000.0  # Convert to seconds
-        time.sleep(duration)
+    def _replay_interrupted(self) -> bool:
+        return self.replay_control.interrupted or self._focus_lost()
+
+    def _replay_sleep(self, seconds: float) -> None:
+        """Deadline sleep that returns early on a stop or pause request or when focus is lost."""
+        self.replay_control.wait(self._focus_lost, seconds)
+
+    def _wait_for_focus(self) -> float:
+        """Block until the game window is focused again or the simulation is stopped.
+        Returns how long we waited (seconds)."""
+        paused_at = time.perf_counter()
+        self.replay_control.wait(self.focus_monitor.is_focused)
+        return time.perf_counter() - paused_at
+
+    def _replay_timing(self, action_type: Optional[str]) -> Tuple[float, float]:
+        """(speed_multiplier, max_idle_pause_ms) for an action: a [Simulation:<action type>]
+        section overrides the [Simulation] defaults."""
+        speed = self.config.getfloat('Simulation', 'speed_multiplier', fallback=1.0)
+        idle_cap = self.config.getfloat('Simulation', 'max_idle_pause_ms', fallback=0.0)
+        if action_type:
+            wanted = normalize_action_type(action_type)
+            for section in self.config.sections():
+                if section.startswith('Simulation:') and normalize_action_type(section[11:]) == wanted:
+                    speed = self.config.getfloat(section, 'speed_multiplier', fallback=speed)
+                    idle_cap = self.config.getfloat(section, 'max_idle_pause_ms', fallback=idle_cap)
+                    break
+        if speed <= 0:
+            logger.warning(f"Ignoring non-positive speed_multiplier {speed} for {action_type}")
+            speed = 1.0
+        return speed, idle_cap
 
     def start_simulation(self) -> None:
         """Start simulating the loaded recording with precise accuracy."""
+        from core.replay_plan import (
+            OP_STEP, OP_MOVE, OP_BUTTON_PRESS, OP_BUTTON_RELEASE, OP_KEY_PRESS, OP_KEY_RELEASE,
+        )
+        # The initial action's pattern may still be loading
+        self.wait_for_patterns()
         if not self.events:
             logger.warning("No events loaded for simulation")
             return
@@ -216,196 +286,285 @@ class EventSimulator:
         if not self._is_game_window_focused():
             logger.warning("Game window not focused, cannot start simulation")
             return
+
+        # Plans are compiled on load; only events assigned directly need compiling here
+        if self.plan is None or self.plan.events is not self.events:
+            self.plan = self._compile_plan(self.events)
+        speed, idle_cap = self._replay_timing(self.plan_action_type)
+        plan = self.plan.retimed(speed, idle_cap)
             
+        control = self.replay_control
+        control.begin(self._job)
         self.is_simulating = True
         self.current_event_index = 0
-        self.mouse_controller = mouse.Controller()
-        self.keyboard_controller = keyboard.Controller()
-        self.last_time = None  # Reset last time at start
+        backend = self.input_backend
+        move = backend.move
+        # Batching backends get one flush per distinct deadline
+        batching = backend.supports_batching
+        opcodes, deadlines, xs, ys, targets, event_index = plan.columns()
+        op_count = len(opcodes)
         
-        logger.info("Starting simulation")
+        if plan is not self.plan:
+            logger.info(f"Starting simulation at {speed:g}x speed"
+                        + (f", idle pauses capped at {idle_cap:g} ms" if idle_cap > 0 else "")
+                        + f" ({self.plan.duration_ms / 1000.0:.2f}s -> {plan.duration_ms / 1000.0:.2f}s)")
+        else:
+            logger.info("Starting simulation")
+        # Every operation runs at start + its deadline; pauses and hold durations
+        # are just gaps between deadlines, so they need no sleep of their own
+        scheduler = self.scheduler
+        scheduler.start(plan.origin_ms)
+        wait_until = scheduler.wait_until
+        focused = self.focus_monitor.focused
         
         try:
-            while self.is_simulating and self.current_event_index < len(self.events):
-                if not self._is_game_window_focused():
+            i = 0
+            while i < op_count:
+                # Stop and pause requests are acknowledged before the next operation
+                if control.interrupted:
+                    if control.stop_requested:
+                        control.acknowledge(STOP)
+                        break
+                    if control.pause_requested:
+                        logger.info("Simulation paused")
+                        # Do not rush through the events that fell due while paused
+                        scheduler.shift(control.hold())
+                        if not control.stop_requested:
+                            logger.info("Resuming simulation")
+                        continue
+                if not focused.is_set():
                     logger.warning("Game window lost focus, pausing simulation")
-                    time.sleep(0.1)  # Wait a bit before checking again
+                    scheduler.shift(self._wait_for_focus())
+                    if not control.stop_requested:
+                        logger.info("Game window focused again, resuming simulation")
                     continue
-                    
-                event = self.events[self.current_event_index]
-                
-                # Simulate based on event type
-                if event['type'] == 'mouse_move':
-                    self._simulate_mouse_move(event)
-                elif event['type'] in ['mouse_click_press', 'mouse_click_release']:
-                    self._simulate_mouse_click(event)
-                elif event['type'] in ['key_press', 'key_release']:
-                    self._simulate_key_press(event)
-                elif event['type'] == 'pause':
-                    self._simulate_pause(event)
-                
-                self.current_event_index += 1
+
+                op = opcodes[i]
+                if op == OP_STEP:
+                    # Interpolation points are dropped while behind schedule
+                    if i + 1 < op_count and scheduler.is_due(deadlines[i + 1]):
+                        i += 1
+                        continue
+                    # Focus may have gone between the wait and now
+                    if wait_until(deadlines[i]) is None or not focused.is_set():
+                        continue
+                    move(xs[i], ys[i])
+                    if batching:
+                        backend.flush()
+                    i += 1
+                    continue
+
+                lateness = wait_until(deadlines[i])
+                if lateness is None or not focused.is_set():
+                    continue
+                if op == OP_MOVE:
+                    move(xs[i], ys[i])
+                elif op == OP_BUTTON_PRESS or op == OP_BUTTON_RELEASE:
+                    # Clicks happen at their recorded position
+                    move(xs[i], ys[i])
+                    if targets[i] is not None:
+                        if op == OP_BUTTON_PRESS:
+                            backend.press_button(targets[i])
+                        else:
+                            backend.release_button(targets[i])
+                elif op == OP_KEY_PRESS:
+                    if targets[i] is not None:
+                        backend.press_key(targets[i])
+                elif op == OP_KEY_RELEASE:
+                    if targets[i] is not None:
+                        backend.release_key(targets[i])
+                if batching and (i + 1 == op_count or deadlines[i + 1] != deadlines[i]):
+                    backend.flush()
+                scheduler.record(deadlines[i], lateness)
+                self.current_event_index = event_index[i] + 1
+                i += 1
                 
         except Exception as e:
             logger.error(f"Error during simulation: {str(e)}")
         finally:
             self.is_simulating = False
+            backend.flush()
+            report = scheduler.report()
+            # Speedup relative to the pattern's recorded duration, as actually achieved
+            report['pattern_duration'] = self.plan.duration_ms / 1000.0
+            if report['elapsed'] > 0 and self.current_event_index >= len(self.events):
+                report['effective_speedup'] = report['pattern_duration'] / report['elapsed']
+            # How quickly this replay acted on stop/pause/resume requests
+            report.update(control.report())
+            self.last_replay_report = report
+            self._log_replay_report(self.last_replay_report)
             logger.info("Simulation stopped")
 
-    def stop_simulation(self) -> None:
-        """Stop the current simulation."""
-        self.is_simulating = False
-        logger.info("Stopped simulation")
+    @staticmethod
+    def _log_replay_report(report: Dict[str, float]) -> None:
+        """Log how closely the replay followed the recorded timing."""
+        if not report.get('events'):
+            return
+        speedup = f", {report['effective_speedup']:.2f}x effective speedup" if 'effective_speedup' in report else ""
+        acks = "".join(f"; {kind} acknowledged in {report[f'{kind}_ack_max_ms']:.2f} ms max over {report[f'{kind}_acks']}"
+                       for kind in ('stop', 'pause', 'resume') if f'{kind}_acks' in report)
+        logger.info(
+            f"Replayed {report['events']} events in {report['elapsed']:.3f}s "
+            f"(scheduled {report['scheduled_duration']:.3f}s, recorded {report['pattern_duration']:.3f}s{speedup}); "
+            f"lateness ms p50={report['lateness_p50_ms']:.2f} p95={report['lateness_p95_ms']:.2f} "
+            f"p99={report['lateness_p99_ms']:.2f} max={report['lateness_max_ms']:.2f}{acks}")
+
+    def stop_simulation(self, timeout: Optional[float] = None) -> bool:
+        """Stop the current simulation and drop the queued ones. With a timeout, wait that long
+        for the replay to acknowledge; returns whether it did (True if nothing was running)."""
+        cancelled = self.worker.cancel_pending()
+        running = self.is_simulating
+        self.replay_control.request_stop()
+        logger.info("Stopped simulation" + (f", {cancelled} queued simulations cancelled" if cancelled else ""))
+        if timeout is None or not running:
+            return True
+        return self.replay_control.wait_acknowledged(STOP, timeout)
 
-    def _on_hotkey(self, key: keyboard.Key) -> None:
-        """Handle hotkey presses."""
-        if key == keyboard.Key.f2 and not self.is_simulating:
+    def pause_simulation(self) -> None:
+        """Hold the replay before its next operation; the schedule is shifted by the pause on resume."""
+        self.replay_control.request_pause()
+
+    def resume_simulation(self) -> None:
+        self.replay_control.request_resume()
+
+    def submit(self, command: Optional[Command] = None) -> Future:
+        """Simulate an action (or the loaded recording) on the simulation worker."""
+        if command is None:
+            return self._submit_job(self.start_simulation)
+        return self._submit_job(lambda: self.simulate_action(command))
+
+    def _submit_job(self, job: Callable[[], Any]) -> Future:
+        def run():
+            # From here on a stop request applies to this job, even while its pattern is loading
+            self._job = self.replay_control.new_job()
+            try:
+                return job()
+            finally:
+                self._job = None
+        return self.worker.submit(run)
+
+    def _on_start_hotkey(self) -> None:
+        """F2 (on the hook thread, which is never blocked by a replay)."""
+        if not self.worker.is_busy:
             logger.info("F2 pressed - Starting simulation")
-            self.start_simulation()
-        elif key == keyboard.Key.f3 and self.is_simulating:
+            self.submit()
+
+    def _on_stop_hotkey(self) -> None:
+        if self.worker.is_busy:
             logger.info("F3 pressed - Stopping simulation")
             self.stop_simulation()
 
-    def _parse_action(self, action_line: str) -> Tuple[str, Optional[int]]:
-        """Parse an action line from suggested_actions.txt.
-        Returns (action_type, box_id) where box_id is None for actions that don't need it."""
-        try:
-            # Remove timestamp if present
-            if " - " in action_line:
-                action_line = action_line.split(" - ")[1]
-            
-            # Remove trailing period if present
-            action_line = action_line.rstrip('.')
-            
-            # Parse box_id if present
-            box_id = None
-            if '[' in action_line and ']' in action_line:
-                action_type = action_line[:action_line.find('[')].strip()
-                box_id = int(action_line[action_line.find('[')+1:action_line.find(']')])
-            else:
-                action_type = action_line.strip()
-            
-            return action_type, box_id
-        except Exception as e:
-            logger.error(f"Error parsing action line: {action_line} - {str(e)}")
-            return None, None
-
     def _get_pattern_file(self, action_type: str, box_id: Optional[int] = None) -> Optional[str]:
-        """Get the pattern file for a given action type and box ID."""
+        """Get the pattern file for a given action type and box ID from the catalog."""
         try:
-            # List all pattern files
-            pattern_files = [f for f in os.listdir(self.patterns_dir) if f.endswith('.json')]
-            logger.info(f"Found {len(pattern_files)} pattern files in {self.patterns_dir}")
-            
-            # Filter for matching action type
-            matching_files = [f for f in pattern_files if f.startswith(f"{action_type}_")]
-            logger.info(f"Found {len(matching_files)} files matching action type: {action_type}")
-            
-            if not matching_files:
-                logger.warning(f"No pattern files found for action type: {action_type}")
+            filepath = self.pattern_catalog.best(action_type, box_id)
+            if filepath and not os.path.exists(filepath):
+                # File removed behind the catalog's back; reconcile and retry once
+                logger.debug(f"Catalogued pattern {filepath} is gone, resyncing catalog")
+                self.pattern_catalog.sync()
+                filepath = self.pattern_catalog.best(action_type, box_id)
+
+            if not filepath:
+                logger.warning(f"No pattern files found for action type: {action_type}" +
+                               (f" in box {box_id}" if box_id is not None else ""))
                 return None
-                
-            # Get the most recent file
-            latest_file = max(matching_files, key=lambda x: os.path.getctime(os.path.join(self.patterns_dir, x)))
-            filepath = os.path.join(self.patterns_dir, latest_file)
-            logger.info(f"Selected pattern file: {filepath}")
+            logger.debug(f"Selected pattern file: {filepath}")
             return filepath
             
         except Exception as e:
-            logger.error(f"Error getting pattern file: {str(e)}")
-            logger.error(f"Error details: {type(e).__name__}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"Error getting pattern file: {str(e)}", exc_info=True)
             return None
 
-    def _check_for_new_action(self) -> None:
-        """Check if there's a new action to simulate."""
-        current_time = time.time()
-        if current_time - self.last_action_check < self.action_check_interval:
-            return
-            
-        self.last_action_check = current_time
-        
+    def has_pattern(self, command: Command) -> bool:
+        """Whether a pattern (pack record or catalogued file) exists for an action."""
+        self.wait_for_patterns()
+        if self.pattern_pack is not None and self.pattern_pack.find(command.action_type, command.box_id) is not None:
+            return True
+        filepath = self.pattern_catalog.best(command.action_type, command.box_id)
+        if filepath and not os.path.exists(filepath):
+            self.pattern_catalog.sync()
+            filepath = self.pattern_catalog.best(command.action_type, command.box_id)
+        return filepath is not None
+
+    def simulate_action(self, command: Command) -> bool:
+        """Load the pattern for an action and simulate it. Returns False if there is no pattern."""
+        self.wait_for_patterns()
+        pattern_source = self._load_pattern(command.action_type, command.box_id)
+        if pattern_source:
+            logger.info(f"Starting simulation for {command.describe()} using pattern: {pattern_source}")
+            self.start_simulation()
+            return True
+        logger.error(f"No pattern found for {command.describe()}")
+        return False
+
+    def _process_pending_actions(self) -> int:
+        """Queue every pending action on the simulation worker, oldest first.
+        Returns how many were taken."""
+        batch = self.action_queue.take()
+        for item in batch:
+            self._submit_job(lambda item=item: self._simulate_queued(item))
+        return len(batch)
+
+    def _simulate_queued(self, item) -> None:
         try:
-            if os.path.exists(self.suggested_actions_file):
-                with open(self.suggested_actions_file, 'r') as f:
-                    lines = f.readlines()
-                    if lines:
-                        action_line = lines[0].strip()
-                        action_type, box_id = self._parse_action(action_line)
-                        
-                        if action_type:
-                            # Get pattern file
-                            pattern_file = self._get_pattern_file(action_type, box_id)
-                            
-                            if pattern_file:
-                                # Load and simulate the pattern
-                                if self.load_recording(pattern_file):
-                                    logger.info(f"Starting simulation for {action_type}" + 
-                                              (f" in box {box_id}" if box_id is not None else "") +
-                                              f" using pattern: {os.path.basename(pattern_file)}")
-                                    self.start_simulation()
-                                else:
-                                    logger.error(f"Failed to load pattern for {action_type}")
-                            else:
-                                logger.error(f"No pattern found for {action_type}" + 
-                                           (f" in box {box_id}" if box_id is not None else ""))
-                            
-                            # Remove the action from the file
-                            with open(self.suggested_actions_file, 'w') as f:
-                                f.writelines(lines[1:])
+            # Committed before the replay: an action interrupted by a crash is not replayed
+            self.action_queue.commit(item)
+            self.simulate_action(item.action)
         except Exception as e:
-            logger.error(f"Error checking for new actions: {str(e)}")
+            logger.error(f"Error simulating action {item.action.line!r}: {str(e)}")
 
     def run(self) -> None:
         """Run the simulator with hotkey support."""
         logger.info("Simulator started. Press F2 to start simulation, F3 to stop.")
         
         # Start hotkey listener
-        self.hotkey_listener = keyboard.Listener(on_press=self._on_hotkey)
-        self.hotkey_listener.start()
+        self.hotkeys.add_hotkey('Key.f2', self._on_start_hotkey)
+        self.hotkeys.add_hotkey('Key.f3', self._on_stop_hotkey)
+        self.hotkeys.start()
         
+        self.action_queue.start()
         try:
-            # Keep the main thread alive and check for new actions
+            # Keep the main thread alive; wake up as soon as actions are queued
             while True:
-                if not self.is_simulating:
-                    self._check_for_new_action()
-                time.sleep(0.1)
+                # The timeout only keeps Ctrl+C responsive
+                if self.action_queue.wait(0.5):
+                    # Replays run on the worker, behind any hotkey-started one
+                    self._process_pending_actions()
         except KeyboardInterrupt:
             logger.info("Simulator stopped by user")
         finally:
-            if self.hotkey_listener:
-                self.hotkey_listener.stop()
-            if self.is_simulating:
+            self.hotkeys.stop()
+            if self.worker.is_busy:
                 self.stop_simulation()
+            self.close()
 
-    def _get_most_recent_action(self) -> Optional[str]:
-        """Get the most recent action from the suggested_actions.txt file."""
+    def close(self) -> None:
+        """Stop the worker, action queue and focus monitor threads and release the input backend."""
+        self.worker.shutdown(timeout=5.0)
+        self.action_queue.stop()
+        self.focus_monitor.stop()
+        if self._input_backend is not None:
+            self._input_backend.close()
+
+    def _get_most_recent_action(self) -> Optional[Command]:
+        """Get the oldest pending action from the action queue."""
         try:
-            if os.path.exists(self.suggested_actions_file):
-                with open(self.suggested_actions_file, 'r') as f:
-                    lines = f.readlines()
-                    if lines:
-                        action = lines[0].strip()
-                        logger.info(f"Found most recent action: {action}")
-                        return action
+            head = self.action_queue.peek()
+            if head is not None:
+                logger.info(f"Found most recent action: {head.action.line}")
+                return head.action
             logger.info("No actions found in suggested_actions.txt")
             return None
         except Exception as e:
             logger.error(f"Error reading suggested_actions.txt: {str(e)}")
             return None
 
-    def _load_pattern_for_action(self, action: str) -> bool:
+    def _load_pattern_for_action(self, command: Command) -> bool:
         """Load the pattern file for a given action."""
         try:
-            action_type, box_id = self._parse_action(action)
-            if action_type:
-                pattern_file = self._get_pattern_file(action_type, box_id)
-                if pattern_file:
-                    return self.load_recording(pattern_file)
-            return False
+            return self._load_pattern(command.action_type, command.box_id) is not None
         except Exception as e:
-            logger.error(f"Error loading pattern for action {action}: {str(e)}")
+            logger.error(f"Error loading pattern for action {command.line}: {str(e)}")
             return False
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""Application state machine.
+
+The orchestrator (main.py) is the only writer: it moves between IDLE,
+RECORDING and SIMULATING as it dispatches actions, and the pause hotkey
+suspends whichever of those is active. Reads are safe from any thread, and
+listeners are called on the thread that made the transition, after the new
+state is visible.
+"""
+import enum
+import logging
+import threading
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AppState(enum.Enum):
+    IDLE = 'idle'
+    RECORDING = 'recording'
+    SIMULATING = 'simulating'
+    PAUSED = 'paused'
+
+
+# A recording is saved (back to IDLE) before a simulation starts; PAUSED
+# resumes into whichever state it suspended
+TRANSITIONS: Dict[AppState, FrozenSet[AppState]] = {
+    AppState.IDLE: frozenset({AppState.RECORDING, AppState.SIMULATING, AppState.PAUSED}),
+    AppState.RECORDING: frozenset({AppState.IDLE, AppState.PAUSED}),
+    AppState.SIMULATING: frozenset({AppState.IDLE, AppState.PAUSED}),
+    AppState.PAUSED: frozenset({AppState.IDLE, AppState.RECORDING, AppState.SIMULATING}),
+}
+
+StateListener = Callable[[AppState, AppState, str], None]
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+class StateManager:
+    """Current application state, its allowed transitions and the state to resume after a pause."""
+
+    def __init__(self, initial: AppState = AppState.IDLE):
+        self._state = initial
+        self._resume_state: Optional[AppState] = None
+        self._lock = threading.RLock()
+        self._listeners: List[StateListener] = []
+
+    @property
+    def state(self) -> AppState:
+        return self._state
+
+    @property
+    def is_paused(self) -> bool:
+        return self._state is AppState.PAUSED
+
+    @property
+    def resume_state(self) -> Optional[AppState]:
+        """The state resume() returns to, while paused."""
+        return self._resume_state
+
+    @property
+    def active_state(self) -> AppState:
+        """The current state, or the one suspended by a pause."""
+        with self._lock:
+            if self._state is AppState.PAUSED:
+                return self._resume_state or AppState.IDLE
+            return self._state
+
+    def subscribe(self, listener: StateListener) -> None:
+        """Call listener(old_state, new_state, reason) after every transition."""
+        self._listeners.append(listener)
+
+    def can_transition(self, new_state: AppState) -> bool:
+        return new_state is self._state or new_state in TRANSITIONS[self._state]
+
+    def transition(self, new_state: AppState, reason: str = '') -> AppState:
+        """Move to new_state; a no-op if already there. Returns the previous state."""
+        with self._lock:
+            old_state = self._state
+            if new_state is old_state:
+                return old_state
+            if new_state not in TRANSITIONS[old_state]:
+                raise InvalidTransition(f"Cannot go from {old_state.name} to {new_state.name}")
+            self._state = new_state
+            if old_state is AppState.PAUSED:
+                self._resume_state = None
+        for listener in self._listeners:
+            try:
+                listener(old_state, new_state, reason)
+            except Exception as e:
+                logger.error(f"State listener failed: {str(e)}", exc_info=True)
+        return old_state
+
+    def pause(self, reason: str = '') -> bool:
+        """Suspend the current state. Returns False if already paused."""
+        with self._lock:
+            if self._state is AppState.PAUSED:
+                return False
+            self._resume_state = self._state
+            self.transition(AppState.PAUSED, reason)
+            return True
+
+    def resume(self, reason: str = '') -> AppState:
+        """Return to the state suspended by pause() (IDLE if its job ended meanwhile)."""
+        with self._lock:
+            if self._state is not AppState.PAUSED:
+                return self._state
+            resumed = self._resume_state or AppState.IDLE
+            self.transition(resumed, reason)
+            return resumed
+
+    def finish(self, job_state: AppState, reason: str = '') -> None:
+        """A RECORDING or SIMULATING job ended: go back to IDLE, or resume to IDLE if paused."""
+        with self._lock:
+            if self._state is job_state:
+                self.transition(AppState.IDLE, reason)
+            elif self._state is AppState.PAUSED and self._resume_state is job_state:
+                self._resume_state = AppState.IDLE
@@ -0,0 +1,201 @@
+"""Error-bounded simplification of recorded mouse trajectories.
+
+Recorded paths are dense (a mouse_move every few milliseconds, often one
+pixel apart), and the simulator interpolates between consecutive moves
+anyway. Each run of consecutive mouse_move events is reduced with a
+Ramer-Douglas-Peucker variant that measures the synchronized distance: a
+sample is dropped only if the cursor position replayed at that sample's
+time offset, by linear interpolation between the kept neighbours, stays
+within tolerance_px of the recorded position. Kept samples are also never
+more than max_gap_ms apart, and the first and last move of every run (the
+positions clicks and key events happen at) are always kept.
+
+Simplification runs at save time (see [Recording] simplify_tolerance_px)
+or as a bulk pass over a pattern directory. The bounds are stored in the
+pattern's metadata. A pattern simplified with tolerance T1 is only
+simplified again for a looser tolerance T2, and then with T2 - T1 against
+its kept samples: both replayed paths are linear between those samples, so
+the error against the original recording stays within T1 + (T2 - T1) = T2.
+The bulk pass is:
+
+    python -m core.trajectory patterns/ --tolerance 1.0 --max-gap-ms 100
+"""
+import os
+import json
+import logging
+import argparse
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.events import Event, MOUSE_MOVE
+from core.movement_metrics import event_columns
+from core.pattern_format import JSON_EXTENSION, PATTERN_EXTENSION, is_binary_pattern, read_pattern, write_pattern
+
+logger = logging.getLogger(__name__)
+
+# Metadata key recording the bounds a pattern was simplified with
+SIMPLIFIED_KEY = 'simplified'
+
+
+class CompactionResult(NamedTuple):
+    path: str
+    events_before: int
+    events_after: int
+    bytes_before: int
+    bytes_after: int
+
+
+def simplify_run(time_offset_ms: np.ndarray, x: np.ndarray, y: np.ndarray,
+                 tolerance_px: float, max_gap_ms: float) -> np.ndarray:
+    """Boolean keep mask for one run of move samples."""
+    count = len(time_offset_ms)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+    t = np.asarray(time_offset_ms, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = slice(first + 1, last)
+        span = t[last] - t[first]
+        fraction = (t[inner] - t[first]) / span if span > 0 else np.zeros(last - first - 1)
+        error = np.hypot(x[inner] - (x[first] + (x[last] - x[first]) * fraction),
+                         y[inner] - (y[first] + (y[last] - y[first]) * fraction))
+        split = int(np.argmax(error))
+        if error[split] > tolerance_px or span > max_gap_ms:
+            split += first + 1
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def simplify_mask(events: Sequence, tolerance_px: float, max_gap_ms: float) -> np.ndarray:
+    """Keep mask over events; only mouse_move runs are simplified."""
+    types, offsets, xs, ys = event_columns(events)
+    keep = np.ones(len(types), dtype=bool)
+    is_move = np.concatenate(([False], types == MOUSE_MOVE, [False]))
+    edges = np.flatnonzero(np.diff(is_move.astype(np.int8)))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start > 2:
+            keep[start:end] = simplify_run(offsets[start:end], xs[start:end], ys[start:end],
+                                           tolerance_px, max_gap_ms)
+    return keep
+
+
+def simplify_events(events: Sequence, tolerance_px: float = 1.0, max_gap_ms: float = 100.0) -> List[Any]:
+    """Return the events to keep, as the same objects (Events or event dicts) that were passed in."""
+    if not len(events):
+        return list(events)
+    source = events
+    if not hasattr(events, 'columns') and not isinstance(events[0], Event):
+        source = [Event.from_dict(event) for event in events]
+    keep = simplify_mask(source, tolerance_px, max_gap_ms)
+    return [events[i] for i in np.flatnonzero(keep)]
+
+
+def _simplify_pass(metadata: Dict[str, Any], tolerance_px: float,
+                   max_gap_ms: float) -> Optional[Tuple[float, Dict[str, float]]]:
+    """(tolerance for this pass, bounds to record), or None if the pattern is already that compact."""
+    previous = metadata.get(SIMPLIFIED_KEY)
+    if not previous:
+        return tolerance_px, {'tolerance_px': tolerance_px, 'max_gap_ms': max_gap_ms}
+    previous_tolerance = previous.get('tolerance_px', 0)
+    previous_gap = previous.get('max_gap_ms', float('inf'))
+    if previous_tolerance >= tolerance_px and previous_gap >= max_gap_ms:
+        return None
+    # The error of this pass adds to the previous one (see the module docstring),
+    # and dropping samples can never shorten the gaps left by the previous pass
+    return max(0.0, tolerance_px - previous_tolerance), {
+        'tolerance_px': max(previous_tolerance, tolerance_px), 'max_gap_ms': max(previous_gap, max_gap_ms)}
+
+
+def compact_pattern_file(filepath: str, tolerance_px: float = 1.0, max_gap_ms: float = 100.0,
+                         delta: bool = True) -> Optional[CompactionResult]:
+    """Simplify a JSON or binary pattern file in place. Returns None if it was already compact."""
+    bytes_before = os.path.getsize(filepath)
+    if is_binary_pattern(filepath):
+        pattern = read_pattern(filepath)
+        metadata = dict(pattern.metadata)
+        simplify = _simplify_pass(metadata, tolerance_px, max_gap_ms)
+        is_delta = any(column.get('encoding') == 'delta' for column in pattern.header['columns'])
+        if not simplify and is_delta == delta:
+            return None
+        events_before = len(pattern)
+        kept = pattern
+        if simplify:
+            pass_tolerance, metadata[SIMPLIFIED_KEY] = simplify
+            kept = simplify_events(pattern, pass_tolerance, max_gap_ms)
+            metadata['total_events'] = len(kept)
+        write_pattern(filepath, kept, metadata, delta)
+    else:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        simplify = _simplify_pass(data, tolerance_px, max_gap_ms)
+        if simplify is None:
+            return None
+        events_before = len(data['events'])
+        pass_tolerance, data[SIMPLIFIED_KEY] = simplify
+        kept = simplify_events(data['events'], pass_tolerance, max_gap_ms)
+        data['events'] = kept
+        data['total_events'] = len(kept)
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, filepath)
+
+    result = CompactionResult(filepath, events_before, len(kept), bytes_before, os.path.getsize(filepath))
+    logger.info(f"Compacted {filepath}: {result.events_before} -> {result.events_after} events, "
+                f"{result.bytes_before} -> {result.bytes_after} bytes")
+    return result
+
+
+def compact_directory(directory: str, tolerance_px: float = 1.0, max_gap_ms: float = 100.0,
+                      delta: bool = True) -> List[CompactionResult]:
+    """Simplify every pattern file in directory."""
+    results = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith((JSON_EXTENSION, PATTERN_EXTENSION)):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            result = compact_pattern_file(path, tolerance_px, max_gap_ms, delta)
+        except Exception as e:
+            logger.error(f"Failed to compact {path}: {str(e)}")
+            continue
+        if result is not None:
+            results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Simplify recorded mouse trajectories in pattern files.")
+    parser.add_argument('paths', nargs='+', help="Pattern files or pattern directories")
+    parser.add_argument('--tolerance', type=float, default=1.0, help="Maximum replayed position error in pixels")
+    parser.add_argument('--max-gap-ms', type=float, default=100.0, help="Maximum time between kept moves")
+    parser.add_argument('--no-delta', action='store_true', help="Write binary patterns without delta encoding")
+    args = parser.parse_args()
+
+    results: List[CompactionResult] = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            results.extend(compact_directory(path, args.tolerance, args.max_gap_ms, not args.no_delta))
+        else:
+            result = compact_pattern_file(path, args.tolerance, args.max_gap_ms, not args.no_delta)
+            if result is not None:
+                results.append(result)
+    if results:
+        events_before = sum(r.events_before for r in results)
+        events_after = sum(r.events_after for r in results)
+        bytes_before = sum(r.bytes_before for r in results)
+        bytes_after = sum(r.bytes_after for r in results)
+        print(f"{len(results)} patterns: {events_before} -> {events_after} events, "
+              f"{bytes_before} -> {bytes_after} bytes")
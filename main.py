@@ -0,0 +1,280 @@
+"""Single-process orchestrator for the recorder and the simulator.
+
+One asyncio loop owns action intake, hotkeys and the application state
+(core/state_manager.py). Every other thread only posts messages into the
+loop's inbox: the action watcher when suggested_actions.txt grows, the
+hotkey listener when a hotkey is pressed and the job threads when a
+recording or simulation step finishes. While nothing happens the loop is
+parked on the inbox, so an idle process uses no CPU and a new action is
+dispatched as soon as the watcher sees it.
+
+A new action is simulated if a pattern exists for it and recorded
+otherwise. Consecutive actions without a pattern are recorded as segments
+of one session; the session is saved when an action with a pattern arrives,
+the stop hotkey is pressed or the program exits.
+
+    python main.py
+"""
+import os
+import asyncio
+import logging
+import configparser
+from functools import partial
+from typing import Any, Awaitable, Optional
+
+from core.command_parser import Command
+from core.hotkey_manager import HotkeyManager
+from core.state_manager import AppState, StateManager
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini')
+
+# Inbox messages
+_ACTIONS = 'actions'
+_HOTKEY = 'hotkey'
+_SHUTDOWN = 'shutdown'
+
+# Hotkey name -> ([Hotkeys] option, fallback)
+HOTKEYS = {
+    'pause': ('pause_resume', '<control>+<alt>+p'),
+    'stop': ('stop_recording', 'Key.f3'),
+}
+
+
+def load_config(path: str = CONFIG_PATH) -> configparser.ConfigParser:
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
+
+class Orchestrator:
+    """Dispatches suggested actions to the recorder or the simulator from one asyncio loop."""
+
+    def __init__(self, simulator: Optional[Any] = None, recorder: Optional[Any] = None,
+                 config: Optional[configparser.ConfigParser] = None, hotkeys: bool = True):
+        self.config = config if config is not None else load_config()
+        self._simulator = simulator
+        self._recorder = recorder
+        self.use_hotkeys = hotkeys
+        self.state = StateManager()
+        self.state.subscribe(self._log_transition)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inbox: Optional['asyncio.Queue'] = None
+        # The blocking step in progress on a worker thread (a replay, starting or saving a recording)
+        self._job: Optional['asyncio.Task'] = None
+        # The job state the pause hotkey suspended
+        self._paused_job: Optional[AppState] = None
+        # Set while not paused; a job that was deciding when the pause came waits on it
+        self._unpaused: Optional[asyncio.Event] = None
+        # The process's only keyboard hook: hotkeys here, key capture in the recorder
+        self.hotkeys = HotkeyManager()
+        self._stopping = False
+
+    @property
+    def simulator(self) -> Any:
+        if self._simulator is None:
+            from core.simulator import EventSimulator
+            self._simulator = EventSimulator()
+        return self._simulator
+
+    @property
+    def recorder(self) -> Any:
+        # Created on the first action without a pattern
+        if self._recorder is None:
+            from core.recorder import EventRecorder
+            self._recorder = EventRecorder(hotkey_manager=self.hotkeys)
+        return self._recorder
+
+    # ---- thread-safe entry points ----------------------------------------
+
+    def post(self, message: str, argument: Any = None) -> None:
+        """Queue a message for the loop; callable from any thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._inbox.put_nowait, (message, argument))
+
+    def press(self, hotkey: str) -> None:
+        """Deliver a hotkey ('pause' or 'stop') as if it had been pressed."""
+        self.post(_HOTKEY, hotkey)
+
+    def request_stop(self) -> None:
+        self.post(_SHUTDOWN)
+
+    # ---- loop ------------------------------------------------------------
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._inbox = asyncio.Queue()
+        self._unpaused = asyncio.Event()
+        self._unpaused.set()
+        self._stopping = False
+        action_queue = self.simulator.action_queue
+        # Called on the watcher thread after the queue has taken the new lines
+        action_queue.watcher.subscribe(lambda lines, reset: self.post(_ACTIONS))
+        action_queue.start()
+        if self.use_hotkeys:
+            self._start_hotkeys()
+        logger.info(f"Orchestrator started; following {action_queue.path}")
+        # Actions left pending by the previous run
+        self.post(_ACTIONS)
+        try:
+            while True:
+                message, argument = await self._inbox.get()
+                if message == _SHUTDOWN:
+                    break
+                if message == _HOTKEY:
+                    self._on_hotkey(argument)
+                self._dispatch()
+        finally:
+            await self._shutdown()
+
+    def _dispatch(self) -> None:
+        """Start work for the next pending action, as far as the current state allows."""
+        if self._job is not None or self.state.is_paused or self._stopping:
+            return
+        action_queue = self.simulator.action_queue
+        batch = action_queue.take(1)
+        if not batch:
+            return
+        item = batch[0]
+        # Committed before the work starts: an action interrupted by a crash is not repeated
+        action_queue.commit(item)
+        self._start_job(self._handle(item.action))
+
+    async def _handle(self, command: Command) -> None:
+        # has_pattern blocks while pattern discovery runs and may rescan the
+        # patterns directory; the loop keeps serving hotkeys meanwhile
+        found = await asyncio.to_thread(self.simulator.has_pattern, command)
+        await self._unpaused.wait()
+        if self._stopping:
+            return
+        if found:
+            await self._simulate(command)
+        elif self.state.active_state is AppState.RECORDING:
+            # Same session, next segment
+            self.recorder.switch_action(command.line)
+        else:
+            await self._record(command)
+
+    def _start_job(self, job: Awaitable[None]) -> None:
+        self._job = asyncio.ensure_future(self._run_job(job))
+
+    async def _run_job(self, job: Awaitable[None]) -> None:
+        try:
+            await job
+        except Exception as e:
+            logger.error(f"Job failed: {str(e)}", exc_info=True)
+        finally:
+            self._job = None
+        self._dispatch()
+
+    async def _simulate(self, command: Command) -> None:
+        if self.state.active_state is AppState.RECORDING:
+            await self._finish_recording(f"{command.describe()} has a pattern")
+        self.state.transition(AppState.SIMULATING, command.describe())
+        try:
+            # On the simulator's own worker thread; stop/pause reach it through its replay control
+            await asyncio.wrap_future(self.simulator.submit(command))
+        finally:
+            self.state.finish(AppState.SIMULATING, f"{command.describe()} done")
+
+    async def _record(self, command: Command) -> None:
+        self.state.transition(AppState.RECORDING, f"no pattern for {command.describe()}")
+        try:
+            await asyncio.to_thread(self.recorder.start_recording, command.line)
+        except Exception:
+            self.state.finish(AppState.RECORDING, "recording failed to start")
+            raise
+
+    async def _finish_recording(self, reason: str) -> None:
+        await asyncio.to_thread(self.recorder.stop_recording)
+        self.state.finish(AppState.RECORDING, reason)
+
+    # ---- hotkeys ---------------------------------------------------------
+
+    def _start_hotkeys(self) -> None:
+        for name, (option, fallback) in HOTKEYS.items():
+            spec = self.config.get('Hotkeys', option, fallback=fallback)
+            try:
+                self.hotkeys.add_hotkey(spec, partial(self.press, name))
+            except ValueError as e:
+                logger.error(f"Ignoring invalid {option} hotkey: {str(e)}")
+                continue
+            logger.info(f"Hotkey {spec} -> {name}")
+        try:
+            self.hotkeys.start()
+        except Exception as e:
+            logger.warning(f"Hotkeys disabled, keyboard hook unavailable: {str(e)}")
+
+    def _on_hotkey(self, name: str) -> None:
+        if name == 'pause':
+            self._toggle_pause()
+        elif name == 'stop':
+            self._stop_active()
+        else:
+            logger.warning(f"Unknown hotkey {name!r}")
+
+    def _toggle_pause(self) -> None:
+        if self.state.is_paused:
+            self.state.resume("pause hotkey")
+            self._unpaused.set()
+            # Resumed even if its job ended meanwhile, so the next one does not start paused
+            if self._paused_job is AppState.SIMULATING:
+                self.simulator.resume_simulation()
+            elif self._paused_job is AppState.RECORDING:
+                self.recorder.resume_recording()
+            self._paused_job = None
+            return
+        active = self.state.state
+        self.state.pause("pause hotkey")
+        self._unpaused.clear()
+        self._paused_job = active
+        if active is AppState.SIMULATING:
+            self.simulator.pause_simulation()
+        elif active is AppState.RECORDING:
+            self.recorder.pause_recording()
+
+    def _stop_active(self) -> None:
+        """Stop the running replay or save the running recording. A pause stays in effect."""
+        active = self.state.active_state
+        if active is AppState.SIMULATING:
+            self.simulator.stop_simulation()
+        elif active is AppState.RECORDING and self._job is None:
+            self._start_job(self._finish_recording("stop hotkey"))
+
+    # ---- shutdown --------------------------------------------------------
+
+    async def _shutdown(self) -> None:
+        logger.info("Orchestrator stopping")
+        self._stopping = True
+        # A job waiting out a pause returns instead
+        self._unpaused.set()
+        if self.state.active_state is AppState.SIMULATING:
+            self.simulator.stop_simulation()
+        if self._job is not None:
+            await asyncio.gather(self._job, return_exceptions=True)
+        if self.state.active_state is AppState.RECORDING:
+            await asyncio.to_thread(self.recorder.stop_recording)
+            self.state.finish(AppState.RECORDING, "shutdown")
+        self.hotkeys.stop()
+        self.simulator.close()
+        self._loop = None
+
+    @staticmethod
+    def _log_transition(old_state: AppState, new_state: AppState, reason: str) -> None:
+        logger.info(f"State {old_state.name} -> {new_state.name}" + (f" ({reason})" if reason else ""))
+
+
+def main() -> None:
+    config = load_config()
+    logging.basicConfig(level=config.get('Logging', 'log_level', fallback='INFO').strip().upper(),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(Orchestrator(config=config).run())
+    except KeyboardInterrupt:
+        logger.info("Stopped by user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Helpers shared by the test modules."""
+import os
+import configparser
+
+from core.simulator import EventSimulator
+
+SAMPLE_PATTERN = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                              'core', 'patterns', 'Buy an item_6_20250601_174120.json')
+
+
+class TickClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class HeadlessSimulator(EventSimulator):
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        super().__init__()
+
+    def _load_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'Paths': {'patterns_directory': str(self.tmp_path),
+                      'suggested_actions': str(self.tmp_path / 'suggested_actions.txt')},
+            'Simulation': {'input_backend': 'null'},
+            'Window': {'game_title': 'RuneLite', 'focus_backend': 'poll'},
+        })
+        return config
@@ -0,0 +1,105 @@
+import threading
+
+from core.action_queue import ActionQueue
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_restart_resumes_after_last_commit(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\nSell item\nCollect items\n")
+    queue = ActionQueue(str(path))
+    queue.open()
+    batch = queue.take()
+    assert [item.action for item in batch] == ['Buy item', 'Sell item', 'Collect items']
+    queue.commit(batch[0])
+    queue.commit(batch[1])
+    # Committing an earlier line never moves the cursor back
+    queue.commit(batch[0])
+
+    # The plugin keeps appending while we are down
+    _append(path, "Abort\n")
+    restarted = ActionQueue(str(path))
+    restarted.open()
+    assert [item.action for item in restarted.take()] == ['Collect items', 'Abort']
+    assert path.read_text() == "Buy item\nSell item\nCollect items\nAbort\n"
+
+
+def test_new_file_content_is_pending_again(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\n")
+    queue = ActionQueue(str(path), cursor_path=str(tmp_path / 'cursor.json'), parse=str.lower)
+    queue.open()
+    queue.commit(queue.take()[0])
+
+    path.write_text("Sell item\nWait\n")
+    restarted = ActionQueue(str(path), cursor_path=str(tmp_path / 'cursor.json'), parse=str.lower)
+    restarted.open()
+    assert [item.action for item in restarted.take()] == ['sell item', 'wait']
+
+
+def test_unreadable_cursor_is_ignored(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\n")
+    (tmp_path / 'suggested_actions.txt.cursor').write_text("{not json")
+    queue = ActionQueue(str(path))
+    queue.open()
+    assert len(queue) == 1 and queue.peek().action == 'Buy item'
+
+
+def test_wait_wakes_on_appended_actions(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("")
+    queue = ActionQueue(str(path), backend='poll', poll_interval=0.01)
+    queue.start()
+    try:
+        assert not queue.wait(0.02)
+        threading.Timer(0.02, _append, (path, "Buy item\nSell item\n")).start()
+        assert queue.wait(2.0)
+        # Both lines arrive in one batch
+        assert [item.action for item in queue.take()] == ['Buy item', 'Sell item']
+    finally:
+        queue.stop()
+
+
+def test_concurrent_commits_keep_the_furthest_line(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("".join(f"Buy item [{i % 8}]\n" for i in range(200)))
+    queue = ActionQueue(str(path))
+    queue.open()
+    batch = queue.take()
+    threads = [threading.Thread(target=lambda part=part: [queue.commit(item) for item in part])
+               for part in (batch[0::2], batch[1::2])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert queue.committed_offset == batch[-1].end_offset
+    restarted = ActionQueue(str(path))
+    restarted.open()
+    assert restarted.take() == [] and restarted.committed_offset == batch[-1].end_offset
+
+
+def test_lines_taken_before_a_reset_are_not_committed(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Collect items [1]\nCollect items [2]\n")
+    queue = ActionQueue(str(path))
+    queue.open()
+    stale = queue.take()
+
+    # The plugin replaces the file with shorter content
+    path.write_text("Abort\n")
+    queue.watcher.check(final=True)
+    fresh = queue.take()
+    queue.commit(stale[-1])
+    assert queue.committed_offset == 0
+    queue.commit(fresh[0])
+    assert queue.committed_offset == fresh[0].end_offset
+
+    restarted = ActionQueue(str(path))
+    restarted.open()
+    assert restarted.take() == []
@@ -0,0 +1,72 @@
+import os
+import queue
+import sys
+
+import pytest
+
+from core.action_watcher import ActionFileWatcher
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_check_reads_only_appended_lines(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\n")
+    batches = []
+    watcher = ActionFileWatcher(str(path), parse=str.upper)
+    watcher.subscribe(lambda actions, reset: batches.append((actions, reset)))
+
+    assert watcher.check()
+    _append(path, "Sell item\n\nCollect items\nAbort")
+    assert watcher.check(final=False)
+    assert watcher.offset == len("Buy item\nSell item\n\nCollect items\n")
+    # The partial line is consumed once final
+    assert watcher.check(final=True)
+    assert not watcher.check()
+    assert batches == [(['BUY ITEM'], True), (['SELL ITEM', 'COLLECT ITEMS'], False), (['ABORT'], False)]
+
+
+def test_rewrites_and_replacements_reset(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\nSell item\n")
+    batches = []
+    watcher = ActionFileWatcher(str(path))
+    watcher.subscribe(lambda actions, reset: batches.append((actions, reset)))
+    watcher.check()
+
+    # Same inode, longer content: must not be mistaken for an append
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Sell item\nBuy item [3]\nWait\n")
+    watcher.check()
+    replacement = tmp_path / 'new.txt'
+    replacement.write_text("Collect items\n")
+    os.replace(replacement, path)
+    watcher.check()
+    os.remove(path)
+    watcher.check()
+    assert batches[1:] == [(['Sell item', 'Buy item [3]', 'Wait'], True), (['Collect items'], True), ([], True)]
+
+
+@pytest.mark.parametrize('backend', ['poll'] + (['inotify'] if sys.platform.startswith('linux') else []))
+def test_background_watcher_delivers_new_lines(tmp_path, backend):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Old action\n")
+    received = queue.Queue()
+    watcher = ActionFileWatcher(str(path), backend=backend, poll_interval=0.01)
+    watcher.subscribe(lambda actions, reset: [received.put(a) for a in actions])
+    watcher.start()
+    try:
+        assert watcher.active_backend == backend
+        _append(path, "Buy item\n")
+        assert received.get(timeout=2.0) == 'Buy item'
+        # A line written without a newline still arrives
+        _append(path, "Sell item")
+        assert received.get(timeout=2.0) == 'Sell item'
+        assert watcher.changed.is_set()
+    finally:
+        watcher.stop()
+    assert not watcher.is_running
+    assert received.empty()
@@ -0,0 +1,61 @@
+import time
+import threading
+
+from core.capture_merger import CaptureMerger, RAW_MOVE, RAW_KEY_PRESS, RAW_CONTROL
+
+
+def test_streams_are_merged_by_timestamp():
+    handled = []
+    merger = CaptureMerger(handled.append, reorder_window=0.05)
+    base = time.time_ns()
+    merger.queue('keyboard').put((RAW_KEY_PRESS, base + 2, 0, 0, 'a'))
+    merger.queue('mouse').put((RAW_MOVE, base + 1, 1, 1, None))
+    merger.queue('mouse').put((RAW_MOVE, base + 3, 2, 2, None))
+    merger.queue('control').put((RAW_CONTROL, base + 2, 0, 0, 'action'))
+    merger.start()
+    merger.stop(timeout=2.0)
+
+    assert [raw[1] for raw in handled] == [base + 1, base + 2, base + 2, base + 3]
+    # Equal timestamps keep the drain order (mouse, keyboard, control)
+    assert handled[1][0] == RAW_KEY_PRESS and handled[2][0] == RAW_CONTROL
+    assert merger.processed == 4
+
+
+def test_events_are_emitted_after_reorder_window():
+    seen = threading.Event()
+    merger = CaptureMerger(lambda raw: seen.set(), reorder_window=0.01)
+    merger.start()
+    try:
+        merger.queue('mouse').put((RAW_MOVE, time.time_ns(), 0, 0, None))
+        assert seen.wait(1.0)
+    finally:
+        merger.stop(timeout=2.0)
+
+
+def test_stop_drains_everything_queued():
+    handled = []
+    merger = CaptureMerger(handled.append, reorder_window=60.0)
+    merger.start()
+    for i in range(100):
+        merger.queue('mouse').put((RAW_MOVE, time.time_ns(), i, i, None))
+    merger.stop(timeout=2.0)
+    assert [raw[2] for raw in handled] == list(range(100))
+    assert not merger.is_running
+
+
+def test_handler_errors_do_not_stop_the_worker():
+    handled = []
+
+    def handler(raw):
+        if raw[2] == 1:
+            raise ValueError("boom")
+        handled.append(raw[2])
+
+    merger = CaptureMerger(handler)
+    base = time.time_ns()
+    for i in range(3):
+        merger.queue('mouse').put((RAW_MOVE, base + i, i, i, None))
+    merger.start()
+    merger.stop(timeout=2.0)
+    assert handled == [0, 2]
+    assert merger.processed == 3
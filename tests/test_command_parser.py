@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core.command_parser import Command, parse_command
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('line, expected', [
+    ("Collect items", ("Collect items", None, None)),
+    ("2024-05-01 12:00:03 - Buy item [3].", ("Buy item", 3, "2024-05-01 12:00:03")),
+    ("12:00:03.250 - Abort offer [ 7 ]", ("Abort offer", 7, "12:00:03.250")),
+    ("01/05/2024 12:00 - Sell item", ("Sell item", None, "01/05/2024 12:00")),
+    # " - " inside the action type is not a timestamp separator
+    ("Sell - Dragon bones", ("Sell - Dragon bones", None, None)),
+    ("12:00 - Sell - Dragon bones.", ("Sell - Dragon bones", None, "12:00")),
+    # Only a trailing bracketed integer is a box id
+    ("Buy item [abc]", ("Buy item [abc]", None, None)),
+    ("Buy [2] items", ("Buy [2] items", None, None)),
+    ("Buy item[12]...", ("Buy item", 12, None)),
+])
+def test_parse_command(line, expected):
+    command = parse_command(line)
+    assert (command.action_type, command.box_id, command.timestamp) == expected
+    assert command.line == line.strip()
+
+
+@pytest.mark.parametrize('line', ["", "   ", "[3]", "12:00:03 - ."])
+def test_lines_without_action_type(line):
+    assert parse_command(line) is None
+
+
+def test_commands_are_hashable_and_memoized():
+    command = parse_command("Collect items [2]")
+    assert parse_command("Collect items [2]") is command
+    assert {command: 1}[Command("Collect items", 2, None, "Collect items [2]")] == 1
+    assert command.key == "collect_items"
+    assert command.describe() == "Collect items in box 2"
+
+
+def test_common_timestamp_fast_path_matches_the_general_pattern():
+    lines = ["2024-05-01 12:00:03 - Buy item [3].", "2024-05-01 12:00:03  -  Buy item [3].",
+             "2024-05-01T12:00:03 - Buy item [3].", "2024-05-01 12:00:03 -Buy item"]
+    assert [(c.action_type, c.box_id, c.timestamp) for c in map(parse_command, lines)] == [
+        ("Buy item", 3, "2024-05-01 12:00:03"), ("Buy item", 3, "2024-05-01 12:00:03"),
+        ("Buy item", 3, "2024-05-01T12:00:03"), ("2024-05-01 12:00:03 -Buy item", None, None)]
+
+
+def test_command_parser_does_not_load_the_pattern_catalog():
+    code = "import sys, core.command_parser; print('sqlite3' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
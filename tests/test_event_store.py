@@ -0,0 +1,48 @@
+import pytest
+
+from core.event_store import EventStore
+
+
+def test_segment_views_share_the_single_copy():
+    store = EventStore()
+    store.append('before')
+    store.begin_segment(1)
+    event = {'type': 'mouse_move'}
+    store.append(event)
+    store.end_segment(1)
+    store.append('after')
+
+    view = store.segment_view(1)
+    assert list(view) == [event] and view[0] is event
+    assert list(store.view()) == ['before', event, 'after']
+
+
+def test_eviction_drops_persisted_segments_but_keeps_live_ones():
+    store = EventStore()
+    store.begin_segment(1)
+    for i in range(5):
+        store.append(i)
+    store.end_segment(1)
+    store.begin_segment(2)
+    store.append(5)
+
+    old_view = store.view()
+    store.evict_segment(1)
+
+    assert store.retained == 1 and len(store) == 6
+    assert list(store.segment_view(2)) == [5]
+    assert list(old_view) == [0, 1, 2, 3, 4, 5]  # outstanding views stay valid
+    with pytest.raises(IndexError):
+        store.view(0, 5)
+
+
+def test_view_is_read_only_and_bounded():
+    store = EventStore()
+    store.append('a')
+    view = store.view()
+    store.append('b')
+
+    assert len(view) == 1
+    assert not hasattr(view, 'append')
+    with pytest.raises(TypeError):
+        view[0] = 'x'
@@ -0,0 +1,28 @@
+from core.events import Event, MOUSE_MOVE, KEY_RELEASE, PAUSE
+
+
+def test_dict_round_trip_for_every_event_shape():
+    events = [
+        {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 1, 'y': 2, 'timestamp': 1.0},
+        {'type': 'mouse_click_release', 'time_offset_ms': 9, 'x': 1, 'y': 2, 'button': 'Button.left',
+         'hold_duration_ms': 80, 'timestamp': 1.1},
+        {'type': 'key_press', 'time_offset_ms': 10, 'key': 'Key.enter', 'timestamp': 1.2},
+        {'type': 'pause', 'time_offset_ms': 11, 'x': 3, 'y': 4, 'duration_ms': 500, 'timestamp': 1.3},
+    ]
+    for event in events:
+        assert Event.from_dict(event).to_dict() == event
+
+
+def test_fields_and_type_name():
+    move = Event(MOUSE_MOVE, 8, 10, 20)
+    assert move.type == 'mouse_move' and move.hold_ms == -1
+    assert Event.from_dict({'type': 'key_release', 'time_offset_ms': 1, 'key': 'a',
+                            'hold_duration_ms': 5}) == Event(KEY_RELEASE, 1, symbol='a', hold_ms=5)
+    assert Event(PAUSE, 0, hold_ms=50).to_dict()['duration_ms'] == 50
+    assert not hasattr(move, '__dict__')
+
+
+def test_legacy_movement_metrics_are_dropped():
+    legacy = {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 1, 'y': 2,
+              'movement_metrics': {'dt': 0.008, 'distance': 1.0, 'speed': 125.0, 'angle': 0.0, 'dx': 1, 'dy': 0}}
+    assert Event.from_dict(legacy).to_dict() == {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 1, 'y': 2}
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from core.focus_monitor import FocusMonitor
+
+
+class FakeWindows:
+    def __init__(self, title):
+        self.title = title
+        self.polled = threading.Event()
+
+    def __call__(self):
+        self.polled.set()
+        return self.title
+
+    def switch(self, title):
+        self.polled.clear()
+        self.title = title
+        self.polled.wait(1.0)
+        self.polled.clear()
+        self.polled.wait(1.0)
+
+
+def test_publishes_focus_changes():
+    windows = FakeWindows('RuneLite - player')
+    changes = []
+    monitor = FocusMonitor('RuneLite', poll_interval=0.005, backend='poll', title_provider=windows)
+    monitor.add_listener(changes.append)
+    monitor.start()
+    try:
+        assert monitor.is_focused() and monitor.active_backend == 'poll'
+        windows.switch('Notepad')
+        assert not monitor.is_focused()
+        assert not monitor.wait_focused(0.01)
+        windows.switch('RuneLite - player')
+        assert monitor.wait_focused(1.0)
+    finally:
+        monitor.stop()
+    assert changes == [True, False, True]
+    assert not monitor.is_running
+
+
+def test_provider_errors_count_as_unfocused():
+    def broken():
+        raise RuntimeError("no display")
+    monitor = FocusMonitor('RuneLite', backend='poll', title_provider=broken)
+    monitor.start()
+    try:
+        assert not monitor.is_focused()
+    finally:
+        monitor.stop()
+
+
+def test_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        FocusMonitor('RuneLite', backend='x11')
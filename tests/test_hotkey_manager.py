@@ -0,0 +1,74 @@
+import enum
+from types import SimpleNamespace
+
+import pytest
+
+from core.hotkey_manager import HotkeyManager, key_name, parse_hotkey
+
+
+class Key(enum.Enum):
+    """Stand-in for pynput.keyboard.Key, which needs a display to import."""
+    ctrl_l = 1
+    ctrl_r = 2
+    alt_l = 3
+    f3 = 4
+
+
+def char(c, vk=None):
+    return SimpleNamespace(char=c, vk=vk)
+
+
+def test_parse_hotkey_accepts_config_syntax():
+    assert parse_hotkey('<control>+<alt>+p') == {'ctrl', 'alt', 'p'}
+    assert parse_hotkey('Key.f3') == parse_hotkey('<f3>') == {'f3'}
+    assert parse_hotkey('Q') == {'q'}
+    for spec in ('ctrl+p', '', '<ctrl>+<ctrl_l>'):
+        with pytest.raises(ValueError):
+            parse_hotkey(spec)
+
+
+def test_key_names_are_canonical():
+    assert key_name(Key.ctrl_r) == 'ctrl'
+    assert key_name(Key.f3) == 'f3'
+    assert key_name(char('P')) == 'p'
+    # Ctrl+P as reported on Windows: a control character with the letter's virtual key
+    assert key_name(char('\x10', vk=0x50)) == 'p'
+    assert key_name('Key.alt_gr') == 'alt'
+
+
+def test_chord_fires_once_when_complete():
+    manager = HotkeyManager()
+    fired = []
+    manager.add_hotkey('<control>+<alt>+p', lambda: fired.append('pause'))
+    manager.add_hotkey('Key.f3', lambda: fired.append('stop'))
+
+    manager.press(Key.ctrl_l)
+    manager.press(Key.alt_l)
+    manager.press(char('p'))
+    # Key repeat does not fire again
+    manager.press(char('p'))
+    manager.release(char('p'))
+    # Either Ctrl works, and keys outside every hotkey do not break the chord
+    manager.press(char('x'))
+    manager.press(char('p'))
+    manager.release(Key.alt_l)
+    manager.press(char('p'))
+    manager.press(Key.f3)
+    assert fired == ['pause', 'pause']
+    manager.release(char('p'))
+    manager.release(Key.ctrl_l)
+    manager.release(Key.f3)
+    manager.press(Key.f3)
+    assert fired == ['pause', 'pause', 'stop']
+
+
+def test_subscribers_receive_every_key():
+    manager = HotkeyManager()
+    pressed, released = [], []
+    subscription = manager.subscribe(pressed.append, released.append)
+    manager.add_hotkey('Key.f3', lambda: None)
+    manager.press(Key.f3)
+    manager.release(Key.f3)
+    manager.unsubscribe(subscription)
+    manager.press(char('a'))
+    assert pressed == [Key.f3] and released == [Key.f3]
@@ -0,0 +1,86 @@
+import pytest
+
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE
+from core.input_backends import (
+    InputBackend, RecordingBackend, create_backend, CALL_MOVE, CALL_BUTTON_PRESS, CALL_BUTTON_RELEASE, CALL_KEY_PRESS,
+)
+from conftest import HeadlessSimulator, TickClock
+
+
+def test_recording_backend_logs_calls_with_timestamps():
+    backend = RecordingBackend(clock=TickClock(), batching=False)
+    backend.move(10, 20)
+    backend.press_button(backend.resolve_button('Button.left'))
+    backend.press_key(backend.resolve_key('Key.enter'))
+    calls = backend.calls()
+    assert calls['code'].tolist() == [CALL_MOVE, CALL_BUTTON_PRESS, CALL_KEY_PRESS]
+    assert calls['time'].tolist() == pytest.approx([0.001, 0.002, 0.003])
+    # Clicks are logged at the current cursor position
+    assert calls['x'].tolist() == [10, 10, 0] and calls['y'].tolist() == [20, 20, 0]
+    assert backend.targets == [None, 'left', 'Key.enter']
+    assert backend.call_counts()['button_press'] == 1
+
+
+def test_batching_defers_calls_until_flush():
+    backend = RecordingBackend(clock=TickClock())
+    backend.move(1, 1)
+    backend.move(2, 2)
+    assert len(backend.codes) == 0 and len(backend) == 2
+    backend.flush()
+    backend.flush()
+    assert len(backend.codes) == 2 and backend.flushes == 1
+    # Timestamps are those of the calls, not of the flush
+    assert backend.calls()['time'].tolist() == pytest.approx([0.001, 0.002])
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_more_calls_can_be_logged_after_reading_the_log():
+    backend = RecordingBackend(batching=False)
+    backend.move(1, 2)
+    calls = backend.calls()
+    backend.move(3, 4)
+    backend.press_key('a')
+    assert calls['x'].tolist() == [1]
+    assert backend.calls()['x'].tolist() == [1, 3, 0]
+    assert backend.call_counts()['move'] == 2
+
+
+def test_create_backend():
+    assert isinstance(create_backend(' Null ', batching=False), RecordingBackend)
+    with pytest.raises(ValueError):
+        create_backend('xinput')
+
+
+def test_incomplete_backend_fails_on_construction():
+    class MoveOnly(InputBackend):
+        def move(self, x, y):
+            pass
+
+    with pytest.raises(TypeError):
+        MoveOnly()
+
+
+def test_simulator_replays_through_recording_backend(tmp_path):
+    simulator = HeadlessSimulator(tmp_path)
+    simulator.focus_monitor.title_provider = lambda: 'RuneLite - player'
+    simulator.events = [
+        Event(MOUSE_MOVE, 0, 10, 10),
+        Event(MOUSE_PRESS, 5, 10, 10, 'Button.left'),
+        Event(MOUSE_RELEASE, 20, 10, 10, 'Button.left', 15),
+        Event(KEY_PRESS, 25, symbol='a'),
+        Event(KEY_RELEASE, 30, symbol='a', hold_ms=5),
+    ]
+    try:
+        simulator.start_simulation()
+    finally:
+        simulator.focus_monitor.stop()
+
+    backend = simulator.input_backend
+    calls = backend.calls()
+    assert calls['code'].tolist().count(CALL_BUTTON_RELEASE) == 1
+    assert backend.targets[-2:] == ['a', 'a']
+    assert (calls['time'][1:] >= calls['time'][:-1]).all()
+    # One flush per distinct deadline
+    assert backend.flushes == 5
+    assert simulator.last_replay_report['events'] == 5
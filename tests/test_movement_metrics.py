@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, PAUSE
+from core.movement_metrics import compute_metrics, movement_metrics
+from core.pattern_format import decode_pattern, encode_pattern
+
+
+def _scalar_metrics(samples):
+    """Reference implementation: the recorder's old per-event computation."""
+    rows, last = [], None
+    for offset, x, y in samples:
+        dt = (offset - last[0]) / 1000.0 if last else offset / 1000.0
+        dx, dy = (x - last[1], y - last[2]) if last else (0, 0)
+        distance = math.sqrt(dx * dx + dy * dy)
+        speed = distance / dt if dt > 1e-6 else 0.0
+        rows.append((dt, distance, speed, math.atan2(dy, dx) * 180 / math.pi, dx, dy))
+        last = (offset, x, y)
+    return rows
+
+
+def test_matches_scalar_computation():
+    samples = [(8, 100, 100), (16, 103, 104), (16, 110, 104), (40, 90, 80)]
+    offsets, xs, ys = (np.array(column) for column in zip(*samples))
+    assert np.allclose(compute_metrics(offsets, xs, ys), _scalar_metrics(samples))
+
+
+def test_rows_align_with_events_and_skip_non_moves():
+    events = [
+        Event(MOUSE_MOVE, 10, 0, 0),
+        Event(MOUSE_PRESS, 15, 0, 0, 'Button.left'),
+        Event(PAUSE, 20, 0, 0, hold_ms=100),
+        Event(MOUSE_MOVE, 30, 3, 4),
+    ]
+    metrics = movement_metrics(events)
+    assert metrics.shape == (4, 6)
+    assert not metrics[1].any() and not metrics[2].any()
+    assert np.allclose(metrics[3], (0.02, 5.0, 250.0, math.degrees(math.atan2(4, 3)), 3.0, 4.0))
+
+
+def test_binary_pattern_uses_columns():
+    events = [Event(MOUSE_MOVE, i * 8, i, 2 * i) for i in range(50)]
+    pattern = decode_pattern(encode_pattern(events))
+    assert np.allclose(movement_metrics(pattern), movement_metrics(events))
+
+
+def test_empty():
+    assert movement_metrics([]).shape == (0, 6)
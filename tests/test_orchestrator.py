@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.action_queue import ActionQueue
+from core.command_parser import parse_command
+from core.state_manager import AppState
+from main import Orchestrator
+
+
+class FakeSimulator:
+    def __init__(self, path, patterns):
+        self.action_queue = ActionQueue(str(path), parse=parse_command, backend='poll', poll_interval=0.01)
+        self.action_queue.open()
+        self.patterns = patterns
+        self.simulated = []
+        self.release = threading.Event()
+        self.worker = ThreadPoolExecutor(1)
+        self.closed = False
+
+    def has_pattern(self, command):
+        return command.key in self.patterns
+
+    def submit(self, command):
+        return self.worker.submit(self.simulate_action, command)
+
+    def simulate_action(self, command):
+        self.simulated.append(command.line)
+        self.release.wait(5.0)
+        return True
+
+    def stop_simulation(self):
+        self.release.set()
+
+    def pause_simulation(self):
+        pass
+
+    def resume_simulation(self):
+        pass
+
+    def close(self):
+        self.worker.shutdown()
+        self.action_queue.stop()
+        self.closed = True
+
+
+class FakeRecorder:
+    def __init__(self):
+        self.calls = []
+
+    def start_recording(self, action_line=None):
+        self.calls.append(('start', action_line))
+
+    def switch_action(self, action_line):
+        self.calls.append(('switch', action_line))
+
+    def stop_recording(self):
+        self.calls.append(('stop', None))
+
+    def pause_recording(self):
+        self.calls.append(('pause', None))
+
+    def resume_recording(self):
+        self.calls.append(('resume', None))
+
+
+async def _until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+def _append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_actions_are_recorded_or_simulated(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Sell item [1]\n")
+    simulator = FakeSimulator(path, {'buy_item'})
+    recorder = FakeRecorder()
+    orchestrator = Orchestrator(simulator, recorder, hotkeys=False)
+    states = []
+    orchestrator.state.subscribe(lambda old, new, reason: states.append(new))
+
+    async def scenario():
+        task = asyncio.ensure_future(orchestrator.run())
+        await _until(lambda: orchestrator.state.state is AppState.RECORDING and recorder.calls)
+        _append(path, "Collect items\nBuy item\n")
+        await _until(lambda: simulator.simulated)
+        assert orchestrator.state.state is AppState.SIMULATING
+
+        orchestrator.press('pause')
+        await _until(lambda: orchestrator.state.is_paused)
+        # The replay ends while paused; nothing new starts until resumed
+        _append(path, "Buy item [2]\n")
+        simulator.release.set()
+        await _until(lambda: orchestrator.state.active_state is AppState.IDLE)
+        await asyncio.sleep(0.05)
+        assert simulator.simulated == ['Buy item']
+        simulator.release.clear()
+        orchestrator.press('pause')
+        await _until(lambda: len(simulator.simulated) == 2)
+
+        orchestrator.press('stop')
+        await _until(lambda: orchestrator.state.state is AppState.IDLE)
+        orchestrator.request_stop()
+        await task
+
+    asyncio.run(scenario())
+    assert recorder.calls == [('start', 'Sell item [1]'), ('switch', 'Collect items'), ('stop', None)]
+    assert simulator.simulated == ['Buy item', 'Buy item [2]']
+    assert states == [AppState.RECORDING, AppState.IDLE, AppState.SIMULATING, AppState.PAUSED,
+                      AppState.IDLE, AppState.SIMULATING, AppState.IDLE]
+    assert simulator.closed
+    # Every dispatched action was committed
+    restarted = ActionQueue(str(path), parse=parse_command)
+    restarted.open()
+    assert len(restarted) == 0
+
+
+class SlowLookupSimulator(FakeSimulator):
+    """has_pattern blocks, like a simulator still discovering its patterns."""
+
+    def __init__(self, path, patterns):
+        super().__init__(path, patterns)
+        self.discovered = threading.Event()
+
+    def has_pattern(self, command):
+        self.discovered.wait(5.0)
+        return super().has_pattern(command)
+
+
+def test_pattern_lookup_does_not_block_the_loop(tmp_path):
+    path = tmp_path / 'suggested_actions.txt'
+    path.write_text("Buy item\n")
+    simulator = SlowLookupSimulator(path, {'buy_item'})
+    orchestrator = Orchestrator(simulator, FakeRecorder(), hotkeys=False)
+
+    async def scenario():
+        task = asyncio.ensure_future(orchestrator.run())
+        await _until(lambda: orchestrator._job is not None)
+        # Handled while the lookup is still blocked
+        orchestrator.press('pause')
+        await _until(lambda: orchestrator.state.is_paused)
+        simulator.discovered.set()
+        await asyncio.sleep(0.05)
+        assert simulator.simulated == []
+        orchestrator.press('pause')
+        await _until(lambda: simulator.simulated == ['Buy item'])
+        simulator.release.set()
+        await _until(lambda: orchestrator.state.state is AppState.IDLE)
+        orchestrator.request_stop()
+        await task
+
+    asyncio.run(scenario())
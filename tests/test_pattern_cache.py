@@ -0,0 +1,106 @@
+import os
+
+from core.pattern_cache import PatternCache
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, filepath):
+        self.calls += 1
+        with open(filepath, 'rb') as f:
+            return f.read()
+
+
+def _write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_repeated_get_hits_without_reloading(tmp_path):
+    path = _write(tmp_path / 'a.agp', b'x' * 10)
+    cache, loader = PatternCache(), CountingLoader()
+
+    assert cache.get(path, loader) == b'x' * 10
+    assert cache.get(path, loader) == b'x' * 10
+    assert loader.calls == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_rewritten_file_is_reloaded(tmp_path):
+    path = _write(tmp_path / 'a.agp', b'old')
+    cache, loader = PatternCache(), CountingLoader()
+    cache.get(path, loader)
+
+    _write(path, b'newer')
+    assert cache.get(path, loader) == b'newer'
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_mtime_change_with_same_size_is_reloaded(tmp_path):
+    path = _write(tmp_path / 'a.agp', b'old')
+    cache, loader = PatternCache(), CountingLoader()
+    cache.get(path, loader)
+
+    _write(path, b'new')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get(path, loader) == b'new'
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path):
+    paths = [_write(tmp_path / f'{i}.agp', b'x' * 40) for i in range(3)]
+    cache, loader = PatternCache(max_entries=2, max_bytes=1000), CountingLoader()
+    cache.get(paths[0], loader)
+    cache.get(paths[1], loader)
+    cache.get(paths[0], loader)  # paths[1] becomes least recently used
+    cache.get(paths[2], loader)
+
+    assert paths[0] in cache and paths[2] in cache and paths[1] not in cache
+    assert cache.evictions == 1
+
+    small = PatternCache(max_entries=10, max_bytes=100)
+    for path in paths:
+        small.get(path, loader)
+    assert len(small) == 2 and small.current_bytes == 80
+
+
+def test_oversized_value_is_not_cached(tmp_path):
+    path = _write(tmp_path / 'big.agp', b'x' * 200)
+    cache = PatternCache(max_bytes=100)
+    cache.get(path, CountingLoader())
+    assert len(cache) == 0
+
+
+def test_keyed_entries_share_the_file_stat(tmp_path):
+    path = _write(tmp_path / 'patterns.pack', b'x' * 10)
+    cache, loader = PatternCache(), CountingLoader()
+    cache.get(path, loader, key=f"{path}@0")
+    cache.get(path, loader, key=f"{path}@64")
+    cache.get(path, loader, key=f"{path}@0")
+    assert loader.calls == 2 and cache.hits == 1
+
+    _write(path, b'x' * 20)
+    cache.get(path, loader, key=f"{path}@0")
+    assert loader.calls == 3 and cache.invalidations == 1
+
+
+def test_pack_record_survives_an_append(tmp_path):
+    from core.pattern_pack import PatternPack
+    events = [{'type': 'mouse_move', 'time_offset_ms': 8, 'x': 10, 'y': 20}]
+    pack = PatternPack(str(tmp_path / 'lib.pack'))
+    entry = pack.append(events, {'parsed_action_type': 'Collect'})
+    cache = PatternCache()
+    calls = []
+
+    def load(_path):
+        calls.append(entry.offset)
+        return pack.load(entry)
+
+    first = cache.get(pack.path, load, key=f"{pack.path}@{entry.offset}", version=entry)
+    # The pack file grows, its records do not change
+    pack.append(events, {'parsed_action_type': 'Abort'})
+    assert cache.get(pack.path, load, key=f"{pack.path}@{entry.offset}", version=entry) is first
+    assert calls == [entry.offset] and cache.invalidations == 0
@@ -0,0 +1,81 @@
+import os
+import shutil
+
+import pytest
+
+from core.pattern_catalog import PatternCatalog, normalize_action_type, parse_pattern_filename
+from core.pattern_format import write_pattern
+from conftest import SAMPLE_PATTERN
+
+EVENTS = [{'type': 'mouse_move', 'time_offset_ms': 8, 'x': 10, 'y': 20}]
+
+
+@pytest.mark.parametrize('filename, expected', [
+    ('Buy an item_6_20250601_174120.json', ('Buy an item', 6)),
+    ('Buy_an_item_box6_20250601_174120_123456.agp', ('Buy_an_item', 6)),
+    ('Collect_20250601_174120_123456.json', ('Collect', None)),
+    ('recording_20250601_174120.json', ('recording', None)),
+])
+def test_parse_pattern_filename(filename, expected):
+    assert parse_pattern_filename(filename) == expected
+
+
+def test_recorder_and_action_line_names_normalize_alike():
+    assert normalize_action_type('Buy_an_item') == normalize_action_type(' Buy an item ')
+
+
+def test_sync_indexes_legacy_json_by_filename(tmp_path):
+    shutil.copy(SAMPLE_PATTERN, tmp_path)
+    catalog = PatternCatalog(str(tmp_path))
+    assert catalog.sync() == (1, 0)
+    assert catalog.sync() == (0, 0)
+    assert catalog.best('Buy an item', 6).endswith('Buy an item_6_20250601_174120.json')
+
+
+def test_best_prefers_box_and_newest_then_falls_back(tmp_path):
+    catalog = PatternCatalog(str(tmp_path))
+    box3 = str(tmp_path / 'Buy_an_item_box3_20250101_000000_000000.agp')
+    box6 = str(tmp_path / 'Buy_an_item_box6_20250101_000000_000000.agp')
+    for path, box_id in ((box3, 3), (box6, 6)):
+        write_pattern(path, EVENTS, {'parsed_action_type': 'Buy an item', 'parsed_box_id': box_id})
+        catalog.add(path, 'Buy an item', box_id)
+
+    assert catalog.best('Buy an item', 3) == box3
+    assert catalog.best('Buy an item', 6) == box6
+    # An explicit box without a recording has no pattern, so it gets recorded
+    assert catalog.best('Buy an item', 1) is None
+    # An action line without a box finds patterns recorded in a box
+    assert catalog.best('Buy an item') in (box3, box6)
+    assert catalog.best('Sell an item') is None
+
+    unboxed = str(tmp_path / 'Buy_an_item_20250102_000000_000000.agp')
+    write_pattern(unboxed, EVENTS, {'parsed_action_type': 'Buy an item'})
+    catalog.add(unboxed, 'Buy an item', None)
+    assert catalog.best('Buy an item') == unboxed
+    assert catalog.best('Buy an item', 3) == box3
+
+
+def test_changes_from_another_connection_are_seen(tmp_path):
+    reader = PatternCatalog(str(tmp_path))
+    assert reader.best('Collect') is None
+
+    path = str(tmp_path / 'Collect_20250101_000000_000000.agp')
+    write_pattern(path, EVENTS, {'parsed_action_type': 'Collect'})
+    PatternCatalog(str(tmp_path)).add(path)
+    assert reader.best('Collect') == path
+
+
+def test_sync_drops_deleted_files(tmp_path):
+    path = str(tmp_path / 'Collect_20250101_000000_000000.agp')
+    write_pattern(path, EVENTS, {'parsed_action_type': 'Collect'})
+    catalog = PatternCatalog(str(tmp_path))
+    catalog.sync()
+    os.remove(path)
+    assert catalog.sync() == (0, 1)
+    assert catalog.best('Collect') is None
+
+
+def test_extensions_match_pattern_format():
+    from core import pattern_catalog, pattern_format
+    assert pattern_catalog.PATTERN_EXTENSION == pattern_format.PATTERN_EXTENSION
+    assert pattern_catalog.JSON_EXTENSION == pattern_format.JSON_EXTENSION
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from core.pattern_format import (
+    encode_pattern, decode_pattern, write_pattern, read_pattern, convert_json_pattern,
+    blob_size, PatternFormatError, PATTERN_EXTENSION,
+)
+from conftest import SAMPLE_PATTERN
+
+EVENTS = [
+    {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 538, 'y': 403, 'timestamp': 100.008},
+    {'type': 'mouse_click_press', 'time_offset_ms': 20, 'x': 540, 'y': 400, 'button': 'Button.left', 'timestamp': 100.02},
+    {'type': 'mouse_click_release', 'time_offset_ms': 95, 'x': 540, 'y': 400, 'button': 'Button.left',
+     'hold_duration_ms': 75, 'timestamp': 100.095},
+    {'type': 'pause', 'time_offset_ms': 95, 'duration_ms': 400, 'x': 540, 'y': 400, 'timestamp': 100.095},
+    {'type': 'key_press', 'time_offset_ms': 500, 'key': 'a', 'timestamp': 100.5},
+    {'type': 'key_release', 'time_offset_ms': 560, 'key': 'a', 'hold_duration_ms': 60, 'timestamp': 100.56},
+]
+
+
+def _without_timestamp(event):
+    return {k: v for k, v in event.items() if k != 'timestamp'}
+
+
+def test_round_trip_preserves_events_and_metadata():
+    blob = encode_pattern(EVENTS, {'action_name_line': 'Buy an item [6]'})
+    pattern = decode_pattern(blob)
+
+    assert len(pattern) == len(EVENTS)
+    assert [_without_timestamp(e) for e in pattern.to_events()] == [_without_timestamp(e) for e in EVENTS]
+    assert pattern[0].timestamp == pytest.approx(100.008)
+    assert pattern.metadata == {'action_name_line': 'Buy an item [6]'}
+    assert blob_size(pattern.header) == len(blob)
+
+
+def test_timestamps_are_quantized_to_millisecond_offsets():
+    events = [
+        {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 1, 'y': 1, 'timestamp': 100.0084},
+        {'type': 'mouse_move', 'time_offset_ms': 20, 'x': 2, 'y': 1, 'timestamp': 100.0207},
+    ]
+    pattern = decode_pattern(encode_pattern(events))
+    assert pattern.start_timestamp == pytest.approx(100.0004)
+    # Rebuilt from the first event's timestamp and the whole-ms offsets
+    assert pattern[0].timestamp == pytest.approx(100.0084)
+    assert pattern[1].timestamp == pytest.approx(100.0204)
+    assert pattern[1].timestamp != pytest.approx(100.0207, abs=1e-5)
+
+
+def test_decode_at_offset_is_zero_copy():
+    blob = encode_pattern(EVENTS)
+    buffer = bytearray(b'\0' * 16 + blob)
+    pattern = decode_pattern(buffer, 16)
+    x_offset = 16 + pattern.header['columns'][2]['offset']
+    buffer[x_offset:x_offset + 2] = (7).to_bytes(2, 'little')
+    assert pattern[0].x == 7
+
+
+def test_bad_magic_is_rejected():
+    with pytest.raises(PatternFormatError):
+        decode_pattern(b'JUNK' + bytes(64))
+
+
+def test_convert_sample_pattern_is_much_smaller(tmp_path):
+    output = convert_json_pattern(SAMPLE_PATTERN, str(tmp_path / f"sample{PATTERN_EXTENSION}"))
+    with open(SAMPLE_PATTERN, 'r', encoding='utf-8') as f:
+        original = json.load(f)
+
+    pattern = read_pattern(output)
+    assert len(pattern) == len(original['events'])
+    assert pattern[-1].x == original['events'][-1]['x']
+    assert os.path.getsize(output) * 8 < os.path.getsize(SAMPLE_PATTERN)
+
+
+def test_write_pattern_leaves_no_temp_file(tmp_path):
+    path = str(tmp_path / f"p{PATTERN_EXTENSION}")
+    write_pattern(path, EVENTS)
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+
+def test_out_of_range_coordinates_are_rejected():
+    events = [dict(EVENTS[0]), {'type': 'mouse_move', 'time_offset_ms': 16, 'x': 40000, 'y': 10}]
+
+    with pytest.raises(PatternFormatError, match="'x'"):
+        encode_pattern(events, {})
+
+
+def test_events_and_dicts_encode_the_same():
+    pattern = decode_pattern(encode_pattern(EVENTS, {}))
+
+    assert encode_pattern(list(pattern), {}) == encode_pattern(EVENTS, {})
@@ -0,0 +1,98 @@
+import os
+
+from core.pattern_pack import PatternPack, build_pack
+
+EVENTS = [
+    {'type': 'mouse_move', 'time_offset_ms': 8, 'x': 10, 'y': 20},
+    {'type': 'key_press', 'time_offset_ms': 30, 'key': 'a'},
+]
+
+
+def _append(pack, action_type, box_id, timestamp):
+    return pack.append(EVENTS, {'parsed_action_type': action_type, 'parsed_box_id': box_id,
+                                'pack_timestamp': timestamp})
+
+
+def test_find_returns_latest_entry_per_action_and_box(tmp_path):
+    pack = PatternPack(str(tmp_path / 'lib.pack'))
+    _append(pack, 'Buy an item', 6, 1.0)
+    newest = _append(pack, 'Buy an item', 6, 2.0)
+    other_box = _append(pack, 'Buy an item', 3, 3.0)
+
+    assert pack.find('Buy an item', 6) == newest
+    assert pack.find('Buy an item', 3) == other_box
+    assert pack.find('Sell an item', 6) is None
+    # No fallback for an explicit box; any box for an action line without one
+    assert pack.find('Buy an item', 1) is None
+    assert pack.find('Buy an item') == other_box
+    assert pack.load(newest).to_events() == EVENTS
+
+
+def test_reopen_and_rebuild_missing_index(tmp_path):
+    path = str(tmp_path / 'lib.pack')
+    entry = _append(PatternPack(path), 'Collect', None, 1.0)
+
+    assert PatternPack(path).find('Collect') == entry
+    os.remove(path + '.idx')
+    assert PatternPack(path).find('Collect') == entry
+
+
+def test_torn_tail_is_ignored_and_overwritten(tmp_path):
+    path = str(tmp_path / 'lib.pack')
+    _append(PatternPack(path), 'Collect', None, 1.0)
+    with open(path, 'ab') as f:
+        f.write(b'AGER' + b'\xff' * 12)
+
+    pack = PatternPack(path)
+    assert len(pack) == 1
+    _append(pack, 'Abort', None, 2.0)
+    os.remove(path + '.idx')
+    assert len(PatternPack(path)) == 2
+
+
+def test_build_pack_imports_sample_directory_once(tmp_path):
+    patterns_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'core', 'patterns')
+    path = str(tmp_path / 'lib.pack')
+    build_pack(path, patterns_dir)
+    pack = build_pack(path, patterns_dir)
+
+    assert len(pack) == 1
+    pattern = pack.load(pack.find('Buy an item', 6))
+    assert len(pattern) == 1461
+
+
+def test_two_writers_keep_each_others_records(tmp_path):
+    path = str(tmp_path / 'lib.pack')
+    first, second = PatternPack(path), PatternPack(path)
+    a = _append(first, 'A', 1, 1.0)
+    b = _append(second, 'B', 2, 2.0)
+    c = _append(first, 'C', 3, 3.0)
+
+    assert len({a.offset, b.offset, c.offset}) == 3
+    for pack in (PatternPack(path), first, second):
+        pack.refresh()
+        assert [(e.action_type, e.box_id) for e in pack.entries()] == [('A', 1), ('B', 2), ('C', 3)]
+        assert pack.find('A', 1) == a and pack.find('B', 2) == b
+    os.remove(path + '.idx')
+    rebuilt = PatternPack(path)
+    assert len(rebuilt) == 3
+    assert rebuilt.load(rebuilt.find('B', 2)).metadata['parsed_action_type'] == 'B'
+
+
+def test_torn_index_line_is_skipped_and_reindexed(tmp_path):
+    path = str(tmp_path / 'lib.pack')
+    pack = PatternPack(path)
+    _append(pack, 'Collect', None, 1.0)
+    torn = _append(pack, 'Abort', None, 2.0)
+    # A crash while the last index line was being written
+    with open(path + '.idx', 'r+b') as f:
+        f.truncate(f.seek(0, os.SEEK_END) - 10)
+
+    pack = PatternPack(path)
+    assert pack.find('Abort') == torn
+    newest = _append(pack, 'Sell', None, 3.0)
+
+    reopened = PatternPack(path)
+    assert len(reopened) == 3
+    assert reopened.find('Abort') == torn
+    assert reopened.find('Sell') == newest
@@ -0,0 +1,53 @@
+import configparser
+from types import SimpleNamespace
+
+from core.events import MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE
+from core.recorder import EventRecorder
+
+
+class ScratchRecorder(EventRecorder):
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        super().__init__()
+
+    def _load_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'Paths': {'patterns_directory': str(self.tmp_path), 'suggested_actions': 'none.txt'},
+            'Recording': {'pause_threshold': '10', 'pattern_format': 'binary'},
+        })
+        return config
+
+
+def test_callbacks_reach_the_event_store_without_listeners(tmp_path):
+    recorder = ScratchRecorder(tmp_path)
+    recorder._start_capture()
+    recorder._on_mouse_move(10, 20)
+    recorder._on_mouse_click(10, 20, 'Button.left', True)
+    recorder._on_mouse_click(10, 20, 'Button.left', False)
+    recorder._on_key_event(SimpleNamespace(char='a'), KEY_PRESS)
+    recorder._on_key_event(SimpleNamespace(char='a'), KEY_RELEASE)
+    recorder.is_recording = False
+    recorder.capture_merger.stop(timeout=5.0)
+
+    events = list(recorder.get_current_action_events())
+    assert [event.type_code for event in events] == [MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE]
+    assert events[1].symbol == 'Button.left' and events[3].symbol == 'a'
+    recorder._end_segment(discard=True)
+    recorder.recording_log.close(timeout=5.0)
+
+
+def test_current_action_follows_first_line_of_actions_file(tmp_path):
+    recorder = ScratchRecorder(tmp_path)
+    recorder.is_recording = True
+    recorder._on_new_actions(['Buy item', 'Sell item'], reset=True)
+    assert recorder.current_action == 'Buy item'
+    # Appended lines queue behind the current action
+    recorder._on_new_actions(['Collect items'], reset=False)
+    assert recorder.current_action == 'Buy item'
+    # The consumer removed the first line
+    recorder._on_new_actions(['Sell item', 'Collect items'], reset=True)
+    assert recorder.current_action == 'Sell item'
+    recorder._on_new_actions([], reset=True)
+    recorder._on_new_actions(['Abort'], reset=False)
+    assert recorder.current_action == 'Abort'
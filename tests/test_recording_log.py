@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+
+from core.recording_log import RecordingLog, read_segment, SEGMENT_SUFFIX
+
+
+class Collector:
+    def __init__(self):
+        self.saved = []
+
+    def __call__(self, action_name_line, events):
+        self.saved.append((action_name_line, events))
+        return f"pattern_{len(self.saved)}"
+
+
+def _event(offset):
+    return {'type': 'mouse_move', 'time_offset_ms': offset, 'x': offset, 'y': 0}
+
+
+def test_segments_are_finalized_per_action_and_removed(tmp_path):
+    collector = Collector()
+    log = RecordingLog(str(tmp_path), collector, flush_bytes=64)
+    log.start()
+    log.begin_segment('Buy an item [6]')
+    for offset in range(10):
+        log.append(_event(offset))
+    log.begin_segment('Collect')
+    log.append(_event(99))
+    log.close(timeout=5)
+
+    assert collector.saved == [('Buy an item [6]', [_event(i) for i in range(10)]),
+                               ('Collect', [_event(99)])]
+    assert os.listdir(tmp_path) == []
+
+
+def test_discarded_and_empty_segments_are_not_finalized(tmp_path):
+    collector = Collector()
+    log = RecordingLog(str(tmp_path), collector)
+    log.start()
+    log.begin_segment('generic')
+    log.append(_event(1))
+    log.end_segment(discard=True)
+    log.begin_segment('empty')
+    log.close(timeout=5)
+
+    assert collector.saved == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_events_outside_a_segment_are_ignored(tmp_path):
+    collector = Collector()
+    log = RecordingLog(str(tmp_path), collector)
+    log.start()
+    log.append(_event(1))
+    log.close(timeout=5)
+    assert collector.saved == []
+
+
+def test_leftover_segment_is_recovered_on_start(tmp_path):
+    path = tmp_path / f'segment_crashed{SEGMENT_SUFFIX}'
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'action_name_line': 'Collect'}) + '\n')
+        f.write(json.dumps(_event(1)) + '\n')
+        f.write('{"type": "mouse_mo')  # torn final write
+
+    assert read_segment(str(path)) == ({'action_name_line': 'Collect'}, [_event(1)])
+    collector = Collector()
+    log = RecordingLog(str(tmp_path), collector)
+    log.start()
+    log.close(timeout=5)
+
+    assert collector.saved == [('Collect', [_event(1)])]
+    assert not path.exists()
+
+
+def test_failed_finalize_keeps_segment(tmp_path):
+    log = RecordingLog(str(tmp_path), lambda action, events: None)
+    log.start()
+    log.begin_segment('Collect')
+    log.append(_event(1))
+    log.close(timeout=5)
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_segment_closed_callback_reports_each_segment(tmp_path):
+    closed = []
+    log = RecordingLog(str(tmp_path), Collector(), on_segment_closed=closed.append)
+    log.start()
+    first = log.begin_segment('generic')
+    log.end_segment(discard=True)
+    second = log.begin_segment('Collect')
+    log.append(_event(1))
+    log.close(timeout=5)
+    assert closed == [first, second]
+
+
+def _write_segment(path, action):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'action_name_line': action}) + '\n')
+        f.write(json.dumps(_event(1)) + '\n')
+
+
+def test_recovery_runs_on_the_writer_and_skips_live_segments(tmp_path):
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    dead = tmp_path / f'segment_{exited.pid}_1_1{SEGMENT_SUFFIX}'
+    live = tmp_path / f'segment_{os.getpid()}_1_1{SEGMENT_SUFFIX}'
+    _write_segment(dead, 'Collect')
+    _write_segment(live, 'Live')
+    threads = []
+
+    def finalize(action, events):
+        threads.append(threading.current_thread().name)
+        return 'pattern'
+
+    log = RecordingLog(str(tmp_path), finalize)
+    log.start()
+    log.close(timeout=5)
+    assert threads == ['RecordingLogWriter']
+    assert not dead.exists() and live.exists()
+
+
+def test_failed_own_segment_is_retried_on_next_start(tmp_path):
+    results = [None]
+    closed = []
+
+    def finalize(action, events):
+        if not results:
+            raise OSError("disk full")
+        return results.pop()
+
+    log = RecordingLog(str(tmp_path), finalize, on_segment_closed=closed.append)
+    log.start()
+    first = log.begin_segment('Collect')
+    log.append(_event(1))
+    second = log.begin_segment('Buy an item [6]')
+    log.append(_event(2))
+    log.close(timeout=5)
+    # The first finalize returned None, the second raised; both segments are kept
+    assert closed == [first, second]
+    assert len(os.listdir(tmp_path)) == 2
+
+    results.extend(['pattern_1', 'pattern_2'])
+    log.start()
+    log.close(timeout=5)
+    assert os.listdir(tmp_path) == []
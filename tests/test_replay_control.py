@@ -0,0 +1,136 @@
+import threading
+import time
+
+from core.events import Event, MOUSE_MOVE, KEY_PRESS, KEY_RELEASE
+from core.command_parser import parse_command
+from core.replay_control import ReplayControl, PAUSE, STOP
+from core.simulation_worker import SimulationWorker
+from conftest import HeadlessSimulator
+
+
+def test_sleep_returns_as_soon_as_stop_is_requested():
+    control = ReplayControl()
+    control.begin()
+    threading.Timer(0.02, control.request_stop).start()
+    start = time.perf_counter()
+    control.sleep(5.0)
+    assert time.perf_counter() - start < 1.0
+    assert control.acknowledge(STOP) < 1.0
+    assert control.report()['stop_acks'] == 1
+    # A new replay forgets the stop
+    control.begin()
+    assert not control.interrupted and control.report() == {}
+
+
+def test_worker_runs_jobs_in_order_and_cancels_pending():
+    worker = SimulationWorker()
+    started, release = threading.Event(), threading.Event()
+    order = []
+    first = worker.submit(lambda: started.set() or release.wait(5.0) and order.append(1))
+    second = worker.submit(lambda: order.append(2))
+    assert worker.is_busy and started.wait(5.0)
+    assert worker.cancel_pending() == 1
+    third = worker.submit(lambda: order.append(3) or 'done')
+    release.set()
+    assert third.result(5.0) == 'done'
+    assert first.done() and second.cancelled()
+    assert order == [1, 3]
+    worker.shutdown(timeout=5.0)
+    assert not worker.is_running
+
+
+def _long_replay(tmp_path):
+    simulator = HeadlessSimulator(tmp_path)
+    simulator.focus_monitor.title_provider = lambda: 'RuneLite - player'
+    # Two moves ten seconds apart: the replay spends its time waiting for the second
+    simulator.events = [Event(MOUSE_MOVE, 0, 10, 10), Event(MOUSE_MOVE, 10_000, 20, 20)]
+    return simulator
+
+
+def test_stop_interrupts_a_waiting_replay(tmp_path):
+    simulator = _long_replay(tmp_path)
+    try:
+        future = simulator.submit()
+        # Stop while the replay waits for the second move
+        while simulator.current_event_index < 1:
+            time.sleep(0.001)
+        assert simulator.stop_simulation(timeout=1.0)
+        future.result(1.0)
+    finally:
+        simulator.close()
+    report = simulator.last_replay_report
+    assert report['events'] == 1
+    assert report['stop_ack_max_ms'] < 100.0
+
+
+def test_pause_holds_and_resume_continues(tmp_path):
+    simulator = _long_replay(tmp_path)
+    simulator.events[1] = Event(MOUSE_MOVE, 50, 20, 20)
+    control = simulator.replay_control
+    try:
+        simulator.pause_simulation()
+        future = simulator.submit()
+        # Held at the start of the replay
+        assert control.wait_acknowledged(PAUSE, 1.0)
+        time.sleep(0.1)
+        assert not future.done()
+        simulator.resume_simulation()
+        future.result(2.0)
+    finally:
+        simulator.close()
+    report = simulator.last_replay_report
+    assert report['events'] == 2
+    assert report['elapsed'] >= 0.15
+    assert report['pause_acks'] == 1 and report['resume_acks'] == 1
+
+
+def test_focus_lost_during_a_gap_holds_the_next_input(tmp_path):
+    simulator = _long_replay(tmp_path)
+    title = ['RuneLite - player']
+    simulator.focus_monitor.title_provider = lambda: title[0]
+    simulator.events = [Event(MOUSE_MOVE, 0, 10, 10), Event(KEY_PRESS, 300, symbol='a'),
+                        Event(KEY_RELEASE, 310, symbol='a', hold_ms=10)]
+    backend = simulator.input_backend
+    try:
+        future = simulator.submit()
+        while not simulator.is_simulating:
+            time.sleep(0.001)
+        time.sleep(0.1)
+        title[0] = 'Notepad'
+        # Well past the key's deadline: nothing was sent to the other window
+        time.sleep(0.5)
+        assert not future.done()
+        assert len(backend) == 1
+        title[0] = 'RuneLite - player'
+        future.result(2.0)
+    finally:
+        simulator.close()
+    assert backend.targets[-2:] == ['a', 'a']
+
+
+def test_stop_during_pattern_load_sends_no_input(tmp_path):
+    loading, proceed = threading.Event(), threading.Event()
+
+    class SlowLoadSimulator(HeadlessSimulator):
+        def _load_pattern(self, action_type, box_id=None):
+            loading.set()
+            proceed.wait(5.0)
+            self.events = [Event(MOUSE_MOVE, 0, 10, 10), Event(KEY_PRESS, 20, symbol='a'),
+                           Event(KEY_RELEASE, 30, symbol='a', hold_ms=10)]
+            return 'slow pattern'
+
+    simulator = SlowLoadSimulator(tmp_path)
+    simulator.focus_monitor.title_provider = lambda: 'RuneLite - player'
+    try:
+        future = simulator.submit(parse_command("Buy item [1]"))
+        assert loading.wait(5.0)
+        simulator.stop_simulation()
+        proceed.set()
+        assert future.result(5.0)
+        assert len(simulator.input_backend) == 0
+        assert simulator.last_replay_report['stop_acks'] == 1
+        # The stop does not carry over to the next job
+        assert simulator.submit(parse_command("Buy item [1]")).result(5.0)
+        assert len(simulator.input_backend) == 3
+    finally:
+        simulator.close()
@@ -0,0 +1,105 @@
+import numpy as np
+
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE, KEY_PRESS, KEY_RELEASE, PAUSE
+from core.pattern_format import decode_pattern, encode_pattern
+from core.replay_plan import (
+    compile_plan, OP_STEP, OP_MOVE, OP_BUTTON_PRESS, OP_BUTTON_RELEASE, OP_KEY_PRESS, OP_KEY_RELEASE, OP_WAIT,
+)
+
+EVENTS = [
+    Event(MOUSE_MOVE, 100, 10, 10),
+    Event(MOUSE_MOVE, 120, 16, 10),
+    Event(MOUSE_PRESS, 130, 16, 10, 'Button.left'),
+    Event(MOUSE_RELEASE, 200, 16, 10, 'Button.left', 70),
+    Event(PAUSE, 900, 16, 10, hold_ms=700),
+    Event(KEY_PRESS, 950, symbol='Key.enter'),
+    Event(KEY_RELEASE, 990, symbol='Key.enter', hold_ms=40),
+]
+
+
+def _compile(events, calls=None):
+    calls = [] if calls is None else calls
+
+    def resolve(name):
+        calls.append(name)
+        return f"resolved:{name}"
+    return compile_plan(events, resolve, resolve)
+
+
+def test_opcodes_and_interpolation_steps():
+    plan = _compile(EVENTS)
+    assert plan.opcodes.tolist() == [OP_MOVE, OP_STEP, OP_STEP, OP_MOVE, OP_BUTTON_PRESS, OP_BUTTON_RELEASE,
+                                     OP_WAIT, OP_KEY_PRESS, OP_KEY_RELEASE]
+    # 6 px move over 20 ms: points every 2 px, evenly spread in time
+    assert np.allclose(plan.deadlines_ms[:4], [100, 100 + 20 / 3, 100 + 40 / 3, 120])
+    assert plan.x[:4].tolist() == [10, 12, 14, 16]
+    assert plan.event_index.tolist() == [0, 1, 1, 1, 2, 3, 4, 5, 6]
+    assert plan.origin_ms == 100 and plan.duration_ms == 890 and plan.step_count == 2
+
+
+def test_targets_are_resolved_once_per_symbol():
+    calls = []
+    plan = _compile(EVENTS, calls)
+    assert sorted(calls) == ['Button.left', 'Key.enter']
+    opcodes, _deadlines, _x, _y, targets, _index = plan.columns()
+    assert [targets[i] for i, op in enumerate(opcodes) if op in (OP_KEY_PRESS, OP_KEY_RELEASE)] == \
+        ['resolved:Key.enter'] * 2
+    assert targets[0] is None
+
+
+def test_binary_pattern_compiles_like_event_list():
+    from_list = _compile(EVENTS)
+    from_pattern = _compile(decode_pattern(encode_pattern(EVENTS)))
+    for name in ('opcodes', 'deadlines_ms', 'x', 'y', 'event_index'):
+        assert np.array_equal(getattr(from_list, name), getattr(from_pattern, name))
+    assert from_list.targets == from_pattern.targets
+
+
+def test_dense_trace_is_coalesced_to_the_update_rate():
+    # 1 kHz trace, 1 px per sample, replayed at 250 Hz
+    events = [Event(MOUSE_MOVE, i, i, 0) for i in range(1000)]
+    events.append(Event(MOUSE_PRESS, 1000, 999, 0, 'Button.left'))
+    plan = compile_plan(events, str, str, max_rate_hz=250)
+    assert plan.step_count == 0
+    assert plan.position_writes <= 251 + 1
+    # The last move before the click is kept
+    assert plan.x[-2] == 999 and plan.opcodes[-1] == OP_BUTTON_PRESS
+
+
+def test_gap_interpolation_is_rate_limited():
+    # 400 px jump after a 40 ms gap: 200 points by distance, 10 by rate
+    events = [Event(MOUSE_MOVE, 0, 0, 0), Event(MOUSE_MOVE, 40, 400, 0)]
+    assert compile_plan(events, str, str, max_rate_hz=250).step_count == 9
+    assert compile_plan(events, str, str, max_rate_hz=0).step_count == 199
+    # Gaps shorter than two ticks are not interpolated
+    short = [Event(MOUSE_MOVE, 0, 0, 0), Event(MOUSE_MOVE, 8, 400, 0)]
+    assert compile_plan(short, str, str, max_rate_hz=250).step_count == 0
+
+
+def test_retimed_caps_idle_gaps_and_applies_speed():
+    plan = _compile(EVENTS)
+    fast = plan.retimed(speed=2.0, max_idle_ms=100)
+    # Event gaps 20, 10, 70, 700, 50, 40 -> capped at 100 -> halved
+    knots = fast.deadlines_ms[fast.opcodes != OP_STEP]
+    assert np.allclose(np.diff(knots), [10, 5, 35, 50, 25, 20])
+    # Interpolation points keep their place within the gap they belong to
+    assert np.allclose(fast.deadlines_ms[:4], [100, 100 + 10 / 3, 100 + 20 / 3, 110])
+    assert fast.duration_ms == 145 and fast.targets is plan.targets
+    assert plan.retimed(2.0, 100) is fast and plan.retimed() is plan
+
+
+def test_retimed_keeps_held_buttons_and_keys():
+    events = [
+        Event(KEY_PRESS, 0, symbol='a'),
+        Event(KEY_RELEASE, 2000, symbol='a', hold_ms=2000),
+        Event(PAUSE, 3000, hold_ms=1000),
+        Event(MOUSE_PRESS, 3100, 5, 5, 'Button.left'),
+        Event(MOUSE_MOVE, 3600, 50, 5),
+        Event(MOUSE_RELEASE, 4100, 50, 5, 'Button.left', 1000),
+    ]
+    plan = _compile(events)
+    capped = plan.retimed(max_idle_ms=100)
+    # The 2 s key hold and the 1 s drag keep their length; only the idle gaps are capped
+    assert np.allclose(np.diff(capped.deadlines_ms[plan.opcodes != OP_STEP]), [2000, 100, 100, 500, 500])
+    fast = plan.retimed(speed=2.0, max_idle_ms=100)
+    assert np.allclose(np.diff(fast.deadlines_ms[plan.opcodes != OP_STEP]), [1000, 50, 50, 250, 250])
@@ -0,0 +1,63 @@
+from core.replay_scheduler import ReplayScheduler
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        # Every reading advances time a little, so spin loops terminate
+        self.now += 0.0001
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_waits_against_absolute_deadlines():
+    clock = VirtualClock()
+    scheduler = ReplayScheduler(clock, clock.sleep, spin_threshold=0.002)
+    scheduler.start(origin_ms=500)
+    for offset in (510, 520, 530):
+        clock.now += 0.003  # work done per event must not push later deadlines back
+        lateness = scheduler.wait_until(offset)
+        scheduler.record(offset, lateness)
+        assert lateness < 0.001
+    report = scheduler.report()
+    assert report['events'] == 3
+    assert report['scheduled_duration'] == 0.03
+    assert abs(report['elapsed'] - 0.03) < 0.002
+
+
+def test_late_events_run_immediately_and_are_reported():
+    clock = VirtualClock()
+    scheduler = ReplayScheduler(clock, clock.sleep)
+    scheduler.start()
+    clock.now += 0.050
+    lateness = scheduler.wait_until(10)
+    assert clock.sleeps == []
+    assert 0.039 < lateness < 0.041
+    scheduler.record(10, lateness)
+    assert scheduler.is_due(20)
+    assert scheduler.report()['lateness_max_ms'] > 39
+
+
+def test_shift_moves_remaining_deadlines():
+    clock = VirtualClock()
+    scheduler = ReplayScheduler(clock, clock.sleep)
+    scheduler.start()
+    deadline = scheduler.deadline(100)
+    scheduler.shift(0.5)
+    assert scheduler.deadline(100) == deadline + 0.5
+
+
+def test_interrupted_wait_returns_none():
+    clock = VirtualClock()
+    stopped = []
+    # An interrupting sleep returns before the deadline
+    scheduler = ReplayScheduler(clock, lambda seconds: stopped.append(True), interrupted=lambda: bool(stopped))
+    scheduler.start()
+    assert scheduler.wait_until(1000) is None
+    assert clock.now < scheduler.deadline(1000)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import subprocess
+import sys
+
+from core.command_parser import parse_command
+from conftest import HeadlessSimulator, SAMPLE_PATTERN
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_entry_points_import_without_numpy_or_input_backends():
+    code = ("import sys, core.simulator, core.recorder, main; "
+            "print(sorted(m for m in ('numpy', 'pynput', 'pyautogui', 'core.pattern_format') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+
+def test_patterns_are_discovered_in_the_background(tmp_path):
+    shutil.copy(SAMPLE_PATTERN, tmp_path)
+    (tmp_path / 'suggested_actions.txt').write_text("Buy an item [6].\n")
+    simulator = HeadlessSimulator(tmp_path)
+    try:
+        assert simulator.wait_for_patterns(timeout=5.0)
+        # The current action's pattern was loaded by the discovery thread
+        assert simulator.current_action is not None and len(simulator.events) > 0
+        assert simulator.has_pattern(parse_command("Buy an item [6]."))
+    finally:
+        simulator.close()
+
+
+def test_input_backend_is_created_on_first_use(tmp_path):
+    simulator = HeadlessSimulator(tmp_path)
+    try:
+        assert simulator.wait_for_patterns(timeout=5.0)
+        assert simulator._input_backend is None
+        assert (simulator.screen_width, simulator.screen_height) == simulator.input_backend.screen_size()
+    finally:
+        simulator.close()
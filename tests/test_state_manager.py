@@ -0,0 +1,38 @@
+import pytest
+
+from core.state_manager import AppState, InvalidTransition, StateManager
+
+
+def test_transitions_notify_listeners():
+    state = StateManager()
+    seen = []
+    state.subscribe(lambda old, new, reason: seen.append((old, new, reason)))
+    state.transition(AppState.RECORDING, 'no pattern')
+    # Staying in a state is not a transition
+    state.transition(AppState.RECORDING)
+    state.transition(AppState.IDLE)
+    assert seen == [(AppState.IDLE, AppState.RECORDING, 'no pattern'), (AppState.RECORDING, AppState.IDLE, '')]
+
+    state.transition(AppState.SIMULATING)
+    with pytest.raises(InvalidTransition):
+        state.transition(AppState.RECORDING)
+    assert state.state is AppState.SIMULATING
+
+
+def test_pause_resumes_the_suspended_state():
+    state = StateManager()
+    state.transition(AppState.SIMULATING)
+    assert state.pause()
+    assert not state.pause()
+    assert state.is_paused and state.active_state is AppState.SIMULATING
+    assert state.resume() is AppState.SIMULATING
+    assert state.resume_state is None
+
+
+def test_job_finishing_while_paused_resumes_to_idle():
+    state = StateManager()
+    state.transition(AppState.RECORDING)
+    state.pause()
+    state.finish(AppState.RECORDING)
+    assert state.is_paused and state.active_state is AppState.IDLE
+    assert state.resume() is AppState.IDLE
@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+
+from core.events import Event, MOUSE_MOVE, MOUSE_PRESS, MOUSE_RELEASE
+from core.pattern_format import decode_pattern, encode_pattern, read_pattern, write_pattern
+from core.trajectory import compact_pattern_file, simplify_events, simplify_run
+
+
+def _replayed_error(t, x, y, keep):
+    """Max distance between the recorded samples and the path replayed through the kept ones."""
+    kept = np.flatnonzero(keep)
+    return max(np.max(np.abs(np.interp(t, t[kept], x[kept]) - x)),
+               np.max(np.abs(np.interp(t, t[kept], y[kept]) - y)))
+
+
+def test_straight_line_collapses_to_endpoints():
+    t = np.arange(0, 80, 8)
+    keep = simplify_run(t, t // 8, t // 4, tolerance_px=0.5, max_gap_ms=1000)
+    assert keep.tolist() == [True] + [False] * 8 + [True]
+
+
+def test_error_and_gap_bounds_hold():
+    t = np.arange(0, 2000, 8)
+    x = 400 + 150 * np.sin(t / 300.0)
+    y = 300 + 80 * np.cos(t / 170.0)
+    keep = simplify_run(t, x, y, tolerance_px=1.0, max_gap_ms=100)
+    assert keep.sum() < len(t) / 3
+    assert _replayed_error(t, x, y, keep) <= 1.0 * np.sqrt(2)
+    assert np.diff(t[keep]).max() <= 100
+
+
+def test_non_move_events_and_run_edges_are_kept():
+    events = [Event(MOUSE_MOVE, i * 8, i, 0) for i in range(20)]
+    events.append(Event(MOUSE_PRESS, 160, 19, 0, 'Button.left'))
+    events.append(Event(MOUSE_RELEASE, 240, 19, 0, 'Button.left', 80))
+    events += [Event(MOUSE_MOVE, 240 + i * 8, 19 + i, 0) for i in range(1, 10)]
+    kept = simplify_events(events, tolerance_px=0.5, max_gap_ms=1000)
+    assert [(e.type_code, e.time_offset_ms) for e in kept] == [
+        (MOUSE_MOVE, 0), (MOUSE_MOVE, 152), (MOUSE_PRESS, 160), (MOUSE_RELEASE, 240),
+        (MOUSE_MOVE, 248), (MOUSE_MOVE, 312)]
+
+
+def test_delta_encoding_round_trip_and_size():
+    events = [Event(MOUSE_MOVE, 100000 + i * 8, 500 + i % 7, 300 - i % 5) for i in range(1000)]
+    plain = encode_pattern(events)
+    delta = encode_pattern(events, delta=True)
+    assert len(delta) < len(plain)
+    assert list(decode_pattern(delta)) == list(decode_pattern(plain))
+
+
+def test_compact_files_in_place(tmp_path):
+    events = [Event(MOUSE_MOVE, i * 8, i, i) for i in range(100)]
+    json_path = tmp_path / 'a.json'
+    json_path.write_text(json.dumps({'parsed_action_type': 'a', 'events': [e.to_dict() for e in events]}))
+    binary_path = str(tmp_path / 'b.agp')
+    write_pattern(binary_path, events, {'parsed_action_type': 'b'})
+
+    result = compact_pattern_file(str(json_path), tolerance_px=1.0, max_gap_ms=100)
+    assert result.events_after < result.events_before and result.bytes_after < result.bytes_before
+    assert json.loads(json_path.read_text())['simplified'] == {'tolerance_px': 1.0, 'max_gap_ms': 100}
+
+    result = compact_pattern_file(binary_path, tolerance_px=1.0, max_gap_ms=100)
+    assert result.bytes_after < result.bytes_before
+    pattern = read_pattern(binary_path)
+    assert pattern[0] == events[0] and pattern[-1] == events[-1]
+    # Already compact with the same bounds: nothing to do
+    assert compact_pattern_file(binary_path, tolerance_px=1.0, max_gap_ms=100) is None
+
+
+def test_second_pass_keeps_the_error_within_the_looser_bound(tmp_path):
+    t = np.arange(0, 4000, 8)
+    rng = np.random.default_rng(0)
+    x = np.round(400 + np.cumsum(rng.normal(0, 2, len(t))))
+    y = np.round(300 + np.cumsum(rng.normal(0, 2, len(t))))
+    events = [Event(MOUSE_MOVE, int(ti), int(xi), int(yi)) for ti, xi, yi in zip(t, x, y)]
+    path = str(tmp_path / 'a.agp')
+    write_pattern(path, events, {'parsed_action_type': 'a'})
+
+    compact_pattern_file(path, tolerance_px=1.0, max_gap_ms=1000)
+    once = len(read_pattern(path))
+    result = compact_pattern_file(path, tolerance_px=6.0, max_gap_ms=1000)
+    assert result.events_after < once
+    pattern = read_pattern(path)
+    assert pattern.metadata['simplified'] == {'tolerance_px': 6.0, 'max_gap_ms': 1000}
+
+    kept = np.isin(t, [event.time_offset_ms for event in pattern])
+    assert _replayed_error(t, x, y, kept) <= 6.0
+    # Tighter bounds cannot be reached from the reduced path
+    assert compact_pattern_file(path, tolerance_px=1.0, max_gap_ms=100) is None